@@ -0,0 +1,255 @@
+# bitpanel_api.py - Cliente HTTP direto do BitPanel (alternativa ao Selenium)
+"""
+O BitPanel é uma SPA em Vue: as telas que o BitPanelManager percorre com o
+Chrome só chamam rotas JSON do próprio painel. Este cliente chama essas rotas
+direto com `requests.Session`, sem navegador, e devolve os dados no mesmo
+formato do BitPanelManager (usuario, senha, conexoes, criado_em, expira_em,
+plano, status_bitpanel), então quem usa um pode trocar pelo outro.
+
+Escolha com BITPANEL_BACKEND=api. As rotas ficam em ROTAS e ainda não foram
+conferidas contra o painel real (só contra o mock_bitpanel.py): confira na
+aba Network do navegador antes de usar em produção ou se o painel mudar de
+versão.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import requests
+
+from config import Config
+
+ROTAS = {
+    "login": "/api/auth/login",
+    "perfil": "/api/auth/me",
+    "listas": "/api/lists",
+    "lista": "/api/lists/{id}",
+    "renovar": "/api/lists/{id}/renew",
+    "teste": "/api/lists/test",
+}
+
+# Campos do JSON do painel -> chaves usadas pelo resto do sistema
+CAMPOS_API = {
+    "username": "usuario",
+    "password": "senha",
+    "connections": "conexoes",
+    "max_connections": "conexoes",
+    "created_at": "criado_em",
+    "expires_at": "expira_em",
+    "exp_date": "expira_em",
+    "plan": "plano",
+    "package": "plano",
+    "status": "status_bitpanel",
+}
+
+CAMPOS_DATA = ("criado_em", "expira_em")
+
+
+class BitPanelApiError(Exception):
+    """Resposta inesperada ou erro HTTP do painel."""
+
+
+def _formatar_data(valor: Any) -> Any:
+    """Converte timestamp ou ISO para 'dd/mm/aaaa HH:MM', o formato que a tela mostra."""
+    if valor in (None, ""):
+        return valor
+    try:
+        if isinstance(valor, (int, float)):
+            data = datetime.fromtimestamp(valor)
+        else:
+            data = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+        return data.strftime("%d/%m/%Y %H:%M")
+    except ValueError:
+        return valor
+
+
+def mapear_lista(dados: Dict[str, Any]) -> Dict[str, Any]:
+    """Traduz uma lista no JSON do painel para o dicionário que o BitPanelManager devolve."""
+    resultado = {}
+    for campo, valor in dados.items():
+        chave = CAMPOS_API.get(campo.lower())
+        if chave and chave not in resultado:
+            resultado[chave] = _formatar_data(valor) if chave in CAMPOS_DATA else valor
+    return resultado
+
+
+class BitPanelApiClient:
+    """Mesma interface do BitPanelManager, falando HTTP com o painel."""
+
+    def __init__(self, base_url: str = None, rotas: Dict[str, str] = None, timeout: float = None):
+        self.config = Config()
+        if not self.config.BITPANEL_USER or not self.config.BITPANEL_PASS:
+            raise ValueError(
+                "As credenciais BITPANEL_USER e BITPANEL_PASS não foram encontradas no arquivo config.py."
+            )
+        self.base_url = (base_url or self.config.BITPANEL_API_URL or self.config.BITPANEL_URL or "").rstrip("/")
+        self.rotas = rotas or ROTAS
+        self.timeout = timeout or self.config.BITPANEL_API_TIMEOUT
+        self.sessao = requests.Session()
+        self.sessao.headers.update({"Accept": "application/json"})
+        self.is_logged_in = False
+        self.tempos_passos = []
+
+    def _url(self, rota: str, **parametros) -> str:
+        return self.base_url + self.rotas[rota].format(**parametros)
+
+    def _requisitar(self, metodo: str, rota: str, parametros_rota: Dict = None, repetir: bool = True, **kwargs) -> Any:
+        resposta = self.sessao.request(
+            metodo, self._url(rota, **(parametros_rota or {})), timeout=self.timeout, **kwargs
+        )
+        if resposta.status_code == 401:
+            self.is_logged_in = False
+            # Token venceu no meio da operação: o painel recusou a chamada sem executá-la,
+            # então dá para logar de novo e repeti-la uma vez em vez de falhar a operação
+            if rota != "login" and repetir:
+                self.sessao.headers.pop("Authorization", None)
+                print(f"🔐 [API] Sessão expirada em {metodo} {rota}, refazendo login")
+                if self.login():
+                    return self._requisitar(metodo, rota, parametros_rota, repetir=False, **kwargs)
+        if resposta.status_code >= 400:
+            raise BitPanelApiError(f"{metodo} {rota}: HTTP {resposta.status_code} {resposta.text[:200]}")
+        try:
+            return resposta.json() if resposta.content else {}
+        except ValueError:
+            raise BitPanelApiError(f"{metodo} {rota}: resposta não é JSON")
+
+    @staticmethod
+    def _corpo(resposta: Any) -> Any:
+        """Muitas rotas embrulham o resultado em {"data": ...}."""
+        if isinstance(resposta, dict) and "data" in resposta:
+            return resposta["data"]
+        return resposta
+
+    def login(self, headless=True) -> bool:
+        """Autentica a sessão HTTP. `headless` existe só pela compatibilidade."""
+        if self.is_logged_in:
+            return True
+        try:
+            print("🔐 [API] Fazendo login no BitPanel...")
+            resposta = self._requisitar(
+                "POST", "login",
+                json={"username": self.config.BITPANEL_USER, "password": self.config.BITPANEL_PASS},
+            )
+            token = resposta.get("token") or resposta.get("access_token")
+            if token:
+                self.sessao.headers["Authorization"] = f"Bearer {token}"
+            self.is_logged_in = True
+            print("✅ [API] Login realizado com sucesso!")
+            return True
+        except (requests.RequestException, BitPanelApiError) as e:
+            print(f"❌ [API] Erro no login: {e}")
+            return False
+
+    def sessao_ativa(self, recarregar: bool = False) -> bool:
+        if not self.is_logged_in:
+            return False
+        if not recarregar:
+            return True
+        try:
+            self._requisitar("GET", "perfil")
+            return True
+        except (requests.RequestException, BitPanelApiError):
+            return False
+
+    def verificar_conexao(self, headless=True) -> bool:
+        print("🌐 [API] Verificando conexão com o BitPanel...")
+        return self.login(headless=headless)
+
+    def _buscar_lista(self, username: str) -> Optional[Dict[str, Any]]:
+        resposta = self._corpo(self._requisitar("GET", "listas", params={"search": username}))
+        for item in resposta or []:
+            if str(item.get("username", "")).strip() == username:
+                return item
+        return None
+
+    def criar_lista(self, username: str, conexoes: int, duracao_meses: int, headless=False):
+        if not self.login():
+            print("❌ [API] Falha no login. Abortando criação de lista.")
+            return None
+        try:
+            print(f"🔧 [API] Criando lista para o usuário: {username}")
+            resposta = self._requisitar("POST", "listas", json={
+                "username": username,
+                "connections": conexoes,
+                "months": duracao_meses,
+                "plan_tv": Config.PLANO_DEFAULT,
+                "plan_price": "Basico",
+            })
+            dados = mapear_lista(self._corpo(resposta))
+            print(f"🎉 [API] Lista '{dados.get('usuario', username)}' criada")
+            return dados
+        except requests.RequestException as e:
+            # Rede/timeout: falha temporária, a fila de jobs repete
+            print(f"❌ [API] Erro de conexão ao criar lista: {e}")
+            raise
+        except BitPanelApiError as e:
+            print(f"❌ [API] Erro ao criar lista: {e}")
+            return None
+
+    def renovar_lista(self, username: str, duracao_meses: int, headless=False) -> dict:
+        if not self.login():
+            return {"erro": "Falha no login"}
+        try:
+            print(f"🔄 [API] Renovando lista {username} por {duracao_meses} mês(es)")
+            lista = self._buscar_lista(username)
+            if not lista:
+                return {"erro": f"Usuário '{username}' não encontrado", "nao_encontrado": True}
+            resposta = self._requisitar(
+                "POST", "renovar", parametros_rota={"id": lista["id"]},
+                json={"months": duracao_meses, "plan_price": "Basico"},
+            )
+            return mapear_lista(self._corpo(resposta))
+        except requests.RequestException as e:
+            print(f"❌ [API] Erro de conexão ao renovar lista: {e}")
+            raise
+        except BitPanelApiError as e:
+            print(f"❌ [API] Erro ao renovar lista: {e}")
+            return {"erro": str(e)}
+
+    def criar_teste(self, username: str, headless=False) -> dict:
+        if not self.login():
+            return {"erro": "Falha no login"}
+        try:
+            print(f"🔄 [API] Criando teste para o usuário: {username}")
+            resposta = self._requisitar("POST", "teste", json={
+                "username": username,
+                "plan_tv": Config.PLANO_DEFAULT,
+            })
+            return mapear_lista(self._corpo(resposta))
+        except (requests.RequestException, BitPanelApiError) as e:
+            print(f"❌ [API] Erro ao criar teste: {e}")
+            return {"erro": str(e)}
+
+    def sincronizar_dados_usuario(self, username: str, headless=True) -> dict:
+        if not self.login():
+            return {"erro": "Falha no login"}
+        try:
+            lista = self._buscar_lista(username)
+            if not lista:
+                return {"erro": f"Usuário '{username}' não encontrado", "nao_encontrado": True}
+            # A busca pode não trazer a senha; os detalhes trazem tudo
+            resposta = self._requisitar("GET", "lista", parametros_rota={"id": lista["id"]})
+            dados = mapear_lista(self._corpo(resposta))
+            return dados or {"erro": "Falha ao capturar dados"}
+        except (requests.RequestException, BitPanelApiError) as e:
+            print(f"❌ [API] Erro ao sincronizar {username}: {e}")
+            return {"erro": str(e)}
+
+    def extrair_tabela_listas(self) -> dict:
+        """Todas as listas do painel numa chamada só: {usuario: dados}."""
+        if not self.login():
+            return None
+        try:
+            listas = {}
+            for item in self._corpo(self._requisitar("GET", "listas", params={"search": ""})) or []:
+                dados = mapear_lista(item)
+                if dados.get("usuario"):
+                    listas[dados["usuario"]] = dados
+            return listas
+        except (requests.RequestException, BitPanelApiError) as e:
+            print(f"❌ [API] Erro ao ler todas as listas: {e}")
+            return None
+
+    def close(self):
+        self.sessao.close()
+        self.is_logged_in = False
@@ -5,8 +5,12 @@ Este script é projetado para ser usado em conjunto com o seu arquivo `config.py
 Certifique-se de que `config.py` e `bitpanel_automation.py` estejam na mesma pasta.
 """
 
+import functools
+import json
+import os
 import time
 import random
+from contextlib import contextmanager
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -19,10 +23,113 @@ from selenium.common.exceptions import (
     TimeoutException,
     NoSuchElementException,
     ElementClickInterceptedException,
+    WebDriverException,
 )
 from config import Config
+from parser_bitpanel import extrair_erros, mapear_info_lista, mapear_linha_tabela
 from selenium.webdriver.common.keys import Keys
 
+try:
+    import psutil  # opcional: só para medir a memória do Chrome
+except ImportError:
+    psutil = None
+
+
+# Sem estes campos a linha da tabela não basta e o usuário cai na página de detalhes
+CAMPOS_ESSENCIAIS_SYNC = ("expira_em", "conexoes")
+
+# Lê cabeçalhos e todas as linhas da tabela de uma vez, numa única chamada ao navegador
+JS_LER_TABELA = """
+const tabela = document.querySelector('.v-data-table table') || document.querySelector('table');
+if (!tabela) { return null; }
+const texto = (el) => (el.innerText || el.textContent || '').trim();
+const cabecalhos = Array.from(tabela.querySelectorAll('thead th')).map(texto);
+const linhas = Array.from(tabela.querySelectorAll('tbody tr'))
+    .filter((tr) => !tr.classList.contains('v-data-table__empty-wrapper'))
+    .map((tr) => Array.from(tr.querySelectorAll('td')).map(texto));
+return {cabecalhos: cabecalhos, linhas: linhas};
+"""
+
+
+# Pares [rótulo, valor] de cada <li> do bloco 'user-infor', numa única chamada ao navegador
+JS_LER_INFO_LISTA = """
+const bloco = document.querySelector('.user-infor');
+if (!bloco) { return null; }
+return Array.from(bloco.querySelectorAll('li'))
+    .map((li) => (li.innerText || li.textContent || '').trim())
+    .filter((texto) => texto.includes(':'))
+    .map((texto) => {
+        const i = texto.indexOf(':');
+        return [texto.slice(0, i).trim(), texto.slice(i + 1).trim()];
+    });
+"""
+
+
+# Perfil enxuto do Chrome da automação (BITPANEL_PERFIL_ENXUTO)
+ARGUMENTOS_PERFIL_ENXUTO = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false",
+]
+
+# Recursos que a automação nunca usa: bloqueados via CDP antes de saírem do navegador
+URLS_BLOQUEADAS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*",
+]
+
+# Navigation Timing da página atual, em milissegundos
+JS_TEMPOS_PAGINA = """
+const nav = performance.getEntriesByType('navigation')[0];
+if (!nav) { return null; }
+const recursos = performance.getEntriesByType('resource');
+return {
+    dom_pronto_ms: Math.round(nav.domContentLoadedEventEnd),
+    carregada_ms: Math.round(nav.loadEventEnd),
+    recursos: recursos.length,
+    bytes_recursos: recursos.reduce((total, r) => total + (r.transferSize || 0), 0),
+};
+"""
+
+
+def _rss_arvore_processos(pid: int):
+    """Soma o RSS (bytes) de `pid` e descendentes. None se não der para medir."""
+    if psutil is not None:
+        try:
+            raiz = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [raiz] + raiz.children(recursive=True))
+        except psutil.Error:
+            return None
+    if not os.path.isdir("/proc"):
+        return None
+    # Sem psutil (Linux): percorre /proc montando a árvore pelo PPid
+    filhos, rss = {}, {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/status") as arquivo:
+                campos = dict(linha.split(":", 1) for linha in arquivo if ":" in linha)
+        except OSError:
+            continue
+        filhos.setdefault(int(campos["PPid"].strip()), []).append(int(entrada))
+        rss[int(entrada)] = int(campos.get("VmRSS", "0 kB").split()[0]) * 1024
+    total, pendentes = 0, [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        total += rss.get(atual, 0)
+        pendentes.extend(filhos.get(atual, []))
+    return total
+
 
 # Mock do objeto 'db' para o código funcionar de forma independente
 class MockDB:
@@ -33,6 +140,44 @@ class MockDB:
 db = MockDB()
 
 
+def _resultado_operacao(retorno) -> str:
+    """Classifica o retorno de uma operação do BitPanelManager: 'ok', 'parcial' ou 'erro'."""
+    if retorno is None or retorno is False:
+        return "erro"
+    if isinstance(retorno, dict):
+        if "erro" in retorno:
+            return "erro"
+        if retorno.get("status") == "parcial":
+            return "parcial"
+    return "ok"
+
+
+def _operacao_medida(nome: str):
+    """
+    Decora uma operação do BitPanelManager: zera `tempos_passos` no começo e,
+    ao terminar (mesmo com exceção), resume os passos e grava a execução com
+    o resultado. Uma operação chamada dentro de outra (o login dentro de
+    criar_lista) entra como passos da de fora.
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def executar(self, *args, **kwargs):
+            if self._operacao_atual:
+                return metodo(self, *args, **kwargs)
+            self._operacao_atual = nome
+            self.tempos_passos = []
+            retorno = None
+            try:
+                retorno = metodo(self, *args, **kwargs)
+                return retorno
+            finally:
+                self._operacao_atual = None
+                if self.tempos_passos:
+                    self._registrar_operacao(nome, _resultado_operacao(retorno))
+        return executar
+    return decorador
+
+
 class BitPanelManager:
     def __init__(self):
         """Inicializa o gerenciador do BitPanel."""
@@ -43,13 +188,105 @@ class BitPanelManager:
             )
         self.driver = None
         self.is_logged_in = False
+        # (passo, segundos, sucesso) da última operação, para achar o passo lento
+        self.tempos_passos = []
+        self._operacao_atual = None
+
+    def _salvar_screenshot(self, nome: str):
+        """Screenshot para análise de um erro; com o Chrome caído não há o que salvar."""
+        try:
+            self.driver.save_screenshot(nome)
+            print(f"   - Screenshot '{nome}' salvo para análise.")
+        except Exception:
+            pass
+
+    def _espera(self, passo: str) -> WebDriverWait:
+        """WebDriverWait com o timeout configurado para o tipo de passo."""
+        timeout = self.config.BITPANEL_TIMEOUTS.get(passo, self.config.BITPANEL_TIMEOUTS["padrao"])
+        return WebDriverWait(self.driver, timeout)
+
+    @contextmanager
+    def _passo(self, nome: str):
+        """Cronometra um passo da automação e guarda em `tempos_passos` (com exceção = falhou)."""
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            yield
+            sucesso = True
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.tempos_passos.append((nome, duracao, sucesso))
+            print(f"   ⏱️ {nome}: {duracao:.2f}s" + ("" if sucesso else " (falhou)"))
+
+    def _resumir_passos(self, operacao: str, resultado: str = "ok"):
+        total = sum(duracao for _, duracao, _ in self.tempos_passos)
+        passos = ", ".join(f"{nome}={duracao:.2f}s" for nome, duracao, _ in self.tempos_passos)
+        print(f"⏱️ [{operacao}] {resultado}, total {total:.2f}s ({passos})")
+
+    def _registrar_operacao(self, operacao: str, resultado: str):
+        """Resume os passos da operação e grava na tabela de tempos (p50/p95 no dashboard)."""
+        self._resumir_passos(operacao, resultado)
+        if not self.config.BITPANEL_REGISTRAR_TEMPOS:
+            return
+        try:
+            from database import db
+            db.registrar_tempos_passos(operacao, resultado, self.tempos_passos)
+        except Exception as e:
+            # Medir nunca pode derrubar a automação
+            print(f"⚠️ Não foi possível gravar os tempos de '{operacao}': {e}")
+
+    def _aguardar_tabela(self):
+        """Espera a barra de carregamento da tabela de listas sumir."""
+        self._espera("busca").until(
+            EC.invisibility_of_element_located((By.CSS_SELECTOR, ".v-data-table__progress, .v-progress-linear"))
+        )
+
+    def _buscar_usuario_na_tabela(self, username: str) -> bool:
+        """
+        Digita o usuário no campo de busca de /list e espera a tabela terminar
+        de recarregar e mostrar a linha dele. Retorna False se ele não aparecer.
+        """
+        search_field = self._espera("navegacao").until(
+            EC.visibility_of_element_located(
+                (
+                    By.XPATH,
+                    "//label[contains(text(), 'Buscar por nome')]/following-sibling::input",
+                )
+            )
+        )
+        search_field.click()
+        search_field.clear()
+        search_field.send_keys(username)
+        search_field.send_keys(Keys.ENTER)
+
+        self._aguardar_tabela()
+        try:
+            self._espera("busca").until(
+                EC.presence_of_element_located((By.XPATH, f"//td[normalize-space(text())='{username}']"))
+            )
+            return True
+        except TimeoutException:
+            return False
+
+    def _aguardar_pagina_carregada(self, passo: str = "navegacao"):
+        self._espera(passo).until(
+            lambda driver: driver.execute_script("return document.readyState") == "complete"
+        )
 
-    def setup_driver(self, headless=True):
+    def setup_driver(self, headless=True, enxuto: bool = None):
+        """
+        Abre o Chrome da automação. `headless=False` mostra a janela (e a deixa
+        aberta no fim, para depuração). `enxuto` (padrão BITPANEL_PERFIL_ENXUTO)
+        corta o que a automação não usa: imagens, fontes, mídia, analytics,
+        extensões e o tráfego de fundo do próprio Chrome.
+        """
+        enxuto = self.config.BITPANEL_PERFIL_ENXUTO if enxuto is None else enxuto
         options = Options()
-        #if headless:
-            #options.add_argument("--headless=new")  # headless moderno
+        if headless:
+            options.add_argument("--headless=new")  # headless moderno
+        else:
+            options.add_experimental_option("detach", True)
 
-        options.add_experimental_option("detach", True)
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option("useAutomationExtension", False)
         options.add_argument("--no-sandbox")
@@ -65,13 +302,46 @@ class BitPanelManager:
             "profile.default_content_settings.popups": 0,
             "profile.managed_default_content_settings.popups": 0,
         }
+        if enxuto:
+            for argumento in ARGUMENTOS_PERFIL_ENXUTO:
+                options.add_argument(argumento)
+            prefs["profile.managed_default_content_settings.images"] = 2
+            # 'eager': driver.get() volta no DOMContentLoaded; as esperas explícitas cuidam do resto
+            options.page_load_strategy = self.config.BITPANEL_PAGE_LOAD_STRATEGY
         options.add_experimental_option("prefs", prefs)
 
         service = Service(executable_path="chromedriver.exe")
         self.driver = webdriver.Chrome(service=service, options=options)
-        self.driver.implicitly_wait(10)
+        # Sem espera implícita: ela somava 10s a cada find_element que falhava,
+        # por cima das esperas explícitas de cada passo
+        self.driver.implicitly_wait(0)
         self.driver.set_page_load_timeout(30)
 
+        if enxuto:
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URLS_BLOQUEADAS})
+            except WebDriverException as e:
+                print(f"⚠️ Bloqueio de recursos via CDP indisponível: {e.__class__.__name__}")
+
+    def medir_navegador(self) -> dict:
+        """
+        Memória do Chrome da automação (RSS do chromedriver e de todos os
+        processos filhos) e tempos da última página carregada, para comparar
+        o perfil enxuto com o completo.
+        """
+        medidas = {"rss_mb": None}
+        processo = getattr(getattr(self.driver, "service", None), "process", None)
+        if processo is not None:
+            rss = _rss_arvore_processos(processo.pid)
+            medidas["rss_mb"] = round(rss / 1024 / 1024, 1) if rss is not None else None
+        try:
+            medidas.update(self.driver.execute_script(JS_TEMPOS_PAGINA) or {})
+        except WebDriverException:
+            pass
+        return medidas
+
+    @_operacao_medida("login")
     def login(self, headless=True) -> bool:
         """Faz login no BitPanel usando as credenciais do config.py."""
         if self.is_logged_in:
@@ -82,88 +352,98 @@ class BitPanelManager:
             print("❌ Driver não inicializado.")
             return False
 
+        with self._passo("login.restaurar_sessao"):
+            restaurada = self._restaurar_sessao()
+        if restaurada:
+            self.is_logged_in = True
+            print("✅ Sessão do BitPanel restaurada, login dispensado")
+            return True
+
         try:
             print("🔐 Fazendo login no BitPanel...")
-            self.driver.get(f"{self.config.BITPANEL_URL}/login")
+            wait = self._espera("login")
 
-            wait = WebDriverWait(self.driver, 20)
+            with self._passo("login.abrir"):
+                self.driver.get(f"{self.config.BITPANEL_URL}/login")
+                print("   - Aguardando formulário de login...")
+                username_field = wait.until(
+                    EC.visibility_of_element_located((By.NAME, "username"))
+                )
 
-            print("   - Aguardando página carregar...")
-            time.sleep(3)
+            with self._passo("login.enviar"):
+                print("   - Preenchendo credenciais...")
+                username_field.clear()
+                username_field.send_keys(self.config.BITPANEL_USER)
 
-            print("   - Preenchendo credenciais...")
-            username_field = wait.until(
-                EC.presence_of_element_located((By.NAME, "username"))
-            )
-            username_field.clear()
-            username_field.send_keys(self.config.BITPANEL_USER)
+                password_field = wait.until(
+                    EC.visibility_of_element_located((By.NAME, "password"))
+                )
+                password_field.clear()
+                password_field.send_keys(self.config.BITPANEL_PASS)
 
-            password_field = wait.until(
-                EC.presence_of_element_located((By.NAME, "password"))
-            )
-            password_field.clear()
-            password_field.send_keys(self.config.BITPANEL_PASS)
-
-            print("   - Enviando formulário...")
-            password_field.send_keys(Keys.RETURN)
-            
-            time.sleep(8)
-
-            print("   - Contornando popup de senha...")
-            
-            # CORREÇÃO CRÍTICA: Salvar o handle da aba original ANTES de abrir nova
-            original_window = self.driver.current_window_handle
-            
-            # Abre nova aba com o dashboard
-            self.driver.execute_script(
-                "window.open(arguments[0], '_blank');",
-                self.config.BITPANEL_URL + "/dashboard",
-            )
-            
-            # Aguarda nova aba abrir
-            time.sleep(2)
-            
-            # Pega todos os handles disponíveis
-            all_windows = self.driver.window_handles
-
-            # Identifica o handle da nova aba (que não é o original)
-            new_window = [w for w in all_windows if w != original_window][0]
-            
-            print(f"   - Mudou para nova aba: {self.driver.current_url[:50]}...")
-            
-            # AGORA SIM fecha a aba antiga (com o popup)
-            self.driver.switch_to.window(original_window)
-            self.driver.close()
-            
-            # Volta para a aba nova (que agora é a única)
-            self.driver.switch_to.window(new_window)
-            
-            time.sleep(3)
+                print("   - Enviando formulário...")
+                password_field.send_keys(Keys.RETURN)
+
+                # O painel sai da rota /login quando aceita as credenciais
+                try:
+                    wait.until(lambda driver: "login" not in driver.current_url.lower())
+                except TimeoutException:
+                    print("   - ⚠️ Ainda na tela de login, tentando abrir o dashboard mesmo assim")
+
+            with self._passo("login.contornar_popup"):
+                print("   - Contornando popup de senha...")
+
+                # CORREÇÃO CRÍTICA: Salvar o handle da aba original ANTES de abrir nova
+                original_window = self.driver.current_window_handle
+                janelas_antes = len(self.driver.window_handles)
+
+                # Abre nova aba com o dashboard
+                self.driver.execute_script(
+                    "window.open(arguments[0], '_blank');",
+                    self.config.BITPANEL_URL + "/dashboard",
+                )
+
+                # Aguarda nova aba abrir
+                wait.until(EC.number_of_windows_to_be(janelas_antes + 1))
+
+                # Identifica o handle da nova aba (que não é o original)
+                new_window = [w for w in self.driver.window_handles if w != original_window][0]
+
+                # AGORA SIM fecha a aba antiga (com o popup)
+                self.driver.switch_to.window(original_window)
+                self.driver.close()
+
+                # Volta para a aba nova (que agora é a única)
+                self.driver.switch_to.window(new_window)
+                self._aguardar_pagina_carregada("login")
+                print(f"   - Mudou para nova aba: {self.driver.current_url[:50]}...")
 
             print("   - Verificando login...")
-            
+
             # Tenta fechar qualquer popup remanescente com ESC
             try:
                 from selenium.webdriver.common.action_chains import ActionChains
                 ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                time.sleep(1)
             except:
                 pass
-            
+
             # Verifica se está no dashboard
             if "dashboard" in self.driver.current_url.lower() or "painel" in self.driver.current_url.lower():
                 self.is_logged_in = True
                 print("✅ Login realizado com sucesso!")
+                self._salvar_sessao()
                 return True
-            
+
             try:
-                wait.until(
-                    EC.presence_of_element_located(
-                        (By.XPATH, "//*[contains(text(), 'Dashboard') or contains(text(), 'Painel')]")
+                with self._passo("login.verificar"):
+                    wait.until(
+                        EC.presence_of_element_located(
+                            (By.XPATH, "//*[contains(text(), 'Dashboard') or contains(text(), 'Painel')]")
+                        )
                     )
-                )
                 self.is_logged_in = True
                 print("✅ Login realizado com sucesso!")
+                self._salvar_sessao()
                 return True
             except TimeoutException:
                 print(f"❌ URL atual: {self.driver.current_url}")
@@ -175,6 +455,110 @@ class BitPanelManager:
             traceback.print_exc()
             return False
 
+    def _salvar_sessao(self):
+        """
+        Guarda cookies e localStorage do painel depois de um login completo,
+        para que os próximos navegadores entrem sem refazer o login.
+        """
+        caminho = self.config.BITPANEL_SESSAO_PATH
+        if not caminho:
+            return
+        try:
+            sessao = {
+                "salva_em": time.time(),
+                "cookies": self.driver.get_cookies(),
+                "local_storage": self.driver.execute_script(
+                    "return Object.assign({}, window.localStorage);"
+                ),
+            }
+            temporario = f"{caminho}.tmp"
+            # O arquivo dá acesso ao painel: só o dono do processo pode ler
+            descritor = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+                json.dump(sessao, arquivo)
+            os.replace(temporario, caminho)
+            print(f"💾 Sessão do BitPanel salva ({len(sessao['cookies'])} cookies)")
+        except Exception as e:
+            print(f"⚠️ Não foi possível salvar a sessão do BitPanel: {e}")
+
+    def _descartar_sessao_salva(self):
+        try:
+            os.remove(self.config.BITPANEL_SESSAO_PATH)
+        except OSError:
+            pass
+
+    def _restaurar_sessao(self) -> bool:
+        """
+        Injeta a sessão salva no navegador novo e confere numa página
+        autenticada se o painel ainda a aceita. False = fazer login completo.
+        """
+        caminho = self.config.BITPANEL_SESSAO_PATH
+        if not caminho or not os.path.exists(caminho):
+            return False
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                sessao = json.load(arquivo)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Sessão salva do BitPanel ilegível: {e}")
+            self._descartar_sessao_salva()
+            return False
+
+        idade_horas = (time.time() - sessao.get("salva_em", 0)) / 3600
+        if idade_horas > self.config.BITPANEL_SESSAO_MAX_HORAS:
+            print(f"⌛ Sessão salva do BitPanel tem {idade_horas:.1f}h, fazendo login completo")
+            self._descartar_sessao_salva()
+            return False
+
+        try:
+            print("🍪 Restaurando sessão salva do BitPanel...")
+            # Cookies e localStorage só podem ser gravados estando no domínio do painel
+            self.driver.get(f"{self.config.BITPANEL_URL}/login")
+            for cookie in sessao.get("cookies", []):
+                try:
+                    self.driver.add_cookie(cookie)
+                except WebDriverException:
+                    pass
+            for chave, valor in (sessao.get("local_storage") or {}).items():
+                self.driver.execute_script(
+                    "window.localStorage.setItem(arguments[0], arguments[1]);", chave, valor
+                )
+
+            self.driver.get(self.config.BITPANEL_URL + "/dashboard")
+            # O roteador do painel manda para /login quando a sessão não vale mais
+            self._espera("navegacao").until(
+                lambda driver: "login" in driver.current_url.lower()
+                or driver.find_elements(By.XPATH, "//*[contains(text(), 'Dashboard') or contains(text(), 'Painel')]")
+            )
+            if "login" not in self.driver.current_url.lower():
+                return True
+        except (TimeoutException, WebDriverException) as e:
+            print(f"⚠️ Falha ao restaurar sessão do BitPanel: {e.__class__.__name__}")
+
+        print("🔐 Sessão salva recusada pelo painel, fazendo login completo")
+        self._descartar_sessao_salva()
+        try:
+            self.driver.delete_all_cookies()
+            self.driver.execute_script("window.localStorage.clear();")
+        except WebDriverException:
+            pass
+        return False
+
+    def sessao_ativa(self, recarregar: bool = False) -> bool:
+        """
+        Checagem barata de uma sessão já logada: o navegador responde e não
+        caiu na tela de login. Com `recarregar=True` abre o dashboard antes,
+        para descobrir se o painel expirou a sessão enquanto ela estava parada.
+        """
+        if not self.driver or not self.is_logged_in:
+            return False
+        try:
+            if recarregar:
+                self.driver.get(self.config.BITPANEL_URL + "/dashboard")
+            return "login" not in self.driver.current_url.lower()
+        except WebDriverException as e:
+            print(f"⚠️ Sessão do BitPanel não respondeu: {e.__class__.__name__}")
+            return False
+
     def navegar_para_listas(self):
         """Navega para a página de listas com tratamento de popups"""
         try:
@@ -209,7 +593,7 @@ class BitPanelManager:
 
     def _get_list_info_from_page(self) -> dict:
         """Extrai as informações da lista da página de detalhes."""
-        wait = WebDriverWait(self.driver, 15)
+        wait = self._espera("extracao")
         try:
             user_info_element = wait.until(
                 EC.presence_of_element_located((By.CLASS_NAME, "user-infor"))
@@ -245,114 +629,21 @@ class BitPanelManager:
             print("=" * 60)
 
             # Espera o container 'user-infor' ficar visível
-            info_container = wait.until(
+            wait.until(
                 EC.visibility_of_element_located((By.CLASS_NAME, "user-infor"))
             )
 
             print("[EXTRAÇÃO] ✓ Container encontrado")
 
-            # Pega todos os itens <li> dentro do container
-            list_items = info_container.find_elements(By.TAG_NAME, "li")
-
-            print(f"[EXTRAÇÃO] Encontrados {len(list_items)} campos de informação\n")
-
-            dados_lista = {}
-
-            for i, item in enumerate(list_items, 1):
-                texto_completo = item.text.strip()
-
-                # Ignorar campos vazios ou inúteis
-                if not texto_completo or "clique aqui" in texto_completo.lower():
-                    continue
-
-                print(f"[EXTRAÇÃO] Campo {i}: '{texto_completo}'")
-
-                if ":" in texto_completo:
-                    # Dividir apenas no primeiro ":"
-                    partes = texto_completo.split(":", 1)
-                    if len(partes) == 2:
-                        chave_original = partes[0].strip()
-                        valor_original = partes[1].strip()
-
-                        # ========================================================
-                        # MAPEAMENTO COMPLETO DE TODOS OS CAMPOS DO BITPANEL
-                        # ========================================================
-                        mapeamento_chaves = {
-                            # Usuário
-                            "usuário": "usuario",
-                            "usuario": "usuario",
-                            "usuário iptv": "usuario",
-                            "nome do usuário": "usuario",
-                            "nome do usuario": "usuario",
-                            "username": "usuario",
-                            "user": "usuario",
-                            # Senha
-                            "senha": "senha",
-                            "password": "senha",
-                            "pass": "senha",
-                            # Conexões
-                            "conexões": "conexoes",
-                            "conexoes": "conexoes",
-                            "connections": "conexoes",
-                            "max connections": "conexoes",
-                            "numero de conexões": "conexoes",
-                            "número de conexões": "conexoes",
-                            "máximo de conexões": "conexoes",
-                            # Data de Criação (CRÍTICO)
-                            "data de criação": "criado_em", # <-- CORRIGIDO PARA MINÚSCULAS
-                            "criado": "criado_em",
-                            "data criação": "criado_em",
-                            "data criacao": "criado_em",
-                            "created at": "criado_em",
-                            "created": "criado_em",
-                            "creation date": "criado_em",
-                            # Data de Expiração (CRÍTICO)
-                            "data de validade": "expira_em", # <-- CORRIGIDO PARA MINÚSCULAS
-                            "expira": "expira_em",
-                            "data de expiração": "expira_em",
-                            "data expiracao": "expira_em",
-                            "data expiração": "expira_em",
-                            "validade": "expira_em",
-                            "expires at": "expira_em",
-                            "expires": "expira_em",
-                            "expiration date": "expira_em",
-                            "valid until": "expira_em",
-                            # Plano
-                            "plano": "plano",
-                            "plan": "plano",
-                            "pacote": "plano",
-                            "package": "plano",
-                            "plano de tv": "plano",
-                            "tv plan": "plano",
-                            # Status
-                            "status": "status_bitpanel",
-                            "estado": "status_bitpanel",
-                            "ativo": "status_bitpanel",
-                            "active": "status_bitpanel",
-                            "state": "status_bitpanel",
-                        }
-                        # Normalizar chave (minúsculas, sem espaços extras)
-                        chave_normalizada = chave_original.lower().strip()
-
-                        # Buscar no mapeamento
-                        chave_final = mapeamento_chaves.get(chave_normalizada)
-
-                        # Se não encontrou no mapeamento, criar chave genérica
-                        if not chave_final:
-                            chave_final = (
-                                chave_normalizada.replace(" ", "_")
-                                .replace("ã", "a")
-                                .replace("ç", "c")
-                                .replace("é", "e")
-                            )
-
-                        # Salvar o dado
-                        dados_lista[chave_final] = valor_original
-
-                        # Log do mapeamento
-                        print(
-                            f"  → Mapeado: '{chave_original}' → '{chave_final}' = '{valor_original}'"
-                        )
+            # Todos os pares chave/valor numa única chamada ao navegador
+            # (antes eram um find_elements mais um .text por <li>)
+            inicio = time.perf_counter()
+            pares = self.driver.execute_script(JS_LER_INFO_LISTA) or []
+            dados_lista = mapear_info_lista(pares)
+            print(
+                f"[EXTRAÇÃO] {len(pares)} campos lidos em "
+                f"{(time.perf_counter() - inicio) * 1000:.1f} ms (1 chamada ao navegador)\n"
+            )
 
             print("\n" + "=" * 60)
             print("[EXTRAÇÃO] Dados finais extraídos:")
@@ -394,10 +685,15 @@ class BitPanelManager:
                 body_text = self.driver.find_element(By.TAG_NAME, "body").text
                 print(f"[EXTRAÇÃO]   Texto da página:\n{body_text[:500]}...")
 
-                # Salvar screenshot
+                # Salvar screenshot e o HTML (o HTML pode virar fixture do parser_bitpanel)
                 screenshot_name = f"erro_timeout_extracao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
                 self.driver.save_screenshot(screenshot_name)
                 print(f"[EXTRAÇÃO]   Screenshot salvo: {screenshot_name}")
+                html = self.driver.page_source
+                with open(screenshot_name.replace(".png", ".html"), "w", encoding="utf-8") as arquivo:
+                    arquivo.write(html)
+                for erro in extrair_erros(html):
+                    print(f"[EXTRAÇÃO]   Mensagem do painel: {erro}")
             except:
                 print("[EXTRAÇÃO]   Não foi possível capturar informações da página")
 
@@ -421,6 +717,7 @@ class BitPanelManager:
 
             return None
 
+    @_operacao_medida("criar_lista")
     def criar_lista(
         self, username: str, conexoes: int, duracao_meses: int, headless=False
     ):
@@ -433,186 +730,196 @@ class BitPanelManager:
 
         try:
             print(f"🔧 Iniciando criação da lista para o usuário: {username}")
-            if not self.navegar_para_listas():
-                return None
+            with self._passo("navegar"):
+                if not self.navegar_para_listas():
+                    return None
 
-            wait = WebDriverWait(self.driver, 20)
+            wait = self._espera("formulario")
 
-            # --- PASSO 0: Clicar no botão de adicionar ---
-            print("   - 0. Clicando no botão de adicionar...")
-            add_button = wait.until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "button.v-btn--fab .mdi-plus")
+            with self._passo("abrir_formulario"):
+                # --- PASSO 0: Clicar no botão de adicionar ---
+                print("   - 0. Clicando no botão de adicionar...")
+                add_button = self._espera("navegacao").until(
+                    EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, "button.v-btn--fab .mdi-plus")
+                    )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", add_button)
+                self.driver.execute_script("arguments[0].click();", add_button)
 
-            # --- PASSO 1: Digitar o Nome de Usuário ---
-            print(f"   - 1. Preenchendo nome de usuário: '{username}'")
-            username_field = wait.until(
-                EC.visibility_of_element_located(
-                    (By.XPATH, "//label[contains(text(), 'Nome do usuário')]/../input")
+                # --- PASSO 1: Digitar o Nome de Usuário ---
+                print(f"   - 1. Preenchendo nome de usuário: '{username}'")
+                username_field = wait.until(
+                    EC.visibility_of_element_located(
+                        (By.XPATH, "//label[contains(text(), 'Nome do usuário')]/../input")
+                    )
                 )
-            )
-            username_field.send_keys(username)
+                username_field.send_keys(username)
 
-            # --- PASSO 2: Selecionar o Plano de TV (CORRIGIDO) ---
-            print("   - 2. Selecionando plano de TV...")
+            with self._passo("preencher_formulario"):
+                # --- PASSO 2: Selecionar o Plano de TV (CORRIGIDO) ---
+                print("   - 2. Selecionando plano de TV...")
 
-            # 1. Clica no campo do dropdown para abrir a lista de opções (esta parte já estava correta)
-            plan_tv_dropdown = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[@role='button' and .//label[contains(text(), 'Selecione o plano de tv')]]",
-                    )
-                )
-            )
-            self.driver.execute_script("arguments[0].click();", plan_tv_dropdown)
-
-            # 2. Espera a opção com o TEXTO EXATO aparecer e clica nela (ESTA É A PARTE CORRIGIDA)
-            plan_tv_option = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT']",
-                    )
-                )
-            )
-            self.driver.execute_script("arguments[0].click();", plan_tv_option)
-
-            # --- PASSO 3: Selecionar o Plano de Preço (CORRIGIDO E ROBUSTO) ---
-            print("   - 3. Selecionando plano de preço (Basico)...")
-
-            # 1. Clica no campo do dropdown para abrir a lista de opções
-            plan_price_dropdown = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        # Encontra o campo clicável que contém o label "Selecione o plano"
-                        "//div[@role='button' and .//label[contains(text(), 'Selecione o plano') and not(contains(text(), 'de tv'))]]",
+                # 1. Clica no campo do dropdown para abrir a lista de opções (esta parte já estava correta)
+                plan_tv_dropdown = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[@role='button' and .//label[contains(text(), 'Selecione o plano de tv')]]",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", plan_price_dropdown)
-
-            # 2. Espera a opção com o texto exato "Basico, R$ 30,00" aparecer e clica nela
-            plan_price_option = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Basico, R$ 30,00']",
+                self.driver.execute_script("arguments[0].click();", plan_tv_dropdown)
+
+                # 2. Espera a opção com o TEXTO EXATO aparecer e clica nela (ESTA É A PARTE CORRIGIDA)
+                plan_tv_option = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT']",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", plan_price_option)
+                self.driver.execute_script("arguments[0].click();", plan_tv_option)
 
-            # --- PASSO 4: Configurar Conexões (Versão Final Robusta) ---
-            print(f"   - 4. Configurando para {conexoes} conexão(ões)...")
+                # --- PASSO 3: Selecionar o Plano de Preço (CORRIGIDO E ROBUSTO) ---
+                print("   - 3. Selecionando plano de preço (Basico)...")
 
-            if 1 <= conexoes <= 10:
-                # 1. Encontra o container principal do slider, que é o alvo para as teclas.
-                slider = wait.until(
-                    EC.visibility_of_element_located(
+                # 1. Clica no campo do dropdown para abrir a lista de opções
+                plan_price_dropdown = wait.until(
+                    EC.element_to_be_clickable(
                         (
                             By.XPATH,
-                            "//div[contains(text(), 'Selecione a quantidade de conexões')]/following-sibling::div//div[@role='slider']",
+                            # Encontra o campo clicável que contém o label "Selecione o plano"
+                            "//div[@role='button' and .//label[contains(text(), 'Selecione o plano') and not(contains(text(), 'de tv'))]]",
                         )
                     )
                 )
+                self.driver.execute_script("arguments[0].click();", plan_price_dropdown)
 
-                # 2. Encontra a "trilha" do slider (a barra) para clicar e ativar o componente.
-                slider_track = wait.until(
+                # 2. Espera a opção com o texto exato "Basico, R$ 30,00" aparecer e clica nela
+                plan_price_option = wait.until(
                     EC.element_to_be_clickable(
                         (
                             By.XPATH,
-                            "//div[contains(text(), 'Selecione a quantidade de conexões')]/following-sibling::div//div[contains(@class, 'v-slider__track-container')]",
+                            "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Basico, R$ 30,00']",
                         )
                     )
                 )
+                self.driver.execute_script("arguments[0].click();", plan_price_option)
+
+                # --- PASSO 4: Configurar Conexões (Versão Final Robusta) ---
+                print(f"   - 4. Configurando para {conexoes} conexão(ões)...")
+
+                if 1 <= conexoes <= 10:
+                    # 1. Encontra o container principal do slider, que é o alvo para as teclas.
+                    slider = wait.until(
+                        EC.visibility_of_element_located(
+                            (
+                                By.XPATH,
+                                "//div[contains(text(), 'Selecione a quantidade de conexões')]/following-sibling::div//div[@role='slider']",
+                            )
+                        )
+                    )
 
-                # 3. CLICA na trilha para garantir que o slider está focado.
-                # Usamos JavaScript para um clique mais confiável.
-                self.driver.execute_script("arguments[0].click();", slider_track)
-                time.sleep(0.3)
+                    # 2. Encontra a "trilha" do slider (a barra) para clicar e ativar o componente.
+                    slider_track = wait.until(
+                        EC.element_to_be_clickable(
+                            (
+                                By.XPATH,
+                                "//div[contains(text(), 'Selecione a quantidade de conexões')]/following-sibling::div//div[contains(@class, 'v-slider__track-container')]",
+                            )
+                        )
+                    )
 
-                # 4. Obtém o valor inicial do slider.
-                try:
-                    current_value = int(slider.get_attribute("aria-valuenow"))
-                except (ValueError, TypeError):
-                    current_value = 0
+                    # 3. CLICA na trilha para ativar o slider e dá foco nele via JavaScript,
+                    # em vez de esperar um tempo fixo para o foco "pegar".
+                    self.driver.execute_script("arguments[0].click();", slider_track)
+                    self.driver.execute_script("arguments[0].focus();", slider)
 
-                # 5. Calcula quantos passos para a direita o robô precisa dar.
-                steps_to_move = conexoes - current_value
+                    # 4. Obtém o valor inicial do slider.
+                    try:
+                        current_value = int(slider.get_attribute("aria-valuenow"))
+                    except (ValueError, TypeError):
+                        current_value = 0
 
-                # 6. Pressiona a seta para a direita o número de vezes necessário.
-                if steps_to_move > 0:
-                    print(
-                        f"   - Movendo o slider {steps_to_move} vez(es) para a direita..."
-                    )
-                    for _ in range(steps_to_move):
-                        slider.send_keys(Keys.ARROW_RIGHT)
-                        time.sleep(0.1)
-
-            else:
-                print(
-                    f"AVISO: Número de conexões '{conexoes}' inválido. Deixando o valor padrão."
-                )
+                    # 5. Calcula quantos passos para a direita o robô precisa dar.
+                    steps_to_move = conexoes - current_value
 
-            # --- PASSO 5: Selecionar a Validade em Meses (CORRIGIDO E ROBUSTO) ---
-            print(f"   - 5. Selecionando validade de {duracao_meses} mês(es)...")
+                    # 6. Pressiona a seta para a direita o número de vezes necessário
+                    # e espera o slider refletir o valor final.
+                    if steps_to_move > 0:
+                        print(
+                            f"   - Movendo o slider {steps_to_move} vez(es) para a direita..."
+                        )
+                        slider.send_keys(Keys.ARROW_RIGHT * steps_to_move)
+                        try:
+                            wait.until(
+                                lambda driver: slider.get_attribute("aria-valuenow") == str(conexoes)
+                            )
+                        except TimeoutException:
+                            print(
+                                f"AVISO: Slider ficou em {slider.get_attribute('aria-valuenow')} em vez de {conexoes}."
+                            )
 
-            # 1. Clica no campo do dropdown para abrir a lista de opções
-            validade_dropdown = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        # Seletor refinado para encontrar o campo clicável pela sua função e texto
-                        "//div[@role='button' and .//label[contains(text(), 'Selecione a validade')]]",
+                else:
+                    print(
+                        f"AVISO: Número de conexões '{conexoes}' inválido. Deixando o valor padrão."
                     )
-                )
-            )
-            self.driver.execute_script("arguments[0].click();", validade_dropdown)
 
-            # 2. Espera a opção desejada aparecer e clica nela
-            if 1 <= duracao_meses <= 12:
-                # Determina o texto correto (singular ou plural)
-                texto_opcao = (
-                    f"{duracao_meses} Mês"
-                    if duracao_meses == 1
-                    else f"{duracao_meses} Meses"
-                )
+                # --- PASSO 5: Selecionar a Validade em Meses (CORRIGIDO E ROBUSTO) ---
+                print(f"   - 5. Selecionando validade de {duracao_meses} mês(es)...")
 
-                mes_option = wait.until(
+                # 1. Clica no campo do dropdown para abrir a lista de opções
+                validade_dropdown = wait.until(
                     EC.element_to_be_clickable(
                         (
                             By.XPATH,
-                            f"//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = '{texto_opcao}']",
+                            # Seletor refinado para encontrar o campo clicável pela sua função e texto
+                            "//div[@role='button' and .//label[contains(text(), 'Selecione a validade')]]",
                         )
                     )
                 )
-                self.driver.execute_script("arguments[0].click();", mes_option)
-            else:
-                print(
-                    f"AVISO: Duração '{duracao_meses}' inválida. Deixando o valor padrão."
-                )
+                self.driver.execute_script("arguments[0].click();", validade_dropdown)
+
+                # 2. Espera a opção desejada aparecer e clica nela
+                if 1 <= duracao_meses <= 12:
+                    # Determina o texto correto (singular ou plural)
+                    texto_opcao = (
+                        f"{duracao_meses} Mês"
+                        if duracao_meses == 1
+                        else f"{duracao_meses} Meses"
+                    )
 
-            # --- PASSO 6: Clicar no Botão "Criar" ---
-            print("   - 6. Clicando no botão 'Criar'...")
-            # --- PASSO 6: Clicar no Botão Final "Criar" (Versão Robusta) ---
-            print("   - 6. Clicando no botão 'Criar' para finalizar...")
+                    mes_option = wait.until(
+                        EC.element_to_be_clickable(
+                            (
+                                By.XPATH,
+                                f"//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = '{texto_opcao}']",
+                            )
+                        )
+                    )
+                    self.driver.execute_script("arguments[0].click();", mes_option)
+                else:
+                    print(
+                        f"AVISO: Duração '{duracao_meses}' inválida. Deixando o valor padrão."
+                    )
 
-            # Este seletor é mais direto: encontra um botão que contém um span com o texto "Criar".
-            # Ele não depende do estado da janela (dialog), apenas que o botão esteja clicável.
-            criar_button = wait.until(EC.element_to_be_clickable((
-                By.XPATH,
-                "//button[.//span[contains(text(), 'Criar')]]"
-            )))
-            self.driver.execute_script("arguments[0].click();", criar_button)
+            with self._passo("enviar"):
+                # --- PASSO 6: Clicar no Botão Final "Criar" (Versão Robusta) ---
+                print("   - 6. Clicando no botão 'Criar' para finalizar...")
+
+                # Este seletor é mais direto: encontra um botão que contém um span com o texto "Criar".
+                # Ele não depende do estado da janela (dialog), apenas que o botão esteja clicável.
+                criar_button = wait.until(EC.element_to_be_clickable((
+                    By.XPATH,
+                    "//button[.//span[contains(text(), 'Criar')]]"
+                )))
+                self.driver.execute_script("arguments[0].click();", criar_button)
 
             # --- PASSO 7: Extrair os Dados da Lista Criada ---
             # A função auxiliar fará a espera e a extração
-            dados_finais = self._extrair_dados_lista(wait)
+            with self._passo("extrair"):
+                dados_finais = self._extrair_dados_lista(self._espera("extracao"))
 
             if dados_finais:
                 print(
@@ -629,19 +936,21 @@ class BitPanelManager:
                     "mensagem": "Lista criada, mas falha ao capturar dados.",
                 }
 
-        except TimeoutException as e:
+        except WebDriverException as e:
+            # Timeout, Chrome que caiu ou sessão perdida: falha temporária. Sobe para a
+            # fila de jobs repetir (e o circuito do BitPanel contar) em vez de virar None
             print(
-                f"❌ ERRO DE AUTOMAÇÃO (TIMEOUT): Um elemento não foi encontrado a tempo. Verifique o seletor ou a velocidade da sua internet. Erro: {e}"
+                f"❌ ERRO DE AUTOMAÇÃO ({e.__class__.__name__}): Um elemento não foi encontrado a tempo ou o navegador caiu. Erro: {e}"
             )
-            self.driver.save_screenshot("erro_timeout.png")
-            print("   - Screenshot 'erro_timeout.png' salvo para análise.")
-            return None
+            self._salvar_screenshot("erro_timeout.png")
+            raise
         except Exception as e:
             print(f"❌ ERRO INESPERADO ao criar lista: {e}")
             self.driver.save_screenshot("erro_inesperado.png")
             print("   - Screenshot 'erro_inesperado.png' salvo para análise.")
             return None
 
+    @_operacao_medida("renovar_lista")
     def renovar_lista(self, username: str, duracao_meses: int, headless=False) -> dict:
         """
         Busca um usuário pelo nome e renova sua assinatura.
@@ -655,115 +964,113 @@ class BitPanelManager:
             print(
                 f"🔄 Renovando lista para o usuário: {username} por {duracao_meses} mês(es)"
             )
-            if not self.navegar_para_listas():
-                return {"erro": "Falha ao navegar para listas"}
+            with self._passo("navegar"):
+                if not self.navegar_para_listas():
+                    return {"erro": "Falha ao navegar para listas"}
 
-            wait = WebDriverWait(self.driver, 20)
+            wait = self._espera("formulario")
 
             # --- PASSO 1: Buscar pelo usuário ---
-            print(f"   - 1. Buscando usuário '{username}' na lista...")
-            search_field = wait.until(
-                EC.visibility_of_element_located(
-                    (
-                        By.XPATH,
-                        "//label[contains(text(), 'Buscar por nome')]/following-sibling::input",
-                    )
-                )
-            )
-            search_field.click()
-            search_field.clear()
-            search_field.send_keys(username)
-            search_field.send_keys(Keys.ENTER)
-            time.sleep(2)  # tempo para a tabela atualizar
-
-            # --- PASSO 2a: Clicar no menu sanduíche do usuário ---
-            print("   - 2a. Clicando no menu sanduíche do usuário...")
-            menu_button = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        f"//td[normalize-space(text())='{username}']/following-sibling::td//i[contains(@class,'mdi-dots-vertical')]",
+            with self._passo("buscar"):
+                print(f"   - 1. Buscando usuário '{username}' na lista...")
+                encontrado = self._buscar_usuario_na_tabela(username)
+
+            if not encontrado:
+                print(f"   - ❌ Usuário '{username}' não encontrado nos resultados")
+                return {"erro": f"Usuário '{username}' não encontrado", "nao_encontrado": True}
+
+            with self._passo("abrir_menu"):
+                # --- PASSO 2a: Clicar no menu sanduíche do usuário ---
+                print("   - 2a. Clicando no menu sanduíche do usuário...")
+                menu_button = self._espera("menu").until(
+                    EC.presence_of_element_located(
+                        (
+                            By.XPATH,
+                            f"//td[normalize-space(text())='{username}']/following-sibling::td//i[contains(@class,'mdi-dots-vertical')]",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", menu_button)
-
-            # --- PASSO 2b: Clicar na opção "Renovar" no menu aberto ---
-            print("   - 2b. Clicando na opção 'Renovar'...")
-            renovar_option = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[@role='menuitem']//div[contains(@class,'v-list-item__title') and normalize-space(text())='Renovar']",
+                self.driver.execute_script("arguments[0].click();", menu_button)
+
+                # --- PASSO 2b: Clicar na opção "Renovar" no menu aberto ---
+                print("   - 2b. Clicando na opção 'Renovar'...")
+                renovar_option = self._espera("menu").until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[@role='menuitem']//div[contains(@class,'v-list-item__title') and normalize-space(text())='Renovar']",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", renovar_option)
-
-            # --- PASSO 3: Selecionar plano ---
-            print("   - 3. Selecionando plano de preço (Basico)...")
-            plan_price_dropdown = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[@role='button' and .//label[contains(text(), 'Selecione o plano') and not(contains(text(), 'de tv'))]]",
+                self.driver.execute_script("arguments[0].click();", renovar_option)
+
+            with self._passo("preencher_formulario"):
+                # --- PASSO 3: Selecionar plano ---
+                print("   - 3. Selecionando plano de preço (Basico)...")
+                plan_price_dropdown = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[@role='button' and .//label[contains(text(), 'Selecione o plano') and not(contains(text(), 'de tv'))]]",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", plan_price_dropdown)
+                self.driver.execute_script("arguments[0].click();", plan_price_dropdown)
 
-            plan_price_option = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Basico, R$ 30,00']",
+                plan_price_option = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Basico, R$ 30,00']",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", plan_price_option)
-
-            # --- PASSO 4: Selecionar validade ---
-            print(f"   - 4. Selecionando validade de {duracao_meses} mês(es)...")
-            validade_dropdown = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[@role='button' and .//label[contains(text(), 'Selecione a validade')]]",
+                self.driver.execute_script("arguments[0].click();", plan_price_option)
+
+                # --- PASSO 4: Selecionar validade ---
+                print(f"   - 4. Selecionando validade de {duracao_meses} mês(es)...")
+                validade_dropdown = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[@role='button' and .//label[contains(text(), 'Selecione a validade')]]",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", validade_dropdown)
+                self.driver.execute_script("arguments[0].click();", validade_dropdown)
 
-            texto_opcao = (
-                f"{duracao_meses} Mês"
-                if duracao_meses == 1
-                else f"{duracao_meses} Meses"
-            )
-            mes_option = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        f"//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = '{texto_opcao}']",
+                texto_opcao = (
+                    f"{duracao_meses} Mês"
+                    if duracao_meses == 1
+                    else f"{duracao_meses} Meses"
+                )
+                mes_option = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            f"//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = '{texto_opcao}']",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", mes_option)
-
-            # --- PASSO 5: Clicar no botão Renovar ---
-            print("   - 5. Salvando alterações...")
-            renovar_button = wait.until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//div[contains(@class, 'v-dialog--active')]//span[normalize-space(text())='Renovar']/parent::button",
+                self.driver.execute_script("arguments[0].click();", mes_option)
+
+            with self._passo("enviar"):
+                # --- PASSO 5: Clicar no botão Renovar ---
+                print("   - 5. Salvando alterações...")
+                renovar_button = wait.until(
+                    EC.element_to_be_clickable(
+                        (
+                            By.XPATH,
+                            "//div[contains(@class, 'v-dialog--active')]//span[normalize-space(text())='Renovar']/parent::button",
+                        )
                     )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", renovar_button)
+                self.driver.execute_script("arguments[0].click();", renovar_button)
 
             # --- PASSO 6: Extrair os Dados da Lista Renovada ---
             print("   - 6. Capturando informações atualizadas da lista...")
-            dados_finais = self._extrair_dados_lista(wait)
+            with self._passo("extrair"):
+                dados_finais = self._extrair_dados_lista(self._espera("extracao"))
 
             if dados_finais:
                 print(
@@ -780,18 +1087,20 @@ class BitPanelManager:
                     "mensagem": "Renovação enviada, mas falha ao capturar dados.",
                 }
 
-        except TimeoutException as e:
+        except WebDriverException as e:
+            # Falha temporária (veja criar_lista): quem chama decide se repete
             print(
-                f"❌ ERRO DE AUTOMAÇÃO (TIMEOUT): Um elemento não foi encontrado a tempo. Erro: {e}"
+                f"❌ ERRO DE AUTOMAÇÃO ({e.__class__.__name__}): Um elemento não foi encontrado a tempo. Erro: {e}"
             )
-            self.driver.save_screenshot("erro_timeout_renovacao.png")
-            return {"erro": f"Timeout: {str(e)}"}
+            self._salvar_screenshot("erro_timeout_renovacao.png")
+            raise
         except Exception as e:
             print(f"❌ ERRO INESPERADO ao renovar lista: {e}")
             self.driver.save_screenshot("erro_renovacao.png")
             return {"erro": f"Erro inesperado: {str(e)}"}
 
 
+    @_operacao_medida("criar_teste")
     def criar_teste(self, username: str, headless=False) -> dict:
         """
         Cria um teste de usuário no BitPanel com o nome de usuário fornecido.
@@ -805,66 +1114,72 @@ class BitPanelManager:
             # Navegar para a página de criação de teste, se houver uma URL direta
             # Caso contrário, navegar para o dashboard e clicar no botão 'Criar teste'
             # Assumindo que o botão 'Criar teste' está no dashboard ou em uma página acessível após o login
-            
+
             # Navegar para o dashboard para garantir que o botão esteja visível
-            list_url = f"{self.config.BITPANEL_URL}list"
-            self.driver.get(list_url)
-            print(f"   - Navegando para o dashboard: {list_url}")
-            
-            wait = WebDriverWait(self.driver, 20)
-
-        
-            # --- PASSO 1: Clicar no botão 'Criar teste' ---
-            print("   - 1. Clicando no botão 'Criar teste'...")
-            criar_teste_button = wait.until(
-                EC.element_to_be_clickable(
-                    (By.XPATH, "//button[contains(@class, 'btn-test') and .//span[contains(text(), 'Criar teste')]]")
+            with self._passo("navegar"):
+                list_url = f"{self.config.BITPANEL_URL}list"
+                self.driver.get(list_url)
+                print(f"   - Navegando para o dashboard: {list_url}")
+
+            wait = self._espera("formulario")
+
+            with self._passo("abrir_formulario"):
+                # --- PASSO 1: Clicar no botão 'Criar teste' ---
+                print("   - 1. Clicando no botão 'Criar teste'...")
+                criar_teste_button = self._espera("navegacao").until(
+                    EC.element_to_be_clickable(
+                        (By.XPATH, "//button[contains(@class, 'btn-test') and .//span[contains(text(), 'Criar teste')]]")
+                    )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", criar_teste_button)
-            time.sleep(2) # Esperar o modal/página de criação de teste carregar
+                self.driver.execute_script("arguments[0].click();", criar_teste_button)
 
-            # --- PASSO 2: Escrever o nome de usuário ---
-            print(f"   - 2. Inserindo nome de usuário: {username}")
-            username_field = wait.until(
-                EC.presence_of_element_located((By.XPATH, "//label[contains(text(), 'Nome do usuário')]/following-sibling::input"))
-            )
-            username_field.clear()
-            username_field.send_keys(username)
-
-            # --- PASSO 3.1: Clicar no dropdown 'Selecione o plano de tv' ---
-            print("   - 3.1. Clicando no dropdown 'Selecione o plano de tv'...")
-            plano_tv_dropdown = wait.until(
-                EC.element_to_be_clickable(
-                    (By.XPATH, "//div[@role='button' and .//label[contains(text(), 'Selecione o plano de tv')]]")
+                # --- PASSO 2: Escrever o nome de usuário ---
+                # Espera o modal de criação abrir com o campo visível
+                print(f"   - 2. Inserindo nome de usuário: {username}")
+                username_field = wait.until(
+                    EC.visibility_of_element_located((By.XPATH, "//label[contains(text(), 'Nome do usuário')]/following-sibling::input"))
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", plano_tv_dropdown)
-            time.sleep(1) # Esperar as opções carregarem
-
-            # --- PASSO 3.2: Selecionar a opção 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT' ---
-            print("   - 3.2. Selecionando plano 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT'...")
-            plano_tv_option = wait.until(
-                EC.element_to_be_clickable(
-                    (By.XPATH, "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT']")
+                username_field.clear()
+                username_field.send_keys(username)
+
+            with self._passo("preencher_formulario"):
+                # --- PASSO 3.1: Clicar no dropdown 'Selecione o plano de tv' ---
+                print("   - 3.1. Clicando no dropdown 'Selecione o plano de tv'...")
+                plano_tv_dropdown = wait.until(
+                    EC.element_to_be_clickable(
+                        (By.XPATH, "//div[@role='button' and .//label[contains(text(), 'Selecione o plano de tv')]]")
+                    )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", plano_tv_option)
-            time.sleep(1) # Esperar a seleção ser aplicada
-
-            # --- PASSO 4: Clicar no botão 'Criar' ---
-            print("   - 4. Clicando no botão 'Criar' para finalizar...")
-            criar_button = wait.until(
-                EC.element_to_be_clickable(
-                    (By.XPATH, "//button[contains(@class, 'primary') and .//span[contains(text(), 'Criar')]]")
+                self.driver.execute_script("arguments[0].click();", plano_tv_dropdown)
+
+                # --- PASSO 3.2: Selecionar a opção 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT' ---
+                # A espera por 'clicável' já cobre o carregamento das opções
+                print("   - 3.2. Selecionando plano 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT'...")
+                plano_tv_option = wait.until(
+                    EC.element_to_be_clickable(
+                        (By.XPATH, "//div[contains(@class, 'v-list-item__title') and normalize-space(text()) = 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT']")
+                    )
                 )
-            )
-            self.driver.execute_script("arguments[0].click();", criar_button)
-            time.sleep(3) # Esperar a criação e o carregamento das informações
+                self.driver.execute_script("arguments[0].click();", plano_tv_option)
+
+                # Espera o menu de opções fechar, sinal de que a seleção foi aplicada
+                wait.until(EC.invisibility_of_element(plano_tv_option))
+
+            with self._passo("enviar"):
+                # --- PASSO 4: Clicar no botão 'Criar' ---
+                print("   - 4. Clicando no botão 'Criar' para finalizar...")
+                criar_button = wait.until(
+                    EC.element_to_be_clickable(
+                        (By.XPATH, "//button[contains(@class, 'primary') and .//span[contains(text(), 'Criar')]]")
+                    )
+                )
+                self.driver.execute_script("arguments[0].click();", criar_button)
 
             # --- PASSO 5: Extrair os Dados da Lista Criada ---
+            # _extrair_dados_lista espera o bloco 'user-infor' aparecer
             print("   - 5. Capturando informações do teste criado...")
-            dados_finais = self._extrair_dados_lista(wait)
+            with self._passo("extrair"):
+                dados_finais = self._extrair_dados_lista(self._espera("extracao"))
 
             if dados_finais:
                 print(f"\n🎉 SUCESSO! Teste para '{dados_finais.get('usuario', username)}' foi criado e dados foram capturados.")
@@ -884,6 +1199,89 @@ class BitPanelManager:
             print("   - Screenshot 'erro_inesperado_criar_teste.png' salvo para análise.")
             return {"erro": f"Erro inesperado: {str(e)}"}
 
+    def _maximizar_itens_por_pagina(self):
+        """Escolhe a maior opção de 'itens por página' do rodapé da tabela (em geral 'Todos')."""
+        try:
+            seletor = self._espera("menu").until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, ".v-data-footer__select .v-select__slot"))
+            )
+            self.driver.execute_script("arguments[0].click();", seletor)
+            opcoes = self._espera("menu").until(
+                EC.visibility_of_all_elements_located(
+                    (By.CSS_SELECTOR, ".v-menu__content.menuable__content__active .v-list-item")
+                )
+            )
+            self.driver.execute_script("arguments[0].click();", opcoes[-1])
+            self._aguardar_tabela()
+        except TimeoutException:
+            print("   - ⚠️ Seletor de itens por página não encontrado, usando a paginação padrão")
+
+    def _proxima_pagina(self, primeira_linha: str) -> bool:
+        """Avança a tabela uma página. False quando já está na última."""
+        botoes = self.driver.find_elements(By.CSS_SELECTOR, ".v-data-footer__icons-after button")
+        if not botoes or not botoes[0].is_enabled() or "v-btn--disabled" in (botoes[0].get_attribute("class") or ""):
+            return False
+        self.driver.execute_script("arguments[0].click();", botoes[0])
+        self._aguardar_tabela()
+        # A página mudou quando a primeira linha deixa de ser a anterior
+        self._espera("busca").until(
+            lambda driver: driver.execute_script(
+                "const td = document.querySelector('.v-data-table tbody tr td');"
+                "return td ? (td.innerText || '').trim() : '';"
+            ) != primeira_linha
+        )
+        return True
+
+    @_operacao_medida("extrair_tabela")
+    def extrair_tabela_listas(self, max_paginas: int = 500) -> dict:
+        """
+        Percorre a tabela de /list uma única vez, com o maior tamanho de página,
+        lendo cada página com um só execute_script. Retorna {usuario: dados}
+        com as colunas que a tabela mostra, ou None se a tabela não pôde ser lida.
+        """
+        if not self.login():
+            print("❌ Falha no login. Abortando leitura da tabela.")
+            return None
+
+        try:
+            print("📋 Lendo a tabela completa de listas...")
+            with self._passo("navegar"):
+                if not self.navegar_para_listas():
+                    return None
+                self._aguardar_tabela()
+
+            with self._passo("paginacao"):
+                self._maximizar_itens_por_pagina()
+
+            listas = {}
+            for pagina in range(1, max_paginas + 1):
+                with self._passo("ler_pagina"):
+                    tabela = self.driver.execute_script(JS_LER_TABELA)
+                if not tabela:
+                    print("❌ Tabela de listas não encontrada na página")
+                    return None
+
+                for celulas in tabela["linhas"]:
+                    dados = mapear_linha_tabela(tabela["cabecalhos"], celulas)
+                    if dados.get("usuario"):
+                        listas[dados["usuario"]] = dados
+                print(f"   - Página {pagina}: {len(tabela['linhas'])} linhas ({len(listas)} no total)")
+
+                primeira_linha = tabela["linhas"][0][0] if tabela["linhas"] and tabela["linhas"][0] else ""
+                with self._passo("proxima_pagina"):
+                    if not self._proxima_pagina(primeira_linha):
+                        break
+
+            return listas
+
+        except TimeoutException as e:
+            print(f"❌ ERRO DE AUTOMAÇÃO (TIMEOUT) ao ler a tabela de listas: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ ERRO INESPERADO ao ler a tabela de listas: {e}")
+            return None
+
+    @_operacao_medida("sincronizar")
     def sincronizar_dados_usuario(self, username: str, headless=True) -> dict:
 
         """
@@ -896,80 +1294,67 @@ class BitPanelManager:
 
         try:
             print(f"🔄 Sincronizando dados do usuário: {username}")
-            if not self.navegar_para_listas():
-                return {"erro": "Falha ao navegar para listas"}
+            with self._passo("navegar"):
+                if not self.navegar_para_listas():
+                    return {"erro": "Falha ao navegar para listas"}
 
-            wait = WebDriverWait(self.driver, 20)
+            wait = self._espera("menu")
 
             # --- PASSO 1: Buscar pelo usuário ---
             print(f"   - 1. Buscando usuário '{username}' na lista...")
 
-            try:
-                search_field = wait.until(
-                    EC.visibility_of_element_located(
-                        (
-                            By.XPATH,
-                            "//label[contains(text(), 'Buscar por nome')]/following-sibling::input",
-                        )
-                    )
-                )
-                search_field.click()
-                search_field.clear()
-                search_field.send_keys(username)
-                search_field.send_keys(Keys.ENTER)
-                time.sleep(3)  # tempo para a tabela atualizar
-                print(f"   - Busca realizada, aguardando resultados...")
-            except TimeoutException:
-                print(f"   - ❌ Campo de busca não encontrado")
-                return {"erro": "Campo de busca não encontrado"}
+            with self._passo("buscar"):
+                try:
+                    encontrado = self._buscar_usuario_na_tabela(username)
+                except TimeoutException:
+                    print(f"   - ❌ Campo de busca não encontrado")
+                    return {"erro": "Campo de busca não encontrado"}
 
             # Verificar se o usuário apareceu nos resultados
-            try:
-                usuario_na_tabela = self.driver.find_element(
-                    By.XPATH, f"//td[normalize-space(text())='{username}']"
-                )
-                print(f"   - ✅ Usuário encontrado na tabela")
-            except NoSuchElementException:
+            if not encontrado:
                 print(f"   - ❌ Usuário '{username}' não encontrado nos resultados")
-                return {"erro": f"Usuário '{username}' não encontrado"}
+                return {"erro": f"Usuário '{username}' não encontrado", "nao_encontrado": True}
+            print(f"   - ✅ Usuário encontrado na tabela")
 
-            # --- PASSO 2a: Clicar no menu sanduíche do usuário ---
-            print("   - 2a. Clicando no menu sanduíche do usuário...")
-            try:
-                menu_button = wait.until(
-                    EC.element_to_be_clickable(
-                        (
-                            By.XPATH,
-                            f"//td[normalize-space(text())='{username}']/following-sibling::td//i[contains(@class,'mdi-dots-vertical')]",
+            with self._passo("abrir_menu"):
+                # --- PASSO 2a: Clicar no menu sanduíche do usuário ---
+                print("   - 2a. Clicando no menu sanduíche do usuário...")
+                try:
+                    menu_button = wait.until(
+                        EC.presence_of_element_located(
+                            (
+                                By.XPATH,
+                                f"//td[normalize-space(text())='{username}']/following-sibling::td//i[contains(@class,'mdi-dots-vertical')]",
+                            )
                         )
                     )
-                )
-                self.driver.execute_script("arguments[0].click();", menu_button)
-                print(f"   - ✅ Menu aberto")
-            except TimeoutException:
-                print(f"   - ❌ Menu sanduíche não encontrado")
-                return {"erro": "Menu não encontrado"}
-
-            # --- PASSO 2b: Clicar na opção "Ver informações" no menu aberto ---
-            print("   - 2b. Clicando na opção 'Ver informações'...")
-            try:
-                ver_info_option = wait.until(
-                    EC.element_to_be_clickable(
-                        (
-                            By.XPATH,
-                            "//a[contains(@class, 'v-list-item--link') and .//div[contains(@class,'v-list-item__title') and normalize-space(text())='Ver informações']]",
+                    self.driver.execute_script("arguments[0].click();", menu_button)
+                    print(f"   - ✅ Menu aberto")
+                except TimeoutException:
+                    print(f"   - ❌ Menu sanduíche não encontrado")
+                    return {"erro": "Menu não encontrado"}
+
+                # --- PASSO 2b: Clicar na opção "Ver informações" no menu aberto ---
+                print("   - 2b. Clicando na opção 'Ver informações'...")
+                try:
+                    ver_info_option = wait.until(
+                        EC.element_to_be_clickable(
+                            (
+                                By.XPATH,
+                                "//a[contains(@class, 'v-list-item--link') and .//div[contains(@class,'v-list-item__title') and normalize-space(text())='Ver informações']]",
+                            )
                         )
                     )
-                )
-                self.driver.execute_script("arguments[0].click();", ver_info_option)
-                print(f"   - ✅ Navegando para página de informações")
-            except TimeoutException:
-                print(f"   - ❌ Opção 'Ver informações' não encontrada")
-                return {"erro": "Opção 'Ver informações' não encontrada"}
+                    self.driver.execute_script("arguments[0].click();", ver_info_option)
+                    print(f"   - ✅ Navegando para página de informações")
+                except TimeoutException:
+                    print(f"   - ❌ Opção 'Ver informações' não encontrada")
+                    return {"erro": "Opção 'Ver informações' não encontrada"}
 
             # --- PASSO 3: Extrair os Dados da Lista ---
             print("   - 3. Aguardando e capturando informações da lista...")
-            dados_finais = self._extrair_dados_lista(wait)
+            with self._passo("extrair"):
+                dados_finais = self._extrair_dados_lista(self._espera("extracao"))
 
             if dados_finais:
                 print(f"\n✅ SUCESSO! Dados do usuário '{username}' sincronizados.")
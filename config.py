@@ -32,6 +32,21 @@ class Config:
     WHATSAPP_PORT = 5000
     FLASK_HOST = '0.0.0.0'
     DATABASE_PATH = 'iptv_system.db'
+    # Tabelas de muita escrita ficam em arquivos próprios, anexados ao banco principal
+    DATABASE_LOGS_PATH = os.getenv('DATABASE_LOGS_PATH', 'iptv_logs.db')
+    DATABASE_CONVERSAS_PATH = os.getenv('DATABASE_CONVERSAS_PATH', 'iptv_conversas.db')
+    # 'arquivo' (padrão) ou 'memoria' (banco :memory: compartilhado, para testes e benchmarks)
+    DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'arquivo')
+    # Escritas: cada tentativa espera o lock até SQLITE_ESCRITA_TIMEOUT segundos;
+    # entre tentativas há um backoff exponencial com jitter a partir de ESPERA_BASE
+    SQLITE_ESCRITA_TENTATIVAS = int(os.getenv('SQLITE_ESCRITA_TENTATIVAS', '5'))
+    SQLITE_ESCRITA_TIMEOUT = float(os.getenv('SQLITE_ESCRITA_TIMEOUT', '2'))
+    SQLITE_ESCRITA_ESPERA_BASE = 0.05
+    # Máximo de entradas do índice de clientes em memória (por telefone + por usuário)
+    INDICE_CLIENTES_MAX = int(os.getenv('INDICE_CLIENTES_MAX', '5000'))
+    # Escritas de outro processo (ex.: outro worker do gunicorn) chegam ao índice
+    # no máximo depois destes segundos (0 = confere o log de alterações em toda busca)
+    INDICE_CLIENTES_CONFERIR_SEGUNDOS = float(os.getenv('INDICE_CLIENTES_CONFERIR_SEGUNDOS', '1'))
     SECRET_KEY = 'iptv_secret_key_2024_secure'
     LINK_ACESSO_DEFAULT = 'http://play.biturl.vip'
     
@@ -46,4 +61,109 @@ class Config:
     PLANO_DEFAULT = 'Full HD + H265 + HD + SD + VOD + Adulto + LGBT'
 
     TEST_MODE = os.getenv('TEST_MODE', 'False').lower() in ('true', '1', 't')
-    
\ No newline at end of file
+
+    # --- Manutenção ---
+    # Conversas sem interação há mais dias que isso são apagadas pelo varredor
+    CONVERSAS_RETENCAO_DIAS = int(os.getenv('CONVERSAS_RETENCAO_DIAS', '30'))
+    VARREDOR_INTERVALO_SEGUNDOS = int(os.getenv('VARREDOR_INTERVALO_SEGUNDOS', '3600'))
+    VARREDOR_LOTE = 500
+    VARREDOR_TEMPO_MAX_SEGUNDOS = 2.0
+    # Por quantos dias o log de alterações (CDC) é mantido
+    ALTERACOES_RETENCAO_DIAS = int(os.getenv('ALTERACOES_RETENCAO_DIAS', '7'))
+    # Listas expiradas há mais que isso (e testes mais velhos que ARQUIVO_TESTES_DIAS) vão para o arquivo
+    ARQUIVO_EXPIRADAS_DIAS = int(os.getenv('ARQUIVO_EXPIRADAS_DIAS', '365'))
+    ARQUIVO_TESTES_DIAS = int(os.getenv('ARQUIVO_TESTES_DIAS', '30'))
+    ARQUIVADOR_INTERVALO_SEGUNDOS = int(os.getenv('ARQUIVADOR_INTERVALO_SEGUNDOS', '86400'))
+    # Lock que garante um só processo com as tarefas em segundo plano (veja dashboard.iniciar_tarefas)
+    TAREFAS_LOCK_PATH = os.getenv('TAREFAS_LOCK_PATH', 'tarefas.lock')
+    # Os públicos de avisos são recalculados em segundo plano a cada intervalo; a página de
+    # avisos só força um recálculo se o último for mais velho que SEGMENTOS_IDADE_MAX_MINUTOS
+    SEGMENTOS_INTERVALO_SEGUNDOS = int(os.getenv('SEGMENTOS_INTERVALO_SEGUNDOS', '300'))
+    SEGMENTOS_IDADE_MAX_MINUTOS = int(os.getenv('SEGMENTOS_IDADE_MAX_MINUTOS', '15'))
+    
+    # --- Pool de sessões do BitPanel ---
+    # Navegadores já logados mantidos abertos entre uma automação e outra
+    BITPANEL_POOL_TAMANHO = int(os.getenv('BITPANEL_POOL_TAMANHO', '2'))
+    # Sessão parada há mais que isso recarrega o dashboard antes de ser entregue
+    BITPANEL_POOL_VERIFICAR_APOS = int(os.getenv('BITPANEL_POOL_VERIFICAR_APOS', '300'))
+    # Quanto tempo uma automação espera por uma sessão livre
+    BITPANEL_POOL_ESPERA_SEGUNDOS = int(os.getenv('BITPANEL_POOL_ESPERA_SEGUNDOS', '180'))
+    # Quantas sessões abrir logo que o sistema sobe (0 = só sob demanda)
+    BITPANEL_POOL_AQUECER = int(os.getenv('BITPANEL_POOL_AQUECER', '1'))
+
+    # --- Automação do BitPanel ---
+    # 'selenium' (navegador, padrão) ou 'api' (HTTP direto nas rotas JSON do painel, ver bitpanel_api.py).
+    # ATENÇÃO: as rotas do backend 'api' não foram verificadas contra o painel real, só contra o mock
+    BITPANEL_BACKEND = os.getenv('BITPANEL_BACKEND', 'selenium')
+    BITPANEL_API_URL = os.getenv('BITPANEL_API_URL')  # vazio = mesmo endereço de BITPANEL_URL
+    BITPANEL_API_TIMEOUT = float(os.getenv('BITPANEL_API_TIMEOUT', '15'))
+    # Timeout (segundos) das esperas explícitas da automação, por tipo de passo
+    BITPANEL_TIMEOUTS = {
+        "padrao": int(os.getenv('BITPANEL_TIMEOUT_PADRAO', '20')),
+        "login": int(os.getenv('BITPANEL_TIMEOUT_LOGIN', '30')),
+        "navegacao": int(os.getenv('BITPANEL_TIMEOUT_NAVEGACAO', '20')),
+        "busca": int(os.getenv('BITPANEL_TIMEOUT_BUSCA', '15')),
+        "menu": int(os.getenv('BITPANEL_TIMEOUT_MENU', '10')),
+        "formulario": int(os.getenv('BITPANEL_TIMEOUT_FORMULARIO', '15')),
+        "extracao": int(os.getenv('BITPANEL_TIMEOUT_EXTRACAO', '20')),
+    }
+    # Cookies e localStorage do painel salvos após o login ('' desliga) e por quanto tempo valem
+    BITPANEL_SESSAO_PATH = os.getenv('BITPANEL_SESSAO_PATH', 'bitpanel_sessao.json')
+    BITPANEL_SESSAO_MAX_HORAS = int(os.getenv('BITPANEL_SESSAO_MAX_HORAS', '12'))
+    # Sincronização em massa: navegadores em paralelo e limite global de operações por segundo no painel
+    SYNC_WORKERS = int(os.getenv('SYNC_WORKERS', '3'))
+    SYNC_TAXA_POR_SEGUNDO = float(os.getenv('SYNC_TAXA_POR_SEGUNDO', '1'))
+    # Chrome da automação sem imagens, fontes, mídia, extensões e tráfego de fundo
+    BITPANEL_PERFIL_ENXUTO = os.getenv('BITPANEL_PERFIL_ENXUTO', 'True').lower() in ('true', '1', 't')
+    # 'eager' (DOMContentLoaded), 'normal' (load completo) ou 'none'
+    BITPANEL_PAGE_LOAD_STRATEGY = os.getenv('BITPANEL_PAGE_LOAD_STRATEGY', 'eager')
+
+    # --- Fila de jobs do BitPanel ---
+    # Threads que executam criações, renovações e testes (padrão: uma por sessão do pool)
+    JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', os.getenv('BITPANEL_POOL_TAMANHO', '2')))
+    # Lease do job em execução, renovado a cada terço enquanto o handler roda; se o processo
+    # cair e o lease vencer sem renovação, o job é considerado perdido e volta para a fila
+    JOBS_LEASE_SEGUNDOS = int(os.getenv('JOBS_LEASE_SEGUNDOS', '600'))
+    JOBS_MAX_TENTATIVAS = int(os.getenv('JOBS_MAX_TENTATIVAS', '3'))
+    # Espera base antes de repetir um job que falhou (dobra a cada tentativa)
+    JOBS_REPETIR_APOS_SEGUNDOS = int(os.getenv('JOBS_REPETIR_APOS_SEGUNDOS', '30'))
+    # Sem aviso de job novo, os workers olham a tabela a cada tantos segundos
+    JOBS_INTERVALO_SEGUNDOS = int(os.getenv('JOBS_INTERVALO_SEGUNDOS', '5'))
+
+    # --- Agendador de sincronização incremental ---
+    # Sincroniza aos poucos quem mais precisa (nunca sincronizado, expirando, renovado, desatualizado)
+    SYNC_AGENDADOR_ATIVO = os.getenv('SYNC_AGENDADOR_ATIVO', 'True').lower() in ('true', '1', 't')
+    SYNC_AGENDADOR_INTERVALO_SEGUNDOS = int(os.getenv('SYNC_AGENDADOR_INTERVALO_SEGUNDOS', '300'))
+    # Máximo de sincronizações por hora contra o BitPanel e por rodada
+    SYNC_AGENDADOR_POR_HORA = int(os.getenv('SYNC_AGENDADOR_POR_HORA', '60'))
+    SYNC_AGENDADOR_LOTE = int(os.getenv('SYNC_AGENDADOR_LOTE', '10'))
+    SYNC_AGENDADOR_DESATUALIZADO_HORAS = int(os.getenv('SYNC_AGENDADOR_DESATUALIZADO_HORAS', '24'))
+    # Listas expirando em até X dias são ressincronizadas se o último sync tiver mais de Y horas
+    SYNC_AGENDADOR_EXPIRANDO_DIAS = int(os.getenv('SYNC_AGENDADOR_EXPIRANDO_DIAS', '3'))
+    SYNC_AGENDADOR_EXPIRANDO_HORAS = int(os.getenv('SYNC_AGENDADOR_EXPIRANDO_HORAS', '6'))
+    # Quanto tempo não tentar de novo quem o painel não encontrou, ou quem deu outro erro
+    SYNC_AGENDADOR_PAUSA_NAO_ENCONTRADO_HORAS = int(os.getenv('SYNC_AGENDADOR_PAUSA_NAO_ENCONTRADO_HORAS', '24'))
+    SYNC_AGENDADOR_PAUSA_FALHA_MINUTOS = int(os.getenv('SYNC_AGENDADOR_PAUSA_FALHA_MINUTOS', '60'))
+
+    # --- Tempos dos passos da automação ---
+    # Grava cada passo (login, navegar, buscar, ...) de cada operação do BitPanel para o p50/p95 do dashboard
+    BITPANEL_REGISTRAR_TEMPOS = os.getenv('BITPANEL_REGISTRAR_TEMPOS', 'True').lower() in ('true', '1', 't')
+    TEMPOS_PASSOS_RETENCAO_DIAS = int(os.getenv('TEMPOS_PASSOS_RETENCAO_DIAS', '30'))
+    # Janela (dias) usada no cálculo do p50/p95 do dashboard
+    TEMPOS_PASSOS_JANELA_DIAS = int(os.getenv('TEMPOS_PASSOS_JANELA_DIAS', '7'))
+
+    # --- Saúde do BitPanel (sonda e disjuntor) ---
+    # GET simples no painel a cada intervalo, sem navegador; o dashboard mostra o último resultado
+    BITPANEL_SONDA_ATIVA = os.getenv('BITPANEL_SONDA_ATIVA', 'True').lower() in ('true', '1', 't')
+    BITPANEL_SONDA_URL = os.getenv('BITPANEL_SONDA_URL')  # vazio = BITPANEL_URL
+    BITPANEL_SONDA_INTERVALO_SEGUNDOS = int(os.getenv('BITPANEL_SONDA_INTERVALO_SEGUNDOS', '60'))
+    BITPANEL_SONDA_TIMEOUT = float(os.getenv('BITPANEL_SONDA_TIMEOUT', '10'))
+    # Falhas seguidas (sonda ou jobs) que abrem o circuito, e quanto tempo ele fica aberto
+    BITPANEL_CIRCUITO_FALHAS = int(os.getenv('BITPANEL_CIRCUITO_FALHAS', '3'))
+    BITPANEL_CIRCUITO_ESPERA_SEGUNDOS = int(os.getenv('BITPANEL_CIRCUITO_ESPERA_SEGUNDOS', '120'))
+
+    # --- Reserva do usuário IPTV na compra ---
+    # Quanto tempo o nome escolhido fica reservado durante a conversa e o PIX,
+    # e por quanto tempo depois do pagamento aprovado (até a fila criar a lista)
+    RESERVA_USUARIO_MINUTOS = int(os.getenv('RESERVA_USUARIO_MINUTOS', '30'))
+    RESERVA_USUARIO_PAGO_HORAS = int(os.getenv('RESERVA_USUARIO_PAGO_HORAS', '24'))
@@ -0,0 +1,96 @@
+# contencao.py - Escritas no SQLite com retentativa e métricas de lock por ponto de chamada
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from config import Config
+
+
+def erro_de_lock(erro: Exception) -> bool:
+    """True para os erros que significam 'outro escritor está com o lock'."""
+    mensagem = str(erro).lower()
+    return isinstance(erro, sqlite3.OperationalError) and ("locked" in mensagem or "busy" in mensagem)
+
+
+class MedidorContencao:
+    """Contadores de disputa pelo lock de escrita, separados por ponto de chamada."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locais: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(self, local: str, espera: float, ocupados: int, falhou: bool):
+        with self._lock:
+            dados = self._locais.setdefault(local, {
+                "escritas": 0,
+                "eventos_ocupado": 0,
+                "falhas": 0,
+                "espera_total": 0.0,
+                "espera_maxima": 0.0,
+            })
+            dados["escritas"] += 1
+            dados["eventos_ocupado"] += ocupados
+            dados["falhas"] += 1 if falhou else 0
+            dados["espera_total"] += espera
+            dados["espera_maxima"] = max(dados["espera_maxima"], espera)
+
+    def metricas(self) -> Dict[str, Dict[str, Any]]:
+        """Por ponto de chamada, ordenado pelo tempo total esperando o lock."""
+        with self._lock:
+            itens = sorted(self._locais.items(), key=lambda item: item[1]["espera_total"], reverse=True)
+            return {
+                local: {
+                    "escritas": dados["escritas"],
+                    "eventos_ocupado": dados["eventos_ocupado"],
+                    "falhas": dados["falhas"],
+                    "espera_total_ms": round(dados["espera_total"] * 1000, 2),
+                    "espera_maxima_ms": round(dados["espera_maxima"] * 1000, 2),
+                }
+                for local, dados in itens
+            }
+
+
+medidor_contencao = MedidorContencao()
+
+
+def executar_escrita(abrir_conexao: Callable[[], sqlite3.Connection], operacao: Callable[[sqlite3.Connection], Any],
+                     local: str, tentativas: int = None, espera_base: float = None) -> Any:
+    """
+    Roda `operacao(conn)` numa transação `BEGIN IMMEDIATE`: o lock de escrita é
+    pego logo no início, então a disputa aparece no BEGIN e não no meio da
+    operação. Se o banco estiver ocupado, desfaz, espera um backoff exponencial
+    com jitter e tenta de novo. Depois da última tentativa, o erro sobe.
+    """
+    tentativas = tentativas or Config.SQLITE_ESCRITA_TENTATIVAS
+    espera_base = espera_base or Config.SQLITE_ESCRITA_ESPERA_BASE
+    espera = 0.0
+    ocupados = 0
+
+    for tentativa in range(tentativas):
+        conn = abrir_conexao()
+        inicio = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            espera += time.perf_counter() - inicio
+            resultado = operacao(conn)
+            conn.commit()
+            medidor_contencao.registrar(local, espera, ocupados, falhou=False)
+            return resultado
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not erro_de_lock(e):
+                raise
+            espera += time.perf_counter() - inicio
+            ocupados += 1
+            if tentativa == tentativas - 1:
+                medidor_contencao.registrar(local, espera, ocupados, falhou=True)
+                print(f"❌ [DB] Lock de escrita não obtido em '{local}' após {tentativas} tentativas")
+                raise
+            pausa = random.uniform(0, espera_base * (2 ** tentativa))
+            time.sleep(pausa)
+            espera += pausa
+        finally:
+            conn.close()
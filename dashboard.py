@@ -4,12 +4,18 @@ from datetime import datetime, timedelta
 import json
 import os
 import sqlite3
+import uuid
 from config import Config
-from database import db
+from database import db, db_leitura, normalizar_telefone
+from contencao import medidor_contencao
 
 from whatsapp_bot import enviar_mensagem_personalizada
 from mercpag import mercado_pago
 from bitpanel_automation import BitPanelManager
+from sessoes_bitpanel import pool_bitpanel, SessaoIndisponivel
+from sincronizacao import agendador_sincronizacao
+from fila_jobs import fila_jobs
+from saude_bitpanel import circuito_bitpanel, sonda_bitpanel
 import time
 import os
 
@@ -21,6 +27,64 @@ app.secret_key = Config.SECRET_KEY
 from whatsapp_bot import whatsapp_blueprint
 app.register_blueprint(whatsapp_blueprint)
 
+from manutencao import varredor_conversas, arquivador_listas, atualizador_segmentos
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, vale o primeiro iniciar_tarefas()
+    fcntl = None
+
+# Arquivo aberto e travado pelo processo dono das tarefas, mantido até ele sair
+_lock_tarefas = None
+
+
+def iniciar_tarefas() -> bool:
+    """
+    Sobe as tarefas em segundo plano: manutenção, pool do BitPanel, fila de
+    jobs, sonda e agendador de sincronização. Nada disso roda no import do
+    dashboard — o reloader do Flask e cada worker do gunicorn importam o app
+    de novo, e cada cópia abriria seus próprios Chromes, workers e disjuntor.
+    Quem chama é o main.py (só no processo que atende, com o reloader) e o
+    gunicorn.conf.py. Só o processo que pegar o lock de TAREFAS_LOCK_PATH as
+    executa; nos outros retorna False e eles só atendem requisições (os jobs
+    que enfileiram são executados pelo dono do lock).
+    """
+    global _lock_tarefas
+    if _lock_tarefas is not None:
+        return True
+    arquivo = open(Config.TAREFAS_LOCK_PATH, "w")
+    if fcntl is not None:
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            print(f"ℹ️ [TAREFAS] Outro processo já executa as tarefas em segundo plano (pid {os.getpid()} só atende)")
+            return False
+    _lock_tarefas = arquivo
+
+    # Tarefas de manutenção em segundo plano
+    varredor_conversas.iniciar()
+    arquivador_listas.iniciar()
+    atualizador_segmentos.iniciar()
+
+    # Sessões do BitPanel já logadas antes do primeiro pagamento chegar
+    if Config.BITPANEL_POOL_AQUECER and Config.BITPANEL_USER and Config.BITPANEL_PASS:
+        pool_bitpanel.aquecer_em_segundo_plano()
+
+    # Workers que executam as criações, renovações e testes enfileirados
+    fila_jobs.iniciar()
+
+    # Disponibilidade do painel em cache (e disjuntor das automações), sem login a cada acesso
+    if Config.BITPANEL_SONDA_ATIVA and sonda_bitpanel.url:
+        sonda_bitpanel.iniciar()
+
+    # Sincronização incremental: mantém os dados frescos sem varrer todos os clientes
+    if Config.SYNC_AGENDADOR_ATIVO and Config.BITPANEL_USER and Config.BITPANEL_PASS:
+        agendador_sincronizacao.iniciar()
+
+    print(f"🚀 [TAREFAS] Tarefas em segundo plano iniciadas no pid {os.getpid()}")
+    return True
+
 # Template para redirecionamento com JavaScript ULTRA ROBUSTO
 REDIRECT_TEMPLATE = """
 <!DOCTYPE html>
@@ -70,6 +134,41 @@ REDIRECT_TEMPLATE = """
 </html>
 """
 
+# Página de espera de um job da fila do BitPanel: consulta /api/jobs/<id> até ele terminar
+JOB_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Aguardando o BitPanel...</title>
+    <meta charset="utf-8">
+</head>
+<body>
+    <div style="text-align: center; padding: 50px; font-family: Arial, sans-serif;">
+        <h3>{{ message }}</h3>
+        <p id="estado">Estado: {{ job.estado }} (tentativa {{ job.tentativas }}/{{ job.max_tentativas }})</p>
+        <p><a href="{{ url_for('listar_clientes') }}">Voltar para clientes</a> (o job continua na fila)</p>
+        <script>
+            // Consulta o job até ele terminar; aí recarrega para a rota mostrar o resultado
+            const timer = setInterval(function() {
+                fetch("{{ url_for('api_job', job_id=job.id) }}", {cache: "no-store"})
+                    .then(function(resposta) { return resposta.json(); })
+                    .then(function(job) {
+                        document.getElementById("estado").textContent =
+                            "Estado: " + job.estado + " (tentativa " + job.tentativas + "/" + job.max_tentativas + ")";
+                        if (job.estado === "concluido" || job.estado === "falhou") {
+                            clearInterval(timer);
+                            window.location.reload();
+                        }
+                    })
+                    .catch(function(erro) { console.log("Erro ao consultar o job:", erro); });
+            }, 2000);
+        </script>
+    </div>
+</body>
+</html>
+"""
+
+
 def add_no_cache_headers(response):
     """Adiciona headers para desabilitar cache completamente"""
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
@@ -88,10 +187,7 @@ def after_request(response):
 def gerenciar_templates_page():
     """Página para gerenciar os templates de avisos"""
     try:
-        conn = db.get_connection()
-        templates_raw = conn.execute("SELECT * FROM templates_avisos ORDER BY nome ASC").fetchall()
-        conn.close()
-        templates = [dict(t) for t in templates_raw]
+        templates = db_leitura.get_templates_ordenados_por_nome()
         return render_template("gerenciar_templates.html", templates=templates)
     except Exception as e:
         flash(f"Erro ao carregar templates: {str(e)}", "error")
@@ -104,13 +200,15 @@ def index():
         print("🏠 [DEBUG] Carregando página inicial do dashboard...")
         
         # Obter estatísticas
-        stats = db.get_estatisticas()
+        stats = db_leitura.get_estatisticas()
         print(f"📊 [DEBUG] Estatísticas obtidas: {stats}")
         
         # Dados extras para o dashboard
         stats["link_atual"] = db.get_config("link_acesso", Config.LINK_ACESSO_DEFAULT)
         stats["preco_mes"] = db.get_config("preco_mes", str(Config.PRECO_MES_DEFAULT))
         stats["preco_conexao"] = db.get_config("preco_conexao", str(Config.PRECO_CONEXAO_DEFAULT))
+        stats["bitpanel"] = sonda_bitpanel.status()
+        stats["bitpanel_online"] = stats["bitpanel"]["online"]
         
         response = make_response(render_template("dashboard.html", stats=stats))
         return add_no_cache_headers(response)
@@ -127,23 +225,7 @@ def listar_clientes():
     try:
         print("👥 [DEBUG] Carregando lista de clientes...")
         
-        conn = db.get_connection()
-        clientes = conn.execute("""
-            SELECT c.*, 
-                   CASE 
-                       WHEN c.data_expiracao > datetime("now") THEN "Ativo"
-                       WHEN c.data_expiracao IS NULL THEN "Sem Lista"
-                       ELSE "Expirado"
-                   END as status_lista
-            FROM clientes c
-            ORDER BY c.created_at DESC  
-            """).fetchall()
-        conn.close()
-        
-        clientes_list = []
-        for cliente in clientes:
-            cliente_dict = dict(cliente)
-            clientes_list.append(cliente_dict)
+        clientes_list = db_leitura.listar_clientes_com_status_lista()
         
         print(f"👥 [DEBUG] {len(clientes_list)} clientes carregados")
         
@@ -162,70 +244,37 @@ def listar_clientes():
     
 @app.route("/api/templates", methods=["GET", "POST"])
 def api_gerenciar_templates():
-    conn = db.get_connection()
-    try:
-        if request.method == "GET":
-            templates_raw = conn.execute("SELECT * FROM templates_avisos ORDER BY nome ASC").fetchall()
-            templates = [dict(t) for t in templates_raw]
-            return jsonify(templates)
-
-        elif request.method == "POST":
-            data = request.json
-            nome = data.get("nome")
-            assunto = data.get("assunto")
-            corpo = data.get("corpo")
-
-            if not nome or not corpo:
-                return jsonify({"error": "Nome e corpo são obrigatórios"}), 400
-            
-            # Usar INSERT OR REPLACE para simplificar a criação/atualização
-            conn.execute(
-                "INSERT OR REPLACE INTO templates_avisos (nome, assunto, corpo) VALUES (?, ?, ?)",
-                (nome, assunto, corpo)
-            )
-            conn.commit()
-            return jsonify({"message": "Template salvo com sucesso!"}), 201
-    finally:
-        conn.close()
+    if request.method == "GET":
+        return jsonify(db_leitura.get_templates_ordenados_por_nome())
+
+    data = request.json
+    nome = data.get("nome")
+    assunto = data.get("assunto")
+    corpo = data.get("corpo")
+
+    if not nome or not corpo:
+        return jsonify({"error": "Nome e corpo são obrigatórios"}), 400
+
+    # INSERT OR REPLACE para simplificar a criação/atualização
+    db.salvar_template(nome, assunto, corpo)
+    return jsonify({"message": "Template salvo com sucesso!"}), 201
 
 @app.route("/api/templates/<nome_template>", methods=["DELETE"])
 def api_deletar_template(nome_template):
-    conn = db.get_connection()
-    try:
-        cursor = conn.execute("DELETE FROM templates_avisos WHERE nome = ?", (nome_template,))
-        conn.commit()
-        if cursor.rowcount > 0:
-            return jsonify({"message": "Template excluído com sucesso!"})
-        else:
-            return jsonify({"error": "Template não encontrado"}), 404
-    finally:
-        conn.close()
+    if db.delete_template(nome_template):
+        return jsonify({"message": "Template excluído com sucesso!"})
+    else:
+        return jsonify({"error": "Template não encontrado"}), 404
 
 @app.route("/api/contar-clientes/<tipo>")
 def api_contar_clientes(tipo):
     """API para obter a contagem de clientes por tipo para a página de avisos."""
     try:
-        conn = db.get_connection()
-        count = 0
-        
-        if tipo == "ativos":
-            result = conn.execute('SELECT COUNT(DISTINCT telefone) FROM clientes WHERE data_expiracao > ?', (datetime.now(),)).fetchone()
-            count = result[0] if result else 0
-        elif tipo == "a_vencer": # <-- ALTERADO
-            data_limite = datetime.now() + timedelta(days=7)
-            result = conn.execute('SELECT COUNT(DISTINCT telefone) FROM clientes WHERE data_expiracao BETWEEN ? AND ?', (datetime.now(), data_limite)).fetchone()
-            count = result[0] if result else 0
-        elif tipo == "expirados": # <-- NOVO
-            result = conn.execute("SELECT COUNT(DISTINCT telefone) FROM clientes WHERE data_expiracao IS NOT NULL AND data_expiracao < datetime('now')").fetchone()
-            count = result[0] if result else 0
-        elif tipo == "todos":
-            result = conn.execute('SELECT COUNT(DISTINCT telefone) FROM clientes WHERE telefone IS NOT NULL').fetchone()
-            count = result[0] if result else 0
-        else:
-            conn.close()
+        db.atualizar_segmentos_se_velhos(Config.SEGMENTOS_IDADE_MAX_MINUTOS)
+        count = db_leitura.contar_clientes_por_tipo(tipo)
+        if count is None:
             return jsonify({"error": "Tipo inválido"}), 400
-            
-        conn.close()
+
         return jsonify({"count": count})
 
     except Exception as e:
@@ -318,24 +367,19 @@ def sincronizar_cliente(cliente_id):
         
         print(f"📋 [SYNC] Cliente local antes da sync: {cliente_local}")
         
-        from bitpanel_automation import BitPanelManager
-        
-        manager = BitPanelManager()
-        
-        # Fazer login no BitPanel
-        if not manager.login(headless=True):
-            print(f"❌ [SYNC] Falha no login do BitPanel")
+        # Sincronizar dados do usuário com uma sessão já logada do pool
+        try:
+            with pool_bitpanel.sessao() as manager:
+                dados_sync = manager.sincronizar_dados_usuario(usuario_iptv, headless=True)
+        except SessaoIndisponivel as e:
+            print(f"❌ [SYNC] Sessão do BitPanel indisponível: {e}")
             flash("Erro ao conectar com o BitPanel", "error")
             return redirect(url_for("gerenciar_cliente", cliente_id=cliente_id))
-        
-        # Sincronizar dados do usuário
-        dados_sync = manager.sincronizar_dados_usuario(usuario_iptv, headless=True)
         print(f"📥 [SYNC] Dados recebidos do BitPanel: {dados_sync}")
         
         if "erro" in dados_sync:
             print(f"❌ [SYNC] Erro na sincronização: {dados_sync['erro']}")
             flash(f"Erro na sincronização: {dados_sync['erro']}", "error")
-            manager.close()
             return redirect(url_for("gerenciar_cliente", cliente_id=cliente_id))
         
         # ATUALIZAR O BANCO DE DADOS
@@ -365,8 +409,6 @@ def sincronizar_cliente(cliente_id):
                 print(f"ℹ️ [SYNC] Nenhuma mudança detectada - dados já estavam atualizados")
                 flash(f"Dados sincronizados - nenhuma mudança necessária", "info")
             
-            manager.close()
-            
             # FORÇAR RECARREGAMENTO COM CACHE BUSTING
             timestamp = int(time.time())
             redirect_url = url_for("listar_clientes") + f"?sync_success={timestamp}&user={usuario_iptv}"
@@ -421,8 +463,6 @@ def sincronizar_cliente(cliente_id):
             print(f"❌ [SYNC] Falha ao salvar dados no banco")
             flash(f"Falha ao salvar dados sincronizados no banco", "error")
         
-        manager.close()
-        
     except Exception as e:
         print(f"❌ [SYNC] Erro crítico na sincronização: {str(e)}")
         import traceback
@@ -568,43 +608,34 @@ def adicionar_cliente():
                 flash("O campo Telefone é obrigatório.", "error")
                 return render_template("adicionar_cliente.html")
 
-            conn = db.get_connection()
-            try:
-                # A única verificação necessária é se o nome de usuário IPTV já existe
-                if usuario_iptv:
-                    existe = conn.execute("SELECT id FROM clientes WHERE usuario_iptv = ?", (usuario_iptv,)).fetchone()
-                    if existe:
-                        flash(f"O usuário IPTV \"{usuario_iptv}\" já está em uso. Por favor, escolha outro.", "error")
-                        return render_template("adicionar_cliente.html")
-
-                # Insere o novo registro do cliente/lista
-                cursor = conn.execute("""
-                    INSERT INTO clientes (telefone, nome, usuario_iptv, senha_iptv, conexoes, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (telefone, nome, usuario_iptv, senha_iptv, conexoes, "manual"))
-                cliente_id = cursor.lastrowid
-
-                # Se os detalhes da lista foram fornecidos, calcula a data de expiração
-                if usuario_iptv and senha_iptv:
-                    data_criacao = datetime.now()
-                    data_expiracao = data_criacao + timedelta(days=30 * meses)
-                    conn.execute("""
-                        UPDATE clientes 
-                        SET data_criacao = ?, data_expiracao = ?, status = "ativo"
-                        WHERE id = ?
-                    """, (data_criacao, data_expiracao, cliente_id))
-                
-                conn.commit()
-                
-                print(f"✅ [DEBUG] Cliente adicionado com sucesso! ID: {cliente_id}")
-                
-                # Usar template JavaScript para forçar recarregamento
-                return render_template_string(REDIRECT_TEMPLATE, 
-                    message=f"Cliente/Lista para o telefone {telefone} adicionado com sucesso!",
-                    url=url_for("listar_clientes"))
+            # A única verificação necessária é se o nome de usuário IPTV já existe
+            if usuario_iptv:
+                existe = db.buscar_cliente_por_usuario_iptv(usuario_iptv, incluir_arquivados=True)
+                if existe:
+                    flash(f"O usuário IPTV \"{usuario_iptv}\" já está em uso. Por favor, escolha outro.", "error")
+                    return render_template("adicionar_cliente.html")
+
+            # Se os detalhes da lista foram fornecidos, calcula a data de expiração
+            data_criacao = data_expiracao = None
+            status = "manual"
+            if usuario_iptv and senha_iptv:
+                data_criacao = datetime.now()
+                data_expiracao = data_criacao + timedelta(days=30 * meses)
+                status = "ativo"
+
+            # Insere o novo registro do cliente/lista
+            if not db.adicionar_cliente(telefone=telefone, nome=nome, usuario_iptv=usuario_iptv,
+                                        senha_iptv=senha_iptv, conexoes=conexoes, data_criacao=data_criacao,
+                                        data_expiracao=data_expiracao, status=status):
+                flash("Erro ao salvar o cliente. Veja os logs do sistema.", "error")
+                return render_template("adicionar_cliente.html")
+
+            print(f"✅ [DEBUG] Cliente adicionado com sucesso! Telefone: {telefone}")
 
-            finally:
-                conn.close()
+            # Usar template JavaScript para forçar recarregamento
+            return render_template_string(REDIRECT_TEMPLATE, 
+                message=f"Cliente/Lista para o telefone {telefone} adicionado com sucesso!",
+                url=url_for("listar_clientes"))
 
         except Exception as e:
             print(f"❌ [DEBUG] Erro ao adicionar cliente: {str(e)}")
@@ -676,10 +707,7 @@ def atualizar_precos():
 @app.route("/avisos")
 def avisos():
     """Página para enviar avisos em massa"""
-    conn = db.get_connection()
-    templates_raw = conn.execute("SELECT * FROM templates_avisos").fetchall()
-    conn.close()
-    templates = [dict(t) for t in templates_raw]
+    templates = db_leitura.get_all_templates()
     return render_template("avisos.html", templates=templates)
 
 
@@ -711,12 +739,10 @@ def enviar_aviso():
             return redirect(url_for("avisos"))
 
         clientes_para_enviar = []
-        if tipo_publico == "ativos":
-            clientes_para_enviar = db.listar_clientes_ativos()
-        elif tipo_publico == "a_vencer": # <-- ALTERADO
-            clientes_para_enviar = db.listar_clientes_expirando(7)
-        elif tipo_publico == "expirados": # <-- NOVO
-            clientes_para_enviar = db.listar_clientes_expirados()
+        if tipo_publico in db.SEGMENTOS_AVISOS:
+            # Mesmo conjunto pré-calculado da contagem, trazido para o estado atual antes de enviar
+            db.atualizar_segmentos_avisos()
+            clientes_para_enviar = db.listar_segmento_avisos(tipo_publico)
         elif tipo_publico == "personalizado": # <-- NOVO
             if not clientes_selecionados_ids:
                 flash("Para o público 'Personalizado', você deve selecionar pelo menos um cliente.", "warning")
@@ -773,7 +799,7 @@ def relatorio_sincronizacao():
     """Página com o relatório de sincronização dos clientes."""
     try:
         # Usar a nova função que retorna dados JSON-serializáveis
-        dados_sync = db.obter_dados_sincronizacao_para_template()
+        dados_sync = db_leitura.obter_dados_sincronizacao_para_template()
         
         # Adiciona a função now() ao contexto do template para cálculos de tempo
         def get_now():
@@ -791,8 +817,28 @@ def relatorio_sincronizacao():
         print(f"Erro ao gerar relatório de sincronização: {e}")
         flash(f"Erro ao gerar relatório de sincronização: {str(e)}", "error")
         return redirect(url_for("listar_clientes"))
-    
-    
+
+
+@app.route("/bitpanel/desempenho")
+def desempenho_bitpanel():
+    """Tempo de cada passo das automações do BitPanel (p50/p95) nos últimos dias."""
+    dias = request.args.get("dias", Config.TEMPOS_PASSOS_JANELA_DIAS, type=int)
+    estatisticas = db_leitura.estatisticas_tempos_passos(dias)
+    operacoes = {}
+    for linha in estatisticas:
+        operacoes.setdefault(linha["operacao"], []).append(linha)
+    response = make_response(render_template("desempenho_bitpanel.html", operacoes=operacoes, dias=dias))
+    return add_no_cache_headers(response)
+
+
+@app.route("/api/bitpanel/tempos")
+def api_bitpanel_tempos():
+    """Mesmos números da página de desempenho, em JSON."""
+    dias = request.args.get("dias", Config.TEMPOS_PASSOS_JANELA_DIAS, type=int)
+    response = make_response(jsonify({"dias": dias, "passos": db_leitura.estatisticas_tempos_passos(dias)}))
+    return add_no_cache_headers(response)
+
+
 @app.route("/api/cliente/<int:cliente_id>/info")
 def api_cliente_info_by_id(cliente_id):
     """API para obter informações atualizadas de um cliente específico pelo ID"""
@@ -824,62 +870,57 @@ def api_cliente_info_by_id(cliente_id):
 @app.route("/clientes/sincronizar/todos", methods=["POST"])
 def sincronizar_todos_clientes():
     """
-    Sincroniza todos os clientes do banco de dados com o BitPanel - VERSÃO CORRIGIDA
+    Enfileira a sincronização de todos os clientes com o BitPanel. Ela roda
+    num worker da fila de jobs, com as sessões do pool e respeitando o
+    circuito do painel; a página de acompanhamento mostra o relatório.
     """
     try:
-        print(f"🔄 [SYNC MASSA] Iniciando sincronização em massa...")
-        
-        usuarios_iptv = db.obter_todos_usuarios_iptv()
-        if not usuarios_iptv:
+        job = db.buscar_job_ativo("sincronizar_todos")
+        if job:
+            flash("Já existe uma sincronização em massa em andamento.", "info")
+            return redirect(url_for("acompanhar_sincronizacao", job_id=job["id"]))
+
+        if not db.obter_todos_usuarios_iptv():
             flash("Nenhum cliente com usuário IPTV para sincronizar.", "info")
             return redirect(url_for("listar_clientes"))
 
-        print(f"👥 [SYNC MASSA] {len(usuarios_iptv)} usuários para sincronizar")
+        print(f"🔄 [SYNC MASSA] Enfileirando sincronização em massa...")
+        job_id = fila_jobs.enfileirar("sincronizar_todos", {"modo": request.form.get("modo", "tabela")})
+        if circuito_bitpanel.aberto:
+            flash("O BitPanel está fora do ar. A sincronização ficou na fila e começa quando ele voltar.", "warning")
+        return redirect(url_for("acompanhar_sincronizacao", job_id=job_id))
 
-        from bitpanel_automation import BitPanelManager
-        manager = BitPanelManager()
-        sucessos = 0
-        falhas = 0
-        detalhes_sync = []
-        
-        if not manager.login(headless=True):
-            flash("Não foi possível fazer login no BitPanel. Verifique as credenciais.", "error")
-            return redirect(url_for("relatorio_sincronizacao"))
+    except Exception as e:
+        print(f"❌ [SYNC MASSA] Erro ao enfileirar a sincronização em massa: {str(e)}")
+        flash(f"Erro na sincronização em massa: {str(e)}", "error")
 
-        for i, usuario in enumerate(usuarios_iptv, 1):
-            print(f"🔄 [SYNC MASSA] Sincronizando {i}/{len(usuarios_iptv)}: {usuario}")
-            
-            # Pequena pausa para não sobrecarregar
-            time.sleep(1) 
-            
-            dados_sync = manager.sincronizar_dados_usuario(usuario, headless=True)
-            
-            if "erro" in dados_sync:
-                print(f"❌ [SYNC MASSA] Falha na sincronização de {usuario}: {dados_sync.get('erro')}")
-                falhas += 1
-                detalhes_sync.append(f"{usuario}: FALHA")
-            else:
-                if db.atualizar_dados_sincronizados(usuario, dados_sync):
-                    print(f"✅ [SYNC MASSA] {usuario} sincronizado com sucesso")
-                    sucessos += 1
-                    detalhes_sync.append(f"{usuario}: OK")
-                else:
-                    print(f"❌ [SYNC MASSA] Falha ao salvar dados de {usuario}")
-                    falhas += 1
-                    detalhes_sync.append(f"{usuario}: FALHA (banco)")
-        
-        manager.close()
-        
-        print(f"📊 [SYNC MASSA] Sincronização em massa concluída - Sucessos: {sucessos}, Falhas: {falhas}")
-        
-        # Salvar log detalhado
-        log_detalhes = "\n".join(detalhes_sync[:10])  # Primeiros 10 para não sobrecarregar
-        db.log_sistema("info", f"Sync massa: {sucessos} sucessos, {falhas} falhas. Detalhes: {log_detalhes}")
-        
-        # Forçar recarregamento completo
-        timestamp = int(time.time())
-        
-        return render_template_string(f"""
+    return redirect(url_for("relatorio_sincronizacao"))
+
+@app.route("/clientes/sincronizar/todos/<int:job_id>")
+def acompanhar_sincronizacao(job_id):
+    """Página de espera da sincronização em massa; com o job terminado, mostra o relatório."""
+    job = db_leitura.buscar_job(job_id)
+    if job is None or job["tipo"] != "sincronizar_todos":
+        flash(f"Job {job_id} não encontrado.", "error")
+        return redirect(url_for("relatorio_sincronizacao"))
+
+    if job["estado"] not in ("concluido", "falhou"):
+        response = make_response(render_template_string(JOB_TEMPLATE, job=job,
+            message="🔄 Sincronizando todos os clientes com o BitPanel..."))
+        return add_no_cache_headers(response)
+
+    if job["estado"] == "falhou":
+        flash(f"Erro na sincronização em massa: {job.get('erro')}", "error")
+        return redirect(url_for("relatorio_sincronizacao"))
+
+    relatorio = job["resultado"] or {}
+    sucessos = relatorio.get("sucessos", 0)
+    falhas = relatorio.get("falhas", 0)
+
+    # Forçar recarregamento completo
+    timestamp = int(time.time())
+    
+    return render_template_string(f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -922,25 +963,17 @@ def sincronizar_todos_clientes():
     </div>
 </body>
 </html>
-        """)
-        
-    except Exception as e:
-        print(f"❌ [SYNC MASSA] Erro crítico na sincronização em massa: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        flash(f"Erro na sincronização em massa: {str(e)}", "error")
-
-    return redirect(url_for("relatorio_sincronizacao"))
+    """)
 
 @app.route("/api/stats")
 def api_stats():
     """API para estatísticas (usado pelo auto-refresh) - MELHORADA"""
     try:
-        stats = db.get_estatisticas()
+        stats = db_leitura.get_estatisticas()
         
-        # BitPanel status apenas quando realmente necessário
-        # Para otimização, sempre retorna False para evitar lentidão
-        stats["bitpanel_online"] = False
+        # Último resultado da sonda em segundo plano: nunca abre navegador aqui
+        stats["bitpanel"] = sonda_bitpanel.status()
+        stats["bitpanel_online"] = stats["bitpanel"]["online"]
         
         # *** CORREÇÃO: TIMESTAMP PARA FORÇAR ATUALIZAÇÃO ***
         stats["timestamp"] = datetime.now().isoformat()
@@ -951,12 +984,92 @@ def api_stats():
         response = make_response(jsonify({"error": str(e)}), 500)
         return add_no_cache_headers(response)
 
+@app.route("/api/db/metricas")
+def api_db_metricas():
+    """Uso das conexões somente leitura do dashboard, para medir a interferência com as escritas."""
+    response = make_response(jsonify({
+        "leitura": db_leitura.metricas(),
+        "indice_clientes": db.indice_clientes.metricas(),
+        "indice_usuarios": db.indice_usuarios.metricas(),
+        "contencao_escrita": medidor_contencao.metricas(),
+        "pool_bitpanel": pool_bitpanel.metricas(),
+        "fila_jobs": fila_jobs.metricas(),
+        "agendador_sync": agendador_sincronizacao.metricas(),
+        "saude_bitpanel": sonda_bitpanel.metricas(),
+    }))
+    return add_no_cache_headers(response)
+
+@app.route("/api/alteracoes")
+def api_alteracoes():
+    """
+    Alterações depois de `desde` (seq), para atualizações incrementais.
+    `log=main` (padrão) cobre clientes e pagamentos; `log=chat` cobre conversas.
+    """
+    desde = request.args.get("desde", 0, type=int)
+    limite = min(request.args.get("limite", 500, type=int), 5000)
+    log = request.args.get("log", "main")
+    if log not in ("main", "chat"):
+        return jsonify({"error": "Log inválido"}), 400
+    alteracoes = db_leitura.changes_since(desde, limite, schema=log)
+    ultimo_seq = alteracoes[-1]["seq"] if alteracoes else desde
+    response = make_response(jsonify({"alteracoes": alteracoes, "ultimo_seq": ultimo_seq}))
+    return add_no_cache_headers(response)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
 
 
 
 
+@app.route("/api/jobs/<int:job_id>")
+def api_job(job_id):
+    """Estado de um job da fila do BitPanel, para as páginas que o acompanham."""
+    job = db_leitura.buscar_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    campos = ("id", "tipo", "estado", "tentativas", "max_tentativas", "erro", "resultado")
+    response = make_response(jsonify({campo: job.get(campo) for campo in campos}))
+    return add_no_cache_headers(response)
+
+
+@app.route("/clientes/criar_teste/<int:job_id>")
+def acompanhar_teste(job_id):
+    """Página de espera de um teste enfileirado; com o job terminado, mostra o resultado."""
+    job = db_leitura.buscar_job(job_id)
+    if job is None or job["tipo"] != "criar_teste":
+        flash(f"Job {job_id} não encontrado.", "error")
+        return redirect(url_for("listar_clientes"))
+
+    username = job["payload"].get("username", "")
+    if job["estado"] not in ("concluido", "falhou"):
+        response = make_response(render_template_string(JOB_TEMPLATE, job=job,
+            message=f"Criando o teste para {username} no BitPanel..."))
+        return add_no_cache_headers(response)
+
+    resultado = job["resultado"] or {}
+    if job["estado"] == "falhou":
+        flash("Erro ao criar teste no BitPanel: {}".format(job.get("erro")), "error")
+        return redirect(url_for("criar_teste_route"))
+
+    if resultado.get("parcial"):
+        flash("Teste criado no BitPanel, mas houve um problema ao capturar os dados: {}".format(resultado.get("mensagem")), "warning")
+        return render_template_string(REDIRECT_TEMPLATE,
+            message=f"Teste para {username} criado (parcialmente) com sucesso!",
+            url=url_for("listar_clientes"))
+
+    if resultado.get("datas_invalidas"):
+        flash("Aviso: Formato de data inválido do BitPanel. Teste salvo sem datas.", "warning")
+
+    if resultado.get("salvo"):
+        flash(f"Teste para {username} criado e salvo com sucesso!", "success")
+        return render_template_string(REDIRECT_TEMPLATE,
+            message=f"Teste para {username} criado e salvo com sucesso!",
+            url=url_for("listar_clientes"))
+
+    flash("Teste criado no BitPanel, mas falha ao salvar no banco de dados local (usuário talvez já exista).", "error")
+    return redirect(url_for("criar_teste_route"))
+
+
 @app.route("/clientes/criar_teste", methods=["GET", "POST"])
 def criar_teste_route():
     """Rota para criar um teste de usuário no BitPanel e salvar no banco local."""
@@ -968,70 +1081,37 @@ def criar_teste_route():
 
             if not username:
                 flash("O campo Nome de Usuário é obrigatório para criar um teste.", "error")
-                return render_template("adicionar_cliente.html", is_test_creation=True)
+                return render_template("adicionar_cliente.html", is_test_creation=True, chave_envio=uuid.uuid4().hex)
 
             # Verificar se o usuário já existe no banco local
-            cliente_existente = db.buscar_cliente_por_usuario_iptv(username)
+            cliente_existente = db.buscar_cliente_por_usuario_iptv(username, incluir_arquivados=True)
             if cliente_existente:
                 flash(f"O usuário '{username}' já existe no sistema. Por favor, escolha outro nome para o teste.", "error")
-                return render_template("adicionar_cliente.html", is_test_creation=True)
-
-            manager = BitPanelManager()
-            dados_teste = manager.criar_teste(username=username, headless=True)
-            manager.close()
-
-            if "erro" in dados_teste:
-                flash("Erro ao criar teste no BitPanel: {}".format(dados_teste.get("erro")), "error")
-                return render_template("adicionar_cliente.html", is_test_creation=True)
-            
-            if dados_teste.get("status") == "parcial":
-                flash("Teste criado no BitPanel, mas houve um problema ao capturar os dados: {}".format(dados_teste.get("mensagem")), "warning")
-                # Tentar salvar o mínimo possível no banco local
-                db.adicionar_cliente(telefone=telefone, nome=username, usuario_iptv=username, senha_iptv="N/A", conexoes=1, data_criacao=None, data_expiracao=None, status="teste_parcial")
-                return render_template_string(REDIRECT_TEMPLATE, 
-                    message=f"Teste para {username} criado (parcialmente) com sucesso!",
-                    url=url_for("listar_clientes"))
-            
-            # --- CONVERSÃO DE DATAS ---
-            criado_em_dt = None
-            expira_em_dt = None
-            try:
-                if dados_teste.get("criado_em"):
-                    criado_em_dt = datetime.strptime(dados_teste.get("criado_em"), "%d/%m/%Y %H:%M")
-                if dados_teste.get("expira_em"):
-                    expira_em_dt = datetime.strptime(dados_teste.get("expira_em"), "%d/%m/%Y %H:%M")
-            except ValueError as e:
-                print(f"⚠️ [DEBUG] Erro ao converter data do BitPanel: {e}. As datas serão salvas como Nulas.")
-                flash("Aviso: Formato de data inválido do BitPanel. Teste salvo sem datas.", "warning")
-
-            # Salvar os dados do teste no banco de dados local
-            sucesso_db = db.adicionar_cliente(
-                telefone=telefone,
-                nome=username, # Usa o próprio username como nome padrão
-                usuario_iptv=dados_teste.get("usuario", username),
-                senha_iptv=dados_teste.get("senha", "N/A"),
-                conexoes=int(dados_teste.get("conexoes", 1)),
-                data_criacao=criado_em_dt,
-                data_expiracao=expira_em_dt,
-                status="teste"
+                return render_template("adicionar_cliente.html", is_test_creation=True, chave_envio=uuid.uuid4().hex)
+
+            # Mesmo envio do formulário (duplo clique, F5) cai no mesmo job
+            chave_envio = request.form.get("chave_envio") or None
+            job_id = fila_jobs.enfileirar(
+                "criar_teste",
+                {"username": username, "telefone": telefone},
+                chave=f"teste:{chave_envio}" if chave_envio else None,
             )
-
-            if sucesso_db:
-                flash(f"Teste para {username} criado e salvo com sucesso!", "success")
-                return render_template_string(REDIRECT_TEMPLATE, 
-                    message=f"Teste para {username} criado e salvo com sucesso!",
+            if circuito_bitpanel.aberto:
+                # Com o circuito aberto o job só roda quando o painel voltar
+                flash(f"O BitPanel está fora do ar. O teste para {username} ficou na fila e será criado quando ele voltar.", "warning")
+                return render_template_string(REDIRECT_TEMPLATE,
+                    message=f"Teste para {username} enfileirado.",
                     url=url_for("listar_clientes"))
-            else:
-                flash("Teste criado no BitPanel, mas falha ao salvar no banco de dados local (usuário talvez já exista).", "error")
-                return render_template("adicionar_cliente.html", is_test_creation=True)
+            # A criação leva até minutos no Selenium: responde já e a página acompanha o job
+            return redirect(url_for("acompanhar_teste", job_id=job_id))
 
         except Exception as e:
             print(f"❌ [DEBUG] Erro ao criar teste: {str(e)}")
             flash(f"Ocorreu um erro ao criar o teste: {str(e)}", "error")
-            return render_template("adicionar_cliente.html", is_test_creation=True)
+            return render_template("adicionar_cliente.html", is_test_creation=True, chave_envio=uuid.uuid4().hex)
 
     # Método GET: exibe o formulário de criação de teste
-    response = make_response(render_template("adicionar_cliente.html", is_test_creation=True))
+    response = make_response(render_template("adicionar_cliente.html", is_test_creation=True, chave_envio=uuid.uuid4().hex))
     return add_no_cache_headers(response)
 
 
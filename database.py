@@ -1,47 +1,122 @@
+import json
 import sqlite3
 import os
+import re
+import sys
+import threading
+import time
 import traceback
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from config import Config
+from storage import Armazenamento, criar_armazenamento
+from indice_clientes import IndiceClientes
+from indice_usuarios import IndiceUsuarios
+from contencao import executar_escrita
+
+
+def normalizar_telefone(telefone: Optional[str]) -> Optional[str]:
+    """
+    Converte um telefone em qualquer formato para E.164 (+5511999998888).
+    Números sem código de país (DDD + número, 10 ou 11 dígitos) são tratados
+    como brasileiros. Retorna None se não houver dígitos.
+    """
+    if telefone is None:
+        return None
+    digitos = re.sub(r"\D", "", str(telefone)).lstrip("0")
+    if not digitos:
+        return None
+    if len(digitos) in (10, 11):
+        digitos = "55" + digitos
+    return "+" + digitos
+
+class _ConexaoEscrita(sqlite3.Connection):
+    """Conexão que avisa o DatabaseManager, ao fechar, se alterou alguma linha."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ao_alterar = None
+
+    def close(self):
+        alterou = self._ao_alterar is not None and self.total_changes > 0
+        super().close()
+        if alterou:
+            ao_alterar, self._ao_alterar = self._ao_alterar, None
+            ao_alterar()
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, armazenamento: Armazenamento = None, indice_clientes: IndiceClientes = None,
+                 indice_usuarios: IndiceUsuarios = None):
         self.db_path = db_path or Config.DATABASE_PATH
+        self.armazenamento = armazenamento or criar_armazenamento(caminho=db_path)
+        self.indice_clientes = indice_clientes
+        self.indice_usuarios = indice_usuarios
+        # Conexões abertas pelo `with self as conn`, separadas por thread
+        self._abertas = threading.local()
+        # Marca a thread que está atualizando os segmentos depois de uma escrita
+        self._pos_escrita = threading.local()
+        # Uma sincronização do índice de clientes por vez, e quando o log foi conferido pela última vez
+        self._lock_indice = threading.Lock()
+        self._indice_conferido_em = 0.0
 
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = self.armazenamento.conectar(factory=_ConexaoEscrita)
+        conn.row_factory = sqlite3.Row
+        # Qualquer escrita (inclusive SQL direto de outros módulos) atualiza o índice e os segmentos ao fechar
+        conn._ao_alterar = self._apos_alterar
+        return conn
+
+    def _escrever(self, operacao, schema: str = "main", local: str = None):
+        """
+        Executa `operacao(conn)` como escrita com BEGIN IMMEDIATE e retentativas
+        (veja contencao.executar_escrita), numa conexão só com o arquivo do
+        `schema`. `local` identifica o ponto de chamada nas métricas de lock;
+        por padrão é o nome do método que chamou.
+        """
+        local = local or sys._getframe(1).f_code.co_name
+        return executar_escrita(lambda: self._conexao_arquivo(schema), operacao, local)
+
+    def _conexao_arquivo(self, schema: str):
+        conn = self.armazenamento.conectar_arquivo(schema, factory=_ConexaoEscrita)
         conn.row_factory = sqlite3.Row
+        if schema == "main":
+            conn._ao_alterar = self._apos_alterar
         return conn
 
     def __enter__(self):
-        self._conn = self.get_connection()
-        return self._conn
+        pilha = getattr(self._abertas, "pilha", None)
+        if pilha is None:
+            pilha = self._abertas.pilha = []
+        conn = self.get_connection()
+        pilha.append(conn)
+        return conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._conn:
-            self._conn.close()
+        pilha = getattr(self._abertas, "pilha", None)
+        if pilha:
+            pilha.pop().close()
 
     def adicionar_cliente(self, telefone: Optional[str], nome: str, usuario_iptv: str, senha_iptv: str, conexoes: int, data_criacao: Optional[datetime], data_expiracao: Optional[datetime], status: str) -> bool:
         """Adiciona um cliente com todos os detalhes, ideal para salvar testes ou listas completas."""
         try:
-            with self as conn:
-                conn.execute("""
-                    INSERT INTO clientes (telefone, nome, usuario_iptv, senha_iptv, conexoes, data_criacao, data_expiracao, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    telefone,
-                    nome,
-                    usuario_iptv,
-                    senha_iptv,
-                    conexoes,
-                    data_criacao,
-                    data_expiracao,
-                    status
-                ))
-                conn.commit()
-                print(f"[DB] Cliente/Teste '{usuario_iptv}' adicionado com sucesso.")
-                return True
+            self._escrever(lambda conn: conn.execute("""
+                INSERT INTO clientes (telefone, telefone_e164, nome, usuario_iptv, senha_iptv, conexoes, data_criacao, data_expiracao, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                telefone,
+                normalizar_telefone(telefone),
+                nome,
+                usuario_iptv,
+                senha_iptv,
+                conexoes,
+                data_criacao,
+                data_expiracao,
+                status
+            )))
+            print(f"[DB] Cliente/Teste '{usuario_iptv}' adicionado com sucesso.")
+            return True
         except sqlite3.IntegrityError as e:
             # Isso provavelmente significa que o usuario_iptv já existe
             print(f"[DB] Erro de integridade ao adicionar '{usuario_iptv}': {e}. O usuário provavelmente já existe.")
@@ -56,6 +131,11 @@ class DatabaseManager:
     
     def init_database(self):
         with self as conn:
+            # WAL deixa os leitores (dashboard) lerem um snapshot sem bloquear as escritas.
+            # Cada arquivo anexado tem seu próprio journal.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA logs.journal_mode=WAL")
+            conn.execute("PRAGMA chat.journal_mode=WAL")
             # Criação das tabelas
             conn.execute(
                 """
@@ -96,12 +176,38 @@ class DatabaseManager:
             conn.execute(
                 "CREATE TABLE IF NOT EXISTS configuracoes (chave TEXT PRIMARY KEY, valor TEXT, descricao TEXT)"
             )
+            # logs_sistema e conversas moram nos arquivos anexados (schemas logs e chat)
             conn.execute(
-                "CREATE TABLE IF NOT EXISTS logs_sistema (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, mensagem TEXT NOT NULL, detalhes TEXT, data_log DATETIME DEFAULT CURRENT_TIMESTAMP)"
+                "CREATE TABLE IF NOT EXISTS logs.logs_sistema (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, mensagem TEXT NOT NULL, detalhes TEXT, data_log DATETIME DEFAULT CURRENT_TIMESTAMP)"
             )
+            # Tempos de cada passo das automações do BitPanel (veja BitPanelManager._passo)
             conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS conversas (telefone TEXT PRIMARY KEY, contexto TEXT, estado TEXT DEFAULT '{}', dados_temporarios TEXT DEFAULT '{}', ultima_interacao DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+                CREATE TABLE IF NOT EXISTS logs.tempos_passos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    execucao TEXT NOT NULL,
+                    operacao TEXT NOT NULL,
+                    passo TEXT NOT NULL,
+                    segundos REAL NOT NULL,
+                    sucesso INTEGER NOT NULL,
+                    resultado TEXT NOT NULL,
+                    data_registro DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS logs.idx_tempos_passos_data ON tempos_passos (data_registro)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat.conversas (telefone TEXT PRIMARY KEY, contexto TEXT, estado TEXT DEFAULT '{}', dados_temporarios TEXT DEFAULT '{}', ultima_interacao DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+            )
+            self._mover_para_anexo(conn, "logs_sistema", "logs")
+            self._mover_para_anexo(conn, "conversas", "chat")
+            self._migrar_telefone_e164(conn)
+            # Índice usado pelo varredor de conversas antigas
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS chat.idx_conversas_ultima_interacao ON conversas (ultima_interacao)"
             )
             conn.execute(
                 """
@@ -116,10 +222,87 @@ class DatabaseManager:
                 )
                 """
             )
+            self._criar_captura_alteracoes(conn)
+            self._criar_segmentos_avisos(conn)
+            self._criar_fila_jobs(conn)
+            self._criar_controle_sincronizacao(conn)
+            self._criar_reservas_usuario(conn)
+            self._criar_tabelas_arquivo(conn)
             conn.commit()
             self.inserir_configs_padrao(conn)
             self.inserir_templates_padrao(conn)
 
+    def _mover_para_anexo(self, conn, tabela: str, schema: str):
+        """Copia uma tabela que ainda está no banco principal para o arquivo anexado e a remove de lá."""
+        existe = conn.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (tabela,)
+        ).fetchone()
+        if not existe:
+            return
+        total = conn.execute(f"INSERT OR IGNORE INTO {schema}.{tabela} SELECT * FROM main.{tabela}").rowcount
+        conn.execute(f"DROP TABLE main.{tabela}")
+        print(f"[DB] {total} linhas de '{tabela}' movidas para o arquivo separado ({schema})")
+
+    def _migrar_telefone_e164(self, conn):
+        """
+        Garante a coluna `telefone_e164` (telefone normalizado) com índice e
+        preenche as linhas antigas. Todas as buscas por telefone usam essa coluna.
+        """
+        colunas = [c["name"] for c in conn.execute("PRAGMA table_info(clientes)").fetchall()]
+        if "telefone_e164" not in colunas:
+            conn.execute("ALTER TABLE clientes ADD COLUMN telefone_e164 TEXT")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clientes_telefone_e164 ON clientes (telefone_e164)"
+        )
+        pendentes = conn.execute(
+            "SELECT id, telefone FROM clientes WHERE telefone_e164 IS NULL AND telefone IS NOT NULL"
+        ).fetchall()
+        if pendentes:
+            conn.executemany(
+                "UPDATE clientes SET telefone_e164 = ? WHERE id = ?",
+                [(normalizar_telefone(p["telefone"]), p["id"]) for p in pendentes],
+            )
+            print(f"[DB] {len(pendentes)} telefones normalizados para E.164")
+
+    # Tabelas acompanhadas pelo log de alterações: tabela -> (schema, coluna que identifica a linha).
+    # Um trigger só enxerga o próprio arquivo, então conversas tem um log próprio no schema chat.
+    TABELAS_CAPTURADAS = {
+        "clientes": ("main", "id"),
+        "pagamentos": ("main", "id"),
+        "conversas": ("chat", "telefone"),
+    }
+
+    def _criar_captura_alteracoes(self, conn):
+        """
+        Cria a tabela `alteracoes` e os triggers que registram cada INSERT,
+        UPDATE e DELETE das tabelas capturadas. O `seq` só cresce, então quem
+        guarda o último seq visto pode pedir apenas o que mudou depois dele.
+        """
+        for schema in sorted({schema for schema, _ in self.TABELAS_CAPTURADAS.values()}):
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {schema}.alteracoes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tabela TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    operacao TEXT NOT NULL, -- 'INSERT', 'UPDATE' ou 'DELETE'
+                    data_alteracao DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+        for tabela, (schema, coluna) in self.TABELAS_CAPTURADAS.items():
+            for operacao, linha in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                conn.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {schema}.trg_{tabela}_{operacao.lower()}_alteracoes
+                    AFTER {operacao} ON {tabela}
+                    BEGIN
+                        INSERT INTO alteracoes (tabela, chave, operacao)
+                        VALUES ('{tabela}', COALESCE({linha}.{coluna}, ''), '{operacao}');
+                    END
+                    """
+                )
+
     def inserir_configs_padrao(self, conn):
         configs = [
             (
@@ -195,9 +378,9 @@ class DatabaseManager:
             if not dados_para_atualizar:
                 print(f"[DB] Nenhum campo válido para atualizar para o usuário {usuario_iptv}.")
                 # Mesmo sem campos, atualiza a data de sincronização para não ficar tentando de novo
-                with self as conn:
-                    conn.execute("UPDATE clientes SET ultima_sincronizacao = ? WHERE usuario_iptv = ?", (datetime.now(), usuario_iptv))
-                    conn.commit()
+                self._escrever(lambda conn: conn.execute(
+                    "UPDATE clientes SET ultima_sincronizacao = ? WHERE usuario_iptv = ?", (datetime.now(), usuario_iptv)
+                ))
                 return True
 
             # Constrói a query de UPDATE dinamicamente
@@ -211,9 +394,7 @@ class DatabaseManager:
 
             query_final = f"UPDATE clientes SET {campos_query} WHERE usuario_iptv = ?"
 
-            with self as conn:
-                conn.execute(query_final, valores_query)
-                conn.commit()
+            self._escrever(lambda conn: conn.execute(query_final, valores_query))
             
             print(f"[DB] Dados sincronizados de '{usuario_iptv}' atualizados com sucesso no banco.")
             return True
@@ -237,6 +418,64 @@ class DatabaseManager:
             results = conn.execute(query).fetchall()
             return [dict(row) for row in results]
 
+    def listar_clientes_com_status_lista(self) -> List[Dict]:
+        """Retorna todos os clientes com o status da lista calculado pela data de expiração."""
+        with self as conn:
+            query = """
+                SELECT c.*,
+                       CASE
+                           WHEN c.data_expiracao > datetime('now') THEN 'Ativo'
+                           WHEN c.data_expiracao IS NULL THEN 'Sem Lista'
+                           ELSE 'Expirado'
+                       END as status_lista
+                FROM clientes c
+                ORDER BY c.created_at DESC
+            """
+            results = conn.execute(query).fetchall()
+            return [dict(row) for row in results]
+
+    def contar_clientes_por_tipo(self, tipo: str) -> Optional[int]:
+        """
+        Telefones distintos do público de avisos, lidos do segmento materializado
+        (mantido pelo AtualizadorSegmentos). Retorna None para tipo inválido.
+        """
+        if tipo not in self.SEGMENTOS_AVISOS:
+            return None
+        with self as conn:
+            result = conn.execute("SELECT total FROM segmentos_resumo WHERE segmento = ?", (tipo,)).fetchone()
+            return result[0] if result else 0
+
+    def obter_dados_sincronizacao_para_template(self) -> Dict[str, Any]:
+        """Dados do relatório de sincronização: quem nunca sincronizou e as sincronizações recentes."""
+        with self as conn:
+            nunca_sincronizados = conn.execute(
+                """
+                SELECT id, usuario_iptv, telefone, created_at FROM clientes
+                WHERE usuario_iptv IS NOT NULL AND usuario_iptv != '' AND ultima_sincronizacao IS NULL
+                ORDER BY created_at DESC
+            """
+            ).fetchall()
+            ultimas_sync = conn.execute(
+                """
+                SELECT id, usuario_iptv, telefone, ultima_sincronizacao FROM clientes
+                WHERE ultima_sincronizacao IS NOT NULL
+                ORDER BY ultima_sincronizacao DESC
+                LIMIT 50
+            """
+            ).fetchall()
+            total_com_sync = conn.execute(
+                "SELECT COUNT(*) FROM clientes WHERE ultima_sincronizacao IS NOT NULL"
+            ).fetchone()[0]
+
+            return {
+                "nunca_sincronizados": [dict(row) for row in nunca_sincronizados],
+                "ultimas_sync": [dict(row) for row in ultimas_sync],
+                "stats": {
+                    "nunca_sincronizados": len(nunca_sincronizados),
+                    "total_com_sync": total_com_sync,
+                },
+            }
+
     def obter_clientes_para_selecao(self) -> List[Dict]:
         """Retorna uma lista simplificada de clientes para preencher seletores."""
         with self as conn:
@@ -272,47 +511,172 @@ class DatabaseManager:
             return dict(result) if result else None
 
     def update_template(self, nome: str, assunto: str, corpo: str) -> bool:
-        with self as conn:
-            cursor = conn.execute(
-                "UPDATE templates_avisos SET assunto = ?, corpo = ?, data_atualizacao = CURRENT_TIMESTAMP WHERE nome = ?",
-                (assunto, corpo, nome),
-            )
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE templates_avisos SET assunto = ?, corpo = ?, data_atualizacao = CURRENT_TIMESTAMP WHERE nome = ?",
+            (assunto, corpo, nome),
+        ).rowcount > 0)
 
     # === MÉTODOS PARA CLIENTES ===
 
     def criar_cliente(self, telefone: str, nome: str = None) -> int:
-        with self as conn:
-            cursor = conn.execute(
-                "INSERT INTO clientes (telefone, nome) VALUES (?, ?)", (telefone, nome)
+        cursor = self._escrever(lambda conn: conn.execute(
+            "INSERT INTO clientes (telefone, telefone_e164, nome) VALUES (?, ?, ?)",
+            (telefone, normalizar_telefone(telefone), nome),
+        ))
+        return cursor.lastrowid
+
+    def buscar_cliente_por_telefone(self, telefone: str, incluir_arquivados: bool = False) -> Optional[Dict]:
+        """Cliente mais recente do telefone. Passa pelo índice em memória quando houver."""
+        telefone_e164 = normalizar_telefone(telefone)
+        cliente = self._buscar_cliente_indexado(
+            ("telefone", telefone_e164),
+            "SELECT * FROM clientes WHERE telefone_e164 = ? ORDER BY id DESC LIMIT 1",
+            telefone_e164,
+        )
+        if cliente is None and incluir_arquivados:
+            cliente = self._buscar_no_arquivo(
+                "SELECT * FROM clientes_arquivo WHERE telefone_e164 = ? ORDER BY id DESC LIMIT 1", telefone_e164
             )
-            conn.commit()
-            return cursor.lastrowid
+        return cliente
+
+    def buscar_cliente_por_usuario_iptv(self, usuario_iptv: str, incluir_arquivados: bool = False) -> Optional[Dict]:
+        cliente = self._buscar_cliente_indexado(
+            ("usuario", usuario_iptv),
+            "SELECT * FROM clientes WHERE usuario_iptv = ?",
+            usuario_iptv,
+        )
+        if cliente is None and incluir_arquivados:
+            cliente = self._buscar_no_arquivo(
+                "SELECT * FROM clientes_arquivo WHERE usuario_iptv = ? ORDER BY id DESC LIMIT 1", usuario_iptv
+            )
+        return cliente
 
-    def buscar_cliente_por_telefone(self, telefone: str) -> Optional[Dict]:
+    def _buscar_no_arquivo(self, query: str, valor) -> Optional[Dict]:
         with self as conn:
-            result = conn.execute(
-                "SELECT * FROM clientes WHERE telefone = ? ORDER BY id DESC LIMIT 1",
-                (telefone,),
-            ).fetchone()
+            result = conn.execute(query, (valor,)).fetchone()
             return dict(result) if result else None
 
-    def buscar_cliente_por_usuario_iptv(self, usuario_iptv: str) -> Optional[Dict]:
-        with self as conn:
-            result = conn.execute(
-                "SELECT * FROM clientes WHERE usuario_iptv = ?", (usuario_iptv,)
-            ).fetchone()
-            return dict(result) if result else None
+    def _buscar_cliente_indexado(self, chave, query: str, valor) -> Optional[Dict]:
+        indice = self.indice_clientes
+        if indice is not None:
+            self._conferir_indice_clientes()
+            achou, cliente = indice.obter(chave)
+            if achou:
+                return cliente
+            geracao = indice.geracao
+
+        conn = self.get_connection()
+        try:
+            result = conn.execute(query, (valor,)).fetchone()
+        finally:
+            conn.close()
+        cliente = dict(result) if result else None
+
+        if indice is not None:
+            indice.guardar(chave, cliente, geracao)
+        return cliente
+
+    def aquecer_indice_clientes(self):
+        """Carrega os clientes mais recentes no índice em memória (chamado na inicialização)."""
+        indice = self.indice_clientes
+        if indice is None:
+            return
+        with self as conn:
+            indice.avancar_seq(self._topo_alteracoes(conn))
+            clientes = conn.execute(
+                "SELECT * FROM clientes ORDER BY id DESC LIMIT ?", (indice.max_itens // 2,)
+            ).fetchall()
+        telefones_vistos = set()
+        # Do mais antigo para o mais novo, para que os mais recentes fiquem no topo do LRU
+        for row in reversed(clientes):
+            cliente = dict(row)
+            if cliente.get("usuario_iptv"):
+                indice.guardar(("usuario", cliente["usuario_iptv"]), cliente)
+        for row in clientes:
+            cliente = dict(row)
+            telefone_e164 = cliente.get("telefone_e164")
+            if telefone_e164 and telefone_e164 not in telefones_vistos:
+                telefones_vistos.add(telefone_e164)
+                indice.guardar(("telefone", telefone_e164), cliente)
+        print(f"[DB] Índice de clientes aquecido com {indice.metricas()['itens']} entradas")
+
+    def _apos_alterar(self):
+        """Depois de toda escrita no arquivo principal: índice de clientes e segmentos de avisos."""
+        self.sincronizar_indice_clientes()
+        self.atualizar_segmentos_pendentes()
+
+    def _conferir_indice_clientes(self):
+        """
+        Escritas feitas por outro processo não passam pelo gancho de fechamento
+        deste: antes de uma busca, confere o log de alterações se a última
+        conferência tem mais de INDICE_CLIENTES_CONFERIR_SEGUNDOS.
+        """
+        agora = time.monotonic()
+        if agora - self._indice_conferido_em < Config.INDICE_CLIENTES_CONFERIR_SEGUNDOS:
+            return
+        self._indice_conferido_em = agora
+        self.sincronizar_indice_clientes()
+
+    def sincronizar_indice_clientes(self):
+        """
+        Write-through do índice: lê no log de alterações quais clientes mudaram
+        desde a última sincronização e grava as linhas novas no índice.
+        Se o log foi podado antes de ser lido, esvazia o índice. Uma thread por
+        vez: duas escritas que fecham juntas não aplicam o log fora de ordem.
+        """
+        indice = self.indice_clientes
+        if indice is None:
+            return
+        with self._lock_indice:
+            conn = self.get_connection()
+            try:
+                topo = self._topo_alteracoes(conn)
+                if topo <= indice.ultimo_seq:
+                    return
+                primeiro = conn.execute("SELECT MIN(seq) FROM main.alteracoes").fetchone()[0]
+                if primeiro is None or primeiro > indice.ultimo_seq + 1:
+                    indice.limpar()
+                    indice.avancar_seq(topo)
+                    return
+
+                ids = conn.execute(
+                    """
+                    SELECT DISTINCT CAST(chave AS INTEGER) FROM main.alteracoes
+                    WHERE tabela = 'clientes' AND seq > ? AND seq <= ?
+                    """,
+                    (indice.ultimo_seq, topo),
+                ).fetchall()
+                for (cliente_id,) in ids:
+                    row = conn.execute("SELECT * FROM clientes WHERE id = ?", (cliente_id,)).fetchone()
+                    cliente = dict(row) if row else None
+                    ultimo_do_telefone = None
+                    if cliente and cliente.get("telefone_e164"):
+                        ultimo = conn.execute(
+                            "SELECT * FROM clientes WHERE telefone_e164 = ? ORDER BY id DESC LIMIT 1",
+                            (cliente["telefone_e164"],),
+                        ).fetchone()
+                        ultimo_do_telefone = dict(ultimo) if ultimo else None
+                    indice.atualizar_cliente(cliente_id, cliente, ultimo_do_telefone)
+                indice.avancar_seq(topo)
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _topo_alteracoes(conn) -> int:
+        """Maior seq já gerado no log de alterações (mesmo que a linha já tenha sido podada)."""
+        result = conn.execute("SELECT seq FROM main.sqlite_sequence WHERE name = 'alteracoes'").fetchone()
+        return result[0] if result else 0
 
     def criar_ou_atualizar_cliente(
         self, telefone: str, usuario_iptv: str, nome: str = ""
     ):
         """Cria um novo cliente ou atualiza um existente com base no telefone."""
-        with self as conn:
+        telefone_e164 = normalizar_telefone(telefone)
+
+        def salvar(conn):
             # Verifica se já existe um cliente com este telefone
             existente = conn.execute(
-                "SELECT id FROM clientes WHERE telefone = ?", (telefone,)
+                "SELECT id FROM clientes WHERE telefone_e164 = ?", (telefone_e164,)
             ).fetchone()
 
             if existente:
@@ -320,26 +684,26 @@ class DatabaseManager:
                 query = """
                     UPDATE clientes 
                     SET nome = ?, usuario_iptv = ? 
-                    WHERE telefone = ?
+                    WHERE telefone_e164 = ?
                 """
-                conn.execute(query, (nome, usuario_iptv, telefone))
+                conn.execute(query, (nome, usuario_iptv, telefone_e164))
             else:
                 # Insere
                 query = """
-                    INSERT INTO clientes (nome, telefone, usuario_iptv, status) 
-                    VALUES (?, ?, ?, 'manual')
+                    INSERT INTO clientes (nome, telefone, telefone_e164, usuario_iptv, status) 
+                    VALUES (?, ?, ?, ?, 'manual')
                 """
-                conn.execute(query, (nome, telefone, usuario_iptv))
+                conn.execute(query, (nome, telefone, telefone_e164, usuario_iptv))
 
-            conn.commit()
+        self._escrever(salvar)
 
     def buscar_lista_por_usuario_e_telefone(
         self, usuario_iptv: str, telefone: str
     ) -> Optional[Dict]:
         """Busca uma lista específica que pertence a um número de telefone."""
         with self as conn:
-            query = "SELECT * FROM clientes WHERE usuario_iptv = ? AND telefone = ?"
-            result = conn.execute(query, (usuario_iptv, telefone)).fetchone()
+            query = "SELECT * FROM clientes WHERE usuario_iptv = ? AND telefone_e164 = ?"
+            result = conn.execute(query, (usuario_iptv, normalizar_telefone(telefone))).fetchone()
             return dict(result) if result else None
 
     def atualizar_lista_cliente(
@@ -350,21 +714,19 @@ class DatabaseManager:
         conexoes: int,
         meses: int,
     ):
-        with self as conn:
-            data_criacao = datetime.now()
-            data_expiracao = data_criacao + timedelta(days=30 * meses)
-            conn.execute(
-                "UPDATE clientes SET usuario_iptv = ?, senha_iptv = ?, conexoes = ?, data_criacao = ?, data_expiracao = ?, status = 'ativo' WHERE telefone = ? AND usuario_iptv IS NULL ORDER BY id DESC LIMIT 1",
-                (
-                    usuario_iptv,
-                    senha_iptv,
-                    conexoes,
-                    data_criacao,
-                    data_expiracao,
-                    telefone,
-                ),
-            )
-            conn.commit()
+        data_criacao = datetime.now()
+        data_expiracao = data_criacao + timedelta(days=30 * meses)
+        self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET usuario_iptv = ?, senha_iptv = ?, conexoes = ?, data_criacao = ?, data_expiracao = ?, status = 'ativo' WHERE telefone_e164 = ? AND usuario_iptv IS NULL ORDER BY id DESC LIMIT 1",
+            (
+                usuario_iptv,
+                senha_iptv,
+                conexoes,
+                data_criacao,
+                data_expiracao,
+                normalizar_telefone(telefone),
+            ),
+        ))
 
     def atualizar_cliente_pos_compra(
         self,
@@ -377,32 +739,33 @@ class DatabaseManager:
         plano: str = None,
     ):
         """Atualiza cliente após compra bem-sucedida"""
-        with self as conn:
-            conn.execute(
-                """
-                UPDATE clientes 
-                SET usuario_iptv = ?, senha_iptv = ?, conexoes = ?, data_criacao = ?, data_expiracao = ?, plano = ?, status = 'ativo'
-                WHERE telefone = ? AND usuario_iptv IS NULL
-                ORDER BY id DESC LIMIT 1
-            """,
-                (
-                    usuario_iptv,
-                    senha_iptv,
-                    conexoes,
-                    data_criacao,
-                    data_expiracao,
-                    plano,
-                    telefone,
-                ),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            """
+            UPDATE clientes 
+            SET usuario_iptv = ?, senha_iptv = ?, conexoes = ?, data_criacao = ?, data_expiracao = ?, plano = ?, status = 'ativo'
+            WHERE telefone_e164 = ? AND usuario_iptv IS NULL
+            ORDER BY id DESC LIMIT 1
+        """,
+            (
+                usuario_iptv,
+                senha_iptv,
+                conexoes,
+                data_criacao,
+                data_expiracao,
+                plano,
+                normalizar_telefone(telefone),
+            ),
+        ))
 
     def renovar_lista_cliente(self, usuario_iptv: str, meses: int):
         """Esta função ATUALIZA a data de expiração no banco, após a renovação no BitPanel."""
-        with self as conn:
-            cliente = self.buscar_cliente_por_usuario_iptv(usuario_iptv)
+        def renovar(conn):
+            # Lê a expiração dentro da transação, para duas renovações seguidas não se sobreporem
+            cliente = conn.execute(
+                "SELECT data_expiracao FROM clientes WHERE usuario_iptv = ?", (usuario_iptv,)
+            ).fetchone()
             if not cliente or not cliente["data_expiracao"]:
-                return
+                return None
 
             data_base = max(
                 datetime.now(), datetime.fromisoformat(cliente["data_expiracao"])
@@ -413,59 +776,58 @@ class DatabaseManager:
                 "UPDATE clientes SET data_expiracao = ?, status = 'ativo' WHERE usuario_iptv = ?",
                 (nova_expiracao, usuario_iptv),
             )
-            conn.commit()
+            return nova_expiracao
+
+        nova_expiracao = self._escrever(renovar)
+        if nova_expiracao:
             print(
                 f"[DB] Data de expiração de {usuario_iptv} atualizada para {nova_expiracao.strftime('%d/%m/%Y')}"
             )
 
     def atualizar_cliente_manual_por_id(self, cliente_id: int, dados: Dict) -> bool:
         """Atualiza dados de um cliente manualmente - CORRIGIDO"""
-        with self as conn:
-            updates = []
-            params = []
-
-            for campo, valor in dados.items():
-                if campo in [
-                    "nome",
-                    "conexoes",
-                    "data_expiracao",
-                    "status",
-                    "senha_iptv",
-                    "plano",
-                ]:
-                    updates.append(f"{campo} = ?")
-                    params.append(valor)
-
-            if updates:
-                params.append(cliente_id)  # CORRIGIDO: usar cliente_id
-                query = f"UPDATE clientes SET {', '.join(updates)} WHERE id = ?"  # CORRIGIDO
-                conn.execute(query, params)
-                conn.commit()
-                return True
+        updates = []
+        params = []
+
+        for campo, valor in dados.items():
+            if campo in [
+                "nome",
+                "conexoes",
+                "data_expiracao",
+                "status",
+                "senha_iptv",
+                "plano",
+            ]:
+                updates.append(f"{campo} = ?")
+                params.append(valor)
+
+        if updates:
+            params.append(cliente_id)  # CORRIGIDO: usar cliente_id
+            query = f"UPDATE clientes SET {', '.join(updates)} WHERE id = ?"  # CORRIGIDO
+            self._escrever(lambda conn: conn.execute(query, params))
+            return True
 
-            return False
+        return False
 
     def marcar_teste_cliente(self, telefone: str, usuario_teste: str, senha_teste: str):
         """Marcar que cliente fez teste"""
-        with self as conn:
-            conn.execute(
-                """
-                UPDATE clientes 
-                SET ultimo_teste = ?, usuario_iptv = ?, senha_iptv = ?
-                WHERE telefone = ?
-            """,
-                (datetime.now(), usuario_teste, senha_teste, telefone),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            """
+            UPDATE clientes 
+            SET ultimo_teste = ?, usuario_iptv = ?, senha_iptv = ?
+            WHERE telefone_e164 = ?
+        """,
+            (datetime.now(), usuario_teste, senha_teste, normalizar_telefone(telefone)),
+        ))
 
     def pode_fazer_teste(self, telefone: str) -> bool:
         """Verificar se cliente pode fazer teste"""
         with self as conn:
             result = conn.execute(
                 """
-                SELECT ultimo_teste FROM clientes WHERE telefone = ?
+                SELECT ultimo_teste FROM clientes WHERE telefone_e164 = ?
             """,
-                (telefone,),
+                (normalizar_telefone(telefone),),
             ).fetchone()
 
             if not result or not result["ultimo_teste"]:
@@ -479,17 +841,14 @@ class DatabaseManager:
             )
 
     def excluir_cliente_por_telefone(self, telefone: str) -> bool:
-        with self as conn:
-            cursor = conn.execute(
-                "DELETE FROM clientes WHERE telefone = ? AND usuario_iptv IS NULL",
-                (telefone,),
-            )
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "DELETE FROM clientes WHERE telefone_e164 = ? AND usuario_iptv IS NULL",
+            (normalizar_telefone(telefone),),
+        ).rowcount > 0)
 
     def excluir_cliente(self, usuario_iptv: str) -> bool:
         """Exclui um cliente do banco de dados"""
-        with self as conn:
+        def excluir(conn):
             # Verificar se existe
             cliente = conn.execute(
                 "SELECT id FROM clientes WHERE usuario_iptv = ?", (usuario_iptv,)
@@ -504,11 +863,13 @@ class DatabaseManager:
 
             # Excluir cliente
             conn.execute("DELETE FROM clientes WHERE usuario_iptv = ?", (usuario_iptv,))
-
-            conn.commit()
-            self.log_sistema("info", f"Cliente {usuario_iptv} excluído do banco")
             return True
 
+        if not self._escrever(excluir):
+            return False
+        self.log_sistema("info", f"Cliente {usuario_iptv} excluído do banco")
+        return True
+
     def obter_todos_usuarios_iptv(self) -> List[str]:
         """Retorna lista de todos os usuários IPTV cadastrados"""
         with self as conn:
@@ -537,12 +898,11 @@ class DatabaseManager:
         dados_temporarios: str = None,
     ):
         """Criar registo de pagamento (VERSÃO FINAL E CORRIGIDA)"""
-        with self as conn:
+        def inserir(conn):
             # Garante que a coluna 'copia_cola' existe na tabela
-            try:
+            colunas = [c["name"] for c in conn.execute("PRAGMA table_info(pagamentos)").fetchall()]
+            if "copia_cola" not in colunas:
                 conn.execute("ALTER TABLE pagamentos ADD COLUMN copia_cola TEXT")
-            except sqlite3.OperationalError:
-                pass  # A coluna já existe, ignora o erro e continua
 
             # Instrução INSERT sintaticamente correta
             conn.execute(
@@ -560,28 +920,35 @@ class DatabaseManager:
                     dados_temporarios,
                 ),
             )
-            conn.commit()   
 
-    def buscar_pagamento(self, payment_id: str) -> Optional[Dict]:
+        self._escrever(inserir)
+
+    def buscar_pagamento(self, payment_id: str, incluir_arquivados: bool = False) -> Optional[Dict]:
         with self as conn:
             result = conn.execute(
                 "SELECT * FROM pagamentos WHERE payment_id = ?", (payment_id,)
             ).fetchone()
+            if result is None and incluir_arquivados:
+                result = conn.execute(
+                    "SELECT * FROM pagamentos_arquivo WHERE payment_id = ?", (payment_id,)
+                ).fetchone()
             return dict(result) if result else None
 
     def atualizar_status_pagamento(self, payment_id: str, status: str):
-        with self as conn:
-            conn.execute(
-                "UPDATE pagamentos SET status = ?, data_pagamento = CURRENT_TIMESTAMP WHERE payment_id = ?",
-                (status, payment_id),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "UPDATE pagamentos SET status = ?, data_pagamento = CURRENT_TIMESTAMP WHERE payment_id = ?",
+            (status, payment_id),
+        ))
 
-    def buscar_pagamentos_por_cliente_id(self, cliente_id: int) -> List[Dict]:
+    def buscar_pagamentos_por_cliente_id(self, cliente_id: int, incluir_arquivados: bool = False) -> List[Dict]:
         with self as conn:
             results = conn.execute(
                 "SELECT * FROM pagamentos WHERE cliente_id = ?", (cliente_id,)
             ).fetchall()
+            if incluir_arquivados:
+                results += conn.execute(
+                    "SELECT * FROM pagamentos_arquivo WHERE cliente_id = ?", (cliente_id,)
+                ).fetchall()
             return [dict(row) for row in results]
 
     # === MÉTODOS PARA CONFIGURAÇÕES ===
@@ -596,14 +963,15 @@ class DatabaseManager:
     # ADICIONE ESTA FUNÇÃO
     def excluir_cliente_por_id(self, cliente_id: int) -> bool:
         """Exclui um cliente e seus pagamentos pelo ID."""
-        with self as conn:
+        def excluir(conn):
             # Primeiro, exclui os pagamentos associados para manter a integridade
             conn.execute("DELETE FROM pagamentos WHERE cliente_id = ?", (cliente_id,))
             # Depois, exclui o cliente
-            cursor = conn.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))
-            conn.commit()
-            self.log_sistema("info", f"Cliente ID {cliente_id} excluído do banco")
-            return cursor.rowcount > 0
+            return conn.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,)).rowcount > 0
+
+        excluido = self._escrever(excluir)
+        self.log_sistema("info", f"Cliente ID {cliente_id} excluído do banco")
+        return excluido
 
 
     def get_config(self, chave: str, default: str = None) -> Optional[str]:
@@ -614,22 +982,79 @@ class DatabaseManager:
             return result["valor"] if result else default
 
     def set_config(self, chave: str, valor: str):
-        with self as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO configuracoes (chave, valor) VALUES (?, ?)",
-                (chave, valor),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO configuracoes (chave, valor) VALUES (?, ?)",
+            (chave, valor),
+        ))
 
     # === MÉTODOS PARA LOGS ===
 
     def log_sistema(self, tipo: str, mensagem: str, detalhes: str = None):
+        self._escrever(lambda conn: conn.execute(
+            "INSERT INTO logs_sistema (tipo, mensagem, detalhes) VALUES (?, ?, ?)",
+            (tipo, mensagem, detalhes),
+        ), schema="logs")
+
+    def registrar_tempos_passos(self, operacao: str, resultado: str, passos: List[tuple]):
+        """
+        Grava os passos de uma execução de `operacao` ((passo, segundos, sucesso),
+        na ordem) mais uma linha 'total', todos com o resultado da operação.
+        """
+        execucao = uuid.uuid4().hex
+        linhas = [(execucao, operacao, passo, segundos, int(sucesso), resultado) for passo, segundos, sucesso in passos]
+        linhas.append((execucao, operacao, "total", sum(segundos for _, segundos, _ in passos), int(resultado == "ok"), resultado))
+        self._escrever(lambda conn: conn.executemany(
+            "INSERT INTO tempos_passos (execucao, operacao, passo, segundos, sucesso, resultado) VALUES (?, ?, ?, ?, ?, ?)",
+            linhas,
+        ), schema="logs")
+
+    def estatisticas_tempos_passos(self, dias: int = 7) -> List[Dict]:
+        """
+        p50, p95, média e falhas de cada passo de cada operação nos últimos
+        `dias`. O SQLite não tem percentil, então a conta é feita aqui
+        (nearest-rank) sobre os tempos já ordenados pela consulta.
+        """
         with self as conn:
-            conn.execute(
-                "INSERT INTO logs_sistema (tipo, mensagem, detalhes) VALUES (?, ?, ?)",
-                (tipo, mensagem, detalhes),
-            )
-            conn.commit()
+            results = conn.execute(
+                """
+                SELECT operacao, passo, segundos, sucesso FROM tempos_passos
+                WHERE data_registro >= datetime('now', ?)
+                ORDER BY operacao, passo, segundos
+                """,
+                (f"-{int(dias)} days",),
+            ).fetchall()
+
+        grupos: Dict[tuple, Dict[str, list]] = {}
+        for row in results:
+            grupo = grupos.setdefault((row["operacao"], row["passo"]), {"segundos": [], "falhas": 0})
+            grupo["segundos"].append(row["segundos"])
+            grupo["falhas"] += 0 if row["sucesso"] else 1
+
+        def percentil(valores: list, p: float) -> float:
+            return valores[max(int(-(-p * len(valores) // 100)) - 1, 0)]
+
+        estatisticas = []
+        for (operacao, passo), grupo in grupos.items():
+            valores = grupo["segundos"]
+            estatisticas.append({
+                "operacao": operacao,
+                "passo": passo,
+                "execucoes": len(valores),
+                "falhas": grupo["falhas"],
+                "p50": round(percentil(valores, 50), 2),
+                "p95": round(percentil(valores, 95), 2),
+                "media": round(sum(valores) / len(valores), 2),
+            })
+        # 'total' por último dentro de cada operação; os passos, do mais lento (p95) ao mais rápido
+        estatisticas.sort(key=lambda e: (e["operacao"], e["passo"] == "total", -e["p95"]))
+        return estatisticas
+
+    def podar_tempos_passos(self, dias: int = 30) -> int:
+        """Remove os tempos de passos mais velhos que `dias`. Retorna quantas linhas saíram."""
+        return self._escrever(lambda conn: conn.execute(
+            "DELETE FROM tempos_passos WHERE data_registro < datetime('now', ?)",
+            (f"-{int(dias)} days",),
+        ).rowcount, schema="logs")
 
     def get_logs_sistema(self, limit: int = 100) -> List[Dict]:
         with self as conn:
@@ -648,41 +1073,33 @@ class DatabaseManager:
             return dict(result) if result else None
 
     def set_conversa(self, telefone: str, contexto: str, estado: str = "{}", dados_temporarios: str = "{}"):
-        with self as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO conversas (telefone, contexto, estado, dados_temporarios, ultima_interacao) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
-                (telefone, contexto, estado, dados_temporarios),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO conversas (telefone, contexto, estado, dados_temporarios, ultima_interacao) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            (telefone, contexto, estado, dados_temporarios),
+        ), schema="chat")
 
     def atualizar_estado_conversa(self, telefone: str, estado: str):
-        with self as conn:
-            conn.execute(
-                "UPDATE conversas SET estado = ?, ultima_interacao = CURRENT_TIMESTAMP WHERE telefone = ?",
-                (estado, telefone),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "UPDATE conversas SET estado = ?, ultima_interacao = CURRENT_TIMESTAMP WHERE telefone = ?",
+            (estado, telefone),
+        ), schema="chat")
 
     def atualizar_contexto_conversa(self, telefone: str, contexto: str):
-        with self as conn:
-            conn.execute(
-                "UPDATE conversas SET contexto = ?, ultima_interacao = CURRENT_TIMESTAMP WHERE telefone = ?",
-                (contexto, telefone),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "UPDATE conversas SET contexto = ?, ultima_interacao = CURRENT_TIMESTAMP WHERE telefone = ?",
+            (contexto, telefone),
+        ), schema="chat")
 
     def atualizar_dados_temporarios_conversa(self, telefone: str, dados_temporarios: str):
-        with self as conn:
-            conn.execute(
-                "UPDATE conversas SET dados_temporarios = ?, ultima_interacao = CURRENT_TIMESTAMP WHERE telefone = ?",
-                (dados_temporarios, telefone),
-            )
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "UPDATE conversas SET dados_temporarios = ?, ultima_interacao = CURRENT_TIMESTAMP WHERE telefone = ?",
+            (dados_temporarios, telefone),
+        ), schema="chat")
 
     def deletar_conversa(self, telefone: str):
-        with self as conn:
-            conn.execute("DELETE FROM conversas WHERE telefone = ?", (telefone,))
-            conn.commit()
+        self._escrever(lambda conn: conn.execute(
+            "DELETE FROM conversas WHERE telefone = ?", (telefone,)
+        ), schema="chat")
 
     def listar_clientes_expirando(self, dias: int = 7) -> List[Dict]:
         with self as conn:
@@ -739,99 +1156,118 @@ class DatabaseManager:
             return [dict(row) for row in results]
 
     def add_template(self, nome: str, assunto: str, corpo: str, tipo: str = 'whatsapp') -> int:
-        with self as conn:
-            cursor = conn.execute(
-                "INSERT INTO templates_avisos (nome, assunto, corpo, tipo) VALUES (?, ?, ?, ?)",
-                (nome, assunto, corpo, tipo)
-            )
-            conn.commit()
-            return cursor.lastrowid
+        return self._escrever(lambda conn: conn.execute(
+            "INSERT INTO templates_avisos (nome, assunto, corpo, tipo) VALUES (?, ?, ?, ?)",
+            (nome, assunto, corpo, tipo)
+        ).lastrowid)
+
+    def salvar_template(self, nome: str, assunto: str, corpo: str):
+        """Cria o template ou substitui o que já existe com esse nome."""
+        self._escrever(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO templates_avisos (nome, assunto, corpo) VALUES (?, ?, ?)",
+            (nome, assunto, corpo)
+        ))
 
     def delete_template(self, nome: str) -> bool:
-        with self as conn:
-            cursor = conn.execute("DELETE FROM templates_avisos WHERE nome = ?", (nome,))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "DELETE FROM templates_avisos WHERE nome = ?", (nome,)
+        ).rowcount > 0)
 
-    def get_cliente_by_id(self, cliente_id: int) -> Optional[Dict]:
+    def get_cliente_by_id(self, cliente_id: int, incluir_arquivados: bool = False) -> Optional[Dict]:
         with self as conn:
             result = conn.execute("SELECT * FROM clientes WHERE id = ?", (cliente_id,)).fetchone()
+            if result is None and incluir_arquivados:
+                result = conn.execute("SELECT * FROM clientes_arquivo WHERE id = ?", (cliente_id,)).fetchone()
             return dict(result) if result else None
 
-    def get_cliente_by_usuario_iptv(self, usuario_iptv: str) -> Optional[Dict]:
-        with self as conn:
-            result = conn.execute("SELECT * FROM clientes WHERE usuario_iptv = ?", (usuario_iptv,)).fetchone()
-            return dict(result) if result else None
+    def get_cliente_by_usuario_iptv(self, usuario_iptv: str, incluir_arquivados: bool = False) -> Optional[Dict]:
+        return self.buscar_cliente_por_usuario_iptv(usuario_iptv, incluir_arquivados)
 
-    def get_cliente_by_telefone(self, telefone: str) -> Optional[Dict]:
-        with self as conn:
-            result = conn.execute("SELECT * FROM clientes WHERE telefone = ?", (telefone,)).fetchone()
-            return dict(result) if result else None
+    def get_cliente_by_telefone(self, telefone: str, incluir_arquivados: bool = False) -> Optional[Dict]:
+        return self.buscar_cliente_por_telefone(telefone, incluir_arquivados)
 
     def get_all_clientes(self) -> List[Dict]:
         with self as conn:
             results = conn.execute("SELECT * FROM clientes").fetchall()
             return [dict(row) for row in results]
 
+    def atualizar_campos_cliente(self, usuario_iptv: str, campos: Dict[str, Any]) -> bool:
+        """UPDATE de várias colunas (`campos`: coluna -> valor) do cliente `usuario_iptv`."""
+        if not campos:
+            return False
+        atribuicoes = ", ".join(f"{campo} = ?" for campo in campos)
+        return self._escrever(lambda conn: conn.execute(
+            f"UPDATE clientes SET {atribuicoes} WHERE usuario_iptv = ?", [*campos.values(), usuario_iptv]
+        ).rowcount > 0)
+
+    def remover_cliente_temporario(self, telefone: str) -> bool:
+        """Remove o cliente com lista criado na última hora para `telefone` (compra não finalizada)."""
+        def remover(conn):
+            cliente_temp = conn.execute(
+                """
+                SELECT id FROM clientes 
+                WHERE telefone_e164 = ? AND usuario_iptv IS NOT NULL 
+                AND created_at > datetime('now', '-1 hour')
+            """,
+                (normalizar_telefone(telefone),),
+            ).fetchone()
+            if not cliente_temp:
+                return False
+            conn.execute("DELETE FROM clientes WHERE id = ?", (cliente_temp["id"],))
+            return True
+
+        return self._escrever(remover)
+
     def update_cliente_status(self, usuario_iptv: str, status: str) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET status = ? WHERE usuario_iptv = ?", (status, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET status = ? WHERE usuario_iptv = ?", (status, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_plano(self, usuario_iptv: str, plano: str) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET plano = ? WHERE usuario_iptv = ?", (plano, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET plano = ? WHERE usuario_iptv = ?", (plano, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_conexoes(self, usuario_iptv: str, conexoes: int) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET conexoes = ? WHERE usuario_iptv = ?", (conexoes, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET conexoes = ? WHERE usuario_iptv = ?", (conexoes, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_senha_iptv(self, usuario_iptv: str, senha_iptv: str) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET senha_iptv = ? WHERE usuario_iptv = ?", (senha_iptv, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET senha_iptv = ? WHERE usuario_iptv = ?", (senha_iptv, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_nome(self, usuario_iptv: str, nome: str) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET nome = ? WHERE usuario_iptv = ?", (nome, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET nome = ? WHERE usuario_iptv = ?", (nome, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_telefone(self, usuario_iptv: str, telefone: str) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET telefone = ? WHERE usuario_iptv = ?", (telefone, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET telefone = ?, telefone_e164 = ? WHERE usuario_iptv = ?",
+            (telefone, normalizar_telefone(telefone), usuario_iptv),
+        ).rowcount > 0)
 
     def update_cliente_data_expiracao(self, usuario_iptv: str, data_expiracao: datetime) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET data_expiracao = ? WHERE usuario_iptv = ?", (data_expiracao, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET data_expiracao = ? WHERE usuario_iptv = ?", (data_expiracao, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_data_criacao(self, usuario_iptv: str, data_criacao: datetime) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET data_criacao = ? WHERE usuario_iptv = ?", (data_criacao, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET data_criacao = ? WHERE usuario_iptv = ?", (data_criacao, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_ultimo_teste(self, usuario_iptv: str, ultimo_teste: datetime) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET ultimo_teste = ? WHERE usuario_iptv = ?", (ultimo_teste, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET ultimo_teste = ? WHERE usuario_iptv = ?", (ultimo_teste, usuario_iptv)
+        ).rowcount > 0)
 
     def update_cliente_ultima_sincronizacao(self, usuario_iptv: str, ultima_sincronizacao: datetime) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE clientes SET ultima_sincronizacao = ? WHERE usuario_iptv = ?", (ultima_sincronizacao, usuario_iptv))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE clientes SET ultima_sincronizacao = ? WHERE usuario_iptv = ?", (ultima_sincronizacao, usuario_iptv)
+        ).rowcount > 0)
 
     def get_estatisticas(self) -> Dict[str, Any]:
         with self as conn:
@@ -855,10 +1291,9 @@ class DatabaseManager:
             return [dict(row) for row in results]
 
     def update_config(self, chave: str, valor: str, descricao: str = None) -> bool:
-        with self as conn:
-            cursor = conn.execute("UPDATE configuracoes SET valor = ?, descricao = ? WHERE chave = ?", (valor, descricao, chave))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._escrever(lambda conn: conn.execute(
+            "UPDATE configuracoes SET valor = ?, descricao = ? WHERE chave = ?", (valor, descricao, chave)
+        ).rowcount > 0)
 
     def get_pagamentos_pendentes(self) -> List[Dict]:
         with self as conn:
@@ -889,8 +1324,8 @@ class DatabaseManager:
 
     def get_pagamentos_por_cliente_telefone(self, telefone: str) -> List[Dict]:
         with self as conn:
-            query = "SELECT p.* FROM pagamentos p JOIN clientes c ON p.cliente_id = c.id WHERE c.telefone = ? ORDER BY p.data_pagamento DESC"
-            results = conn.execute(query, (telefone,)).fetchall()
+            query = "SELECT p.* FROM pagamentos p JOIN clientes c ON p.cliente_id = c.id WHERE c.telefone_e164 = ? ORDER BY p.data_pagamento DESC"
+            results = conn.execute(query, (normalizar_telefone(telefone),)).fetchall()
             return [dict(row) for row in results]
 
     def get_pagamentos_por_cliente_usuario_iptv(self, usuario_iptv: str) -> List[Dict]:
@@ -937,11 +1372,718 @@ class DatabaseManager:
             return [dict(row) for row in results]
 
     def delete_conversas_antigas(self, dias: int = 30) -> bool:
+        return self.varrer_conversas_antigas(dias) > 0
+
+    def varrer_conversas_antigas(self, dias: int = 30, lote: int = 500, tempo_max: float = 2.0) -> int:
+        """
+        Remove conversas paradas há mais de `dias` dias em lotes pequenos, com
+        commit a cada lote para não segurar o lock de escrita. Para quando o
+        tempo de `tempo_max` segundos se esgota. Conversas aguardando pagamento
+        nunca são removidas. Retorna o total de linhas apagadas.
+        """
+        data_limite = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d %H:%M:%S')
+        removidas = 0
+        inicio = time.monotonic()
+        while True:
+            cursor = self._escrever(lambda conn: conn.execute(
+                """
+                DELETE FROM conversas WHERE rowid IN (
+                    SELECT rowid FROM conversas
+                    WHERE ultima_interacao <= ?
+                      AND (estado IS NULL OR estado != 'aguardando_pagamento')
+                    ORDER BY ultima_interacao
+                    LIMIT ?
+                )
+                """,
+                (data_limite, lote),
+            ), schema="chat")
+            removidas += cursor.rowcount
+            if cursor.rowcount < lote or time.monotonic() - inicio >= tempo_max:
+                break
+        return removidas
+
+    # === ARQUIVO (LISTAS EXPIRADAS HÁ MUITO TEMPO) ===
+
+    def _criar_tabelas_arquivo(self, conn):
+        """
+        clientes_arquivo e pagamentos_arquivo guardam as linhas tiradas das
+        tabelas quentes, com as mesmas colunas mais `data_arquivamento`.
+        """
+        for tabela in ("clientes", "pagamentos"):
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {tabela}_arquivo AS SELECT *, NULL AS data_arquivamento FROM {tabela} WHERE 0"
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_clientes_arquivo_telefone_e164 ON clientes_arquivo (telefone_e164)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_clientes_arquivo_usuario_iptv ON clientes_arquivo (usuario_iptv)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_clientes_arquivo_id ON clientes_arquivo (id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pagamentos_arquivo_payment_id ON pagamentos_arquivo (payment_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pagamentos_arquivo_cliente_id ON pagamentos_arquivo (cliente_id)")
+
+    def _colunas_para_arquivo(self, conn, tabela: str) -> List[str]:
+        """Colunas da tabela quente; as que o arquivo ainda não tem são adicionadas nele."""
+        colunas = [c["name"] for c in conn.execute(f"PRAGMA table_info({tabela})").fetchall()]
+        no_arquivo = {c["name"] for c in conn.execute(f"PRAGMA table_info({tabela}_arquivo)").fetchall()}
+        for coluna in colunas:
+            if coluna not in no_arquivo:
+                conn.execute(f"ALTER TABLE {tabela}_arquivo ADD COLUMN {coluna}")
+        return colunas
+
+    def arquivar_listas_antigas(self, dias_expiradas: int = 365, dias_testes: int = 30, lote: int = 200) -> Dict[str, int]:
+        """
+        Move para o arquivo as listas expiradas há mais de `dias_expiradas` e
+        os testes (`teste`, `teste_parcial`) com mais de `dias_testes`, junto
+        com os pagamentos delas. Clientes com pagamento pendente ficam. Roda em
+        lotes de `lote` clientes, um commit por lote. Retorna quantos clientes
+        e pagamentos foram arquivados.
+        """
+        agora = datetime.now()
+        params = {
+            "limite_expiradas": agora - timedelta(days=dias_expiradas),
+            "limite_testes": agora - timedelta(days=dias_testes),
+            "lote": lote,
+        }
+
+        def arquivar_lote(conn):
+            colunas_clientes = ", ".join(self._colunas_para_arquivo(conn, "clientes"))
+            colunas_pagamentos = ", ".join(self._colunas_para_arquivo(conn, "pagamentos"))
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS arquivar_ids (cliente_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM arquivar_ids")
+            conn.execute(
+                """
+                INSERT INTO arquivar_ids
+                SELECT c.id FROM clientes c
+                WHERE (
+                        c.data_expiracao < :limite_expiradas
+                     OR (c.status IN ('teste', 'teste_parcial')
+                         AND COALESCE(c.data_expiracao, c.created_at) < :limite_testes)
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM pagamentos p WHERE p.cliente_id = c.id AND p.status = 'pendente'
+                )
+                LIMIT :lote
+                """,
+                params,
+            )
+            conn.execute(
+                f"""
+                INSERT INTO clientes_arquivo ({colunas_clientes}, data_arquivamento)
+                SELECT {colunas_clientes}, CURRENT_TIMESTAMP FROM clientes
+                WHERE id IN (SELECT cliente_id FROM arquivar_ids)
+                """
+            )
+            pagamentos = conn.execute(
+                f"""
+                INSERT INTO pagamentos_arquivo ({colunas_pagamentos}, data_arquivamento)
+                SELECT {colunas_pagamentos}, CURRENT_TIMESTAMP FROM pagamentos
+                WHERE cliente_id IN (SELECT cliente_id FROM arquivar_ids)
+                """
+            ).rowcount
+            conn.execute("DELETE FROM pagamentos WHERE cliente_id IN (SELECT cliente_id FROM arquivar_ids)")
+            clientes = conn.execute("DELETE FROM clientes WHERE id IN (SELECT cliente_id FROM arquivar_ids)").rowcount
+            return clientes, pagamentos
+
+        total = {"clientes": 0, "pagamentos": 0}
+        while True:
+            clientes, pagamentos = self._escrever(arquivar_lote)
+            total["clientes"] += clientes
+            total["pagamentos"] += pagamentos
+            if clientes < lote:
+                break
+        return total
+
+    # === SEGMENTOS DE PÚBLICO DOS AVISOS ===
+
+    # Regras de cada segmento; :agora e :limite (agora + 7 dias) são preenchidos na atualização
+    SEGMENTOS_AVISOS = {
+        "ativos": "data_expiracao > :agora",
+        "a_vencer": "data_expiracao > :agora AND data_expiracao <= :limite",
+        "expirados": "data_expiracao IS NOT NULL AND data_expiracao <= :agora",
+        "todos": "telefone IS NOT NULL",
+    }
+
+    def _criar_segmentos_avisos(self, conn):
+        """Tabelas com os membros e a contagem já calculados de cada público de avisos."""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segmentos_membros (
+                segmento TEXT NOT NULL,
+                cliente_id INTEGER NOT NULL,
+                telefone_e164 TEXT,
+                PRIMARY KEY (segmento, cliente_id)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_segmentos_membros_cliente ON segmentos_membros (cliente_id)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS segmentos_resumo (segmento TEXT PRIMARY KEY, total INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segmentos_controle (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                ultimo_seq INTEGER NOT NULL,
+                ultima_atualizacao DATETIME NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clientes_data_expiracao ON clientes (data_expiracao)"
+        )
+
+    def atualizar_segmentos_avisos(self) -> int:
+        """
+        Atualiza os segmentos só com o que mudou: clientes alterados desde o
+        último seq do log de alterações e clientes cuja data de expiração
+        cruzou um limite (agora ou agora + 7 dias) desde a última vez.
+        Na primeira execução, ou se o log foi podado antes de ser lido,
+        reconstrói tudo. Retorna quantos clientes foram reavaliados.
+        """
+        agora = datetime.now()
+        params = {"agora": agora, "limite": agora + timedelta(days=7)}
+
+        def atualizar(conn):
+            controle = conn.execute("SELECT ultimo_seq, ultima_atualizacao FROM segmentos_controle").fetchone()
+            topo = self._topo_alteracoes(conn)
+            primeiro = conn.execute("SELECT MIN(seq) FROM main.alteracoes").fetchone()[0]
+
+            reconstruir = controle is None or (
+                topo > controle["ultimo_seq"] and (primeiro is None or primeiro > controle["ultimo_seq"] + 1)
+            )
+
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS segmentos_afetados (cliente_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM segmentos_afetados")
+            if reconstruir:
+                conn.execute("DELETE FROM segmentos_membros")
+                conn.execute("INSERT INTO segmentos_afetados SELECT id FROM clientes")
+            else:
+                anterior = datetime.fromisoformat(controle["ultima_atualizacao"])
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO segmentos_afetados
+                    SELECT CAST(chave AS INTEGER) FROM main.alteracoes WHERE tabela = 'clientes' AND seq > ?
+                    """,
+                    (controle["ultimo_seq"],),
+                )
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO segmentos_afetados
+                    SELECT id FROM clientes
+                    WHERE (data_expiracao > :anterior AND data_expiracao <= :agora)
+                       OR (data_expiracao > :anterior_limite AND data_expiracao <= :limite)
+                    """,
+                    {**params, "anterior": anterior, "anterior_limite": anterior + timedelta(days=7)},
+                )
+                conn.execute(
+                    "DELETE FROM segmentos_membros WHERE cliente_id IN (SELECT cliente_id FROM segmentos_afetados)"
+                )
+
+            for segmento, condicao in self.SEGMENTOS_AVISOS.items():
+                conn.execute(
+                    f"""
+                    INSERT INTO segmentos_membros (segmento, cliente_id, telefone_e164)
+                    SELECT '{segmento}', id, telefone_e164 FROM clientes
+                    WHERE id IN (SELECT cliente_id FROM segmentos_afetados) AND {condicao}
+                    """,
+                    params,
+                )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO segmentos_resumo (segmento, total)
+                    SELECT ?, COUNT(DISTINCT telefone_e164) FROM segmentos_membros WHERE segmento = ?
+                    """,
+                    (segmento, segmento),
+                )
+
+            afetados = conn.execute("SELECT COUNT(*) FROM segmentos_afetados").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO segmentos_controle (id, ultimo_seq, ultima_atualizacao) VALUES (1, ?, ?)",
+                (topo, agora),
+            )
+            return afetados
+
+        return self._escrever(atualizar)
+
+    def atualizar_segmentos_pendentes(self) -> bool:
+        """
+        Se algum cliente mudou desde o último cálculo dos segmentos, atualiza
+        só ele(s) (atualizar_segmentos_avisos é incremental). Chamado depois de
+        cada escrita, para a contagem e o envio de avisos verem o cliente no
+        segmento certo sem esperar o AtualizadorSegmentos.
+        """
+        if getattr(self._pos_escrita, "ativo", False) or getattr(self._abertas, "pilha", None):
+            # A própria atualização é uma escrita; e uma conexão ainda aberta nesta
+            # thread pode estar no meio de uma transação: fica para o AtualizadorSegmentos
+            return False
+        try:
+            with self as conn:
+                controle = conn.execute("SELECT ultimo_seq FROM segmentos_controle").fetchone()
+                pendente = controle is not None and conn.execute(
+                    "SELECT 1 FROM main.alteracoes WHERE seq > ? AND tabela = 'clientes' LIMIT 1",
+                    (controle["ultimo_seq"],),
+                ).fetchone() is not None
+        except sqlite3.OperationalError:
+            # Tabelas ainda não criadas (init_database em andamento)
+            return False
+        if not pendente:
+            return False
+
+        self._pos_escrita.ativo = True
+        try:
+            self.atualizar_segmentos_avisos()
+            return True
+        except Exception as e:
+            # A escrita que disparou isto já foi confirmada; o AtualizadorSegmentos recupera depois
+            print(f"⚠️ [DB] Segmentos de avisos não atualizados após a escrita: {e}")
+            return False
+        finally:
+            self._pos_escrita.ativo = False
+
+    def segmentos_avisos_atualizados_em(self) -> Optional[datetime]:
+        """Quando os segmentos foram recalculados pela última vez (None se nunca)."""
         with self as conn:
-            data_limite = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d %H:%M:%S')
-            cursor = conn.execute("DELETE FROM conversas WHERE ultima_interacao <= ?", (data_limite,))
-            conn.commit()
-            return cursor.rowcount > 0
+            row = conn.execute("SELECT ultima_atualizacao FROM segmentos_controle").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def atualizar_segmentos_se_velhos(self, minutos: int) -> bool:
+        """
+        Recalcula os segmentos só se o último cálculo tiver mais de `minutos`
+        (ou nunca tiver rodado). Normalmente quem os mantém em dia são as
+        próprias escritas em clientes e o AtualizadorSegmentos; isto só cobre
+        a tarefa parada ou atrasada sem pôr uma escrita em toda leitura da
+        página de avisos.
+        """
+        atualizado_em = self.segmentos_avisos_atualizados_em()
+        if atualizado_em and datetime.now() - atualizado_em < timedelta(minutes=minutos):
+            return False
+        self.atualizar_segmentos_avisos()
+        return True
+
+    def listar_segmento_avisos(self, segmento: str) -> List[Dict]:
+        """Clientes do segmento já materializado, no formato usado pelo envio de avisos."""
+        with self as conn:
+            results = conn.execute(
+                """
+                SELECT c.nome, c.telefone, c.usuario_iptv, c.data_expiracao
+                FROM segmentos_membros s JOIN clientes c ON c.id = s.cliente_id
+                WHERE s.segmento = ?
+                ORDER BY c.data_expiracao ASC
+                """,
+                (segmento,),
+            ).fetchall()
+            return [dict(row) for row in results]
+
+    def changes_since(self, seq: int = 0, limite: int = 1000, schema: str = "main") -> List[Dict]:
+        """
+        Alterações com seq maior que o informado, em ordem. Quem consome guarda
+        o último seq recebido e usa na próxima chamada. O log de `main` cobre
+        clientes e pagamentos; o de `chat` cobre conversas, com seq próprio.
+        """
+        if schema not in ("main", "chat"):
+            raise ValueError(f"Log de alterações desconhecido: {schema}")
+        with self as conn:
+            results = conn.execute(
+                f"SELECT seq, tabela, chave, operacao, data_alteracao FROM {schema}.alteracoes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limite),
+            ).fetchall()
+            return [dict(row) for row in results]
+
+    def ultimo_seq_alteracoes(self) -> int:
+        with self as conn:
+            result = conn.execute("SELECT MAX(seq) FROM main.alteracoes").fetchone()
+            return result[0] or 0
+
+    def podar_alteracoes(self, dias: int = 7) -> int:
+        """Remove dos logs as alterações mais velhas que `dias`. Retorna quantas saíram."""
+        total = 0
+        # Um arquivo por vez, para não segurar o lock do principal enquanto poda o do chat
+        for schema in ("main", "chat"):
+            # data_alteracao vem de CURRENT_TIMESTAMP (UTC), então a conta fica no SQLite
+            total += self._escrever(lambda conn: conn.execute(
+                "DELETE FROM alteracoes WHERE data_alteracao < datetime('now', ?)",
+                (f"-{int(dias)} days",),
+            ).rowcount, schema=schema)
+        return total
+
+    # === FILA DE JOBS DO BITPANEL ===
+
+    def _criar_fila_jobs(self, conn):
+        """Fila durável das automações do BitPanel (veja fila_jobs.py)."""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                chave_idempotencia TEXT UNIQUE,
+                estado TEXT NOT NULL DEFAULT 'pendente', -- 'pendente', 'executando', 'concluido', 'falhou'
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                max_tentativas INTEGER NOT NULL DEFAULT 3,
+                disponivel_em DATETIME NOT NULL,
+                lease_ate DATETIME,
+                worker TEXT,
+                resultado TEXT,
+                erro TEXT,
+                criado_em DATETIME NOT NULL,
+                atualizado_em DATETIME NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_estado_disponivel ON jobs (estado, disponivel_em)"
+        )
+
+    @staticmethod
+    def _job_para_dict(row) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        job["resultado"] = json.loads(job["resultado"]) if job["resultado"] else None
+        return job
+
+    def enfileirar_job(self, tipo: str, payload: Dict, chave_idempotencia: str = None, max_tentativas: int = 3) -> int:
+        """
+        Grava um job pendente e retorna o id. Se já existe um job com a mesma
+        `chave_idempotencia`, nada é inserido e o id dele é retornado: o mesmo
+        pagamento notificado duas vezes vira um job só.
+        """
+        agora = datetime.now()
+
+        def inserir(conn):
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs (tipo, payload, chave_idempotencia, max_tentativas, disponivel_em, criado_em, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (tipo, json.dumps(payload), chave_idempotencia, max_tentativas, agora, agora, agora),
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+            return conn.execute(
+                "SELECT id FROM jobs WHERE chave_idempotencia = ?", (chave_idempotencia,)
+            ).fetchone()["id"]
+
+        return self._escrever(inserir)
+
+    def reservar_job(self, worker: str, lease_segundos: int) -> Optional[Dict]:
+        """
+        Reserva o próximo job disponível para `worker` até o lease expirar.
+        Também retoma jobs 'executando' cujo lease venceu (o processo caiu no
+        meio); se esses já gastaram todas as tentativas, vão para 'falhou'.
+        """
+        agora = datetime.now()
+
+        def reservar(conn):
+            while True:
+                row = conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE (estado = 'pendente' AND disponivel_em <= :agora)
+                       OR (estado = 'executando' AND lease_ate <= :agora)
+                    ORDER BY disponivel_em, id
+                    LIMIT 1
+                    """,
+                    {"agora": agora},
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["tentativas"] >= row["max_tentativas"]:
+                    conn.execute(
+                        "UPDATE jobs SET estado = 'falhou', erro = ?, lease_ate = NULL, atualizado_em = ? WHERE id = ?",
+                        (row["erro"] or "Lease expirou na última tentativa", agora, row["id"]),
+                    )
+                    continue
+                conn.execute(
+                    """
+                    UPDATE jobs SET estado = 'executando', tentativas = tentativas + 1,
+                        lease_ate = ?, worker = ?, atualizado_em = ?
+                    WHERE id = ?
+                    """,
+                    (agora + timedelta(seconds=lease_segundos), worker, agora, row["id"]),
+                )
+                return self._job_para_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+        return self._escrever(reservar)
+
+    def renovar_lease_job(self, job_id: int, tentativa: int, lease_segundos: int) -> bool:
+        """
+        Estende o lease de um job em execução. `tentativa` garante que só a
+        execução que reservou o job o renova: se o lease já venceu e outro
+        worker o pegou, retorna False.
+        """
+        agora = datetime.now()
+        return self._escrever(lambda conn: conn.execute(
+            """
+            UPDATE jobs SET lease_ate = ?, atualizado_em = ?
+            WHERE id = ? AND estado = 'executando' AND tentativas = ?
+            """,
+            (agora + timedelta(seconds=lease_segundos), agora, job_id, tentativa),
+        ).rowcount > 0)
+
+    def concluir_job(self, job_id: int, resultado: Any = None):
+        self._escrever(lambda conn: conn.execute(
+            "UPDATE jobs SET estado = 'concluido', resultado = ?, erro = NULL, lease_ate = NULL, atualizado_em = ? WHERE id = ?",
+            (json.dumps(resultado, default=str), datetime.now(), job_id),
+        ))
+
+    def falhar_job(self, job_id: int, erro: str, reagendar_em: Optional[int] = None, resultado: Any = None):
+        """
+        Registra a falha de uma tentativa. Com `reagendar_em` (segundos) o job
+        volta a 'pendente' se ainda tiver tentativas; senão fica em 'falhou'.
+        """
+        agora = datetime.now()
+
+        def falhar(conn):
+            row = conn.execute("SELECT tentativas, max_tentativas FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            if reagendar_em is not None and row["tentativas"] < row["max_tentativas"]:
+                estado, disponivel_em = "pendente", agora + timedelta(seconds=reagendar_em)
+            else:
+                estado, disponivel_em = "falhou", agora
+            conn.execute(
+                """
+                UPDATE jobs SET estado = ?, erro = ?, resultado = ?, disponivel_em = ?,
+                    lease_ate = NULL, atualizado_em = ?
+                WHERE id = ?
+                """,
+                (estado, erro, json.dumps(resultado, default=str) if resultado is not None else None,
+                 disponivel_em, agora, job_id),
+            )
+            return estado
+
+        return self._escrever(falhar)
+
+    def buscar_job(self, job_id: int) -> Optional[Dict]:
+        with self as conn:
+            return self._job_para_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def buscar_job_ativo(self, tipo: str) -> Optional[Dict]:
+        """Job mais recente de `tipo` ainda pendente ou executando (None se não há)."""
+        with self as conn:
+            return self._job_para_dict(conn.execute(
+                "SELECT * FROM jobs WHERE tipo = ? AND estado IN ('pendente', 'executando') ORDER BY id DESC LIMIT 1",
+                (tipo,),
+            ).fetchone())
+
+    def contar_jobs_por_estado(self) -> Dict[str, int]:
+        with self as conn:
+            results = conn.execute("SELECT estado, COUNT(*) AS total FROM jobs GROUP BY estado").fetchall()
+            return {row["estado"]: row["total"] for row in results}
+
+    # === AGENDADOR DE SINCRONIZAÇÃO ===
+
+    def _criar_controle_sincronizacao(self, conn):
+        """Última tentativa de sincronizar cada usuário, para o agendador não insistir em quem falhou."""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sincronizacao_controle (
+                usuario_iptv TEXT PRIMARY KEY,
+                ultima_tentativa DATETIME NOT NULL,
+                ultimo_erro TEXT,
+                nao_encontrado_em DATETIME
+            )
+            """
+        )
+
+    # Ordem de prioridade do agendador (menor primeiro)
+    PRIORIDADES_SINCRONIZACAO = {0: "nunca_sincronizado", 1: "expirando", 2: "renovado", 3: "desatualizado"}
+
+    def selecionar_clientes_para_sincronizar(
+        self,
+        limite: int,
+        desatualizado_horas: int = 24,
+        expirando_dias: int = 3,
+        expirando_horas: int = 6,
+        pausa_nao_encontrado_horas: int = 24,
+        pausa_falha_minutos: int = 60,
+    ) -> List[Dict]:
+        """
+        Próximos usuários a sincronizar, por prioridade: nunca sincronizados;
+        expirando em até `expirando_dias` (ou expirados há menos de um dia) e
+        sem sync há `expirando_horas`; com pagamento aprovado depois do último
+        sync; e sync mais velho que `desatualizado_horas`. Pula quem o painel
+        não encontrou há menos de `pausa_nao_encontrado_horas` e quem falhou há
+        menos de `pausa_falha_minutos`.
+        """
+        agora = datetime.now()
+        params = {
+            "limite": limite,
+            "expira_de": agora - timedelta(days=1),
+            "expira_ate": agora + timedelta(days=expirando_dias),
+            "sync_expirando": agora - timedelta(hours=expirando_horas),
+            "sync_desatualizado": agora - timedelta(hours=desatualizado_horas),
+            "pausa_nao_encontrado": agora - timedelta(hours=pausa_nao_encontrado_horas),
+            "pausa_falha": agora - timedelta(minutes=pausa_falha_minutos),
+        }
+        # datetime() normaliza os formatos misturados ('T' ou espaço, com ou sem
+        # microssegundos); data_pagamento vem de CURRENT_TIMESTAMP, em UTC
+        with self as conn:
+            results = conn.execute(
+                """
+                SELECT usuario_iptv, prioridade FROM (
+                    SELECT c.usuario_iptv, c.ultima_sincronizacao, c.data_expiracao,
+                        CASE
+                            WHEN c.ultima_sincronizacao IS NULL THEN 0
+                            WHEN datetime(c.data_expiracao) BETWEEN datetime(:expira_de) AND datetime(:expira_ate)
+                                 AND datetime(c.ultima_sincronizacao) < datetime(:sync_expirando) THEN 1
+                            WHEN EXISTS (
+                                SELECT 1 FROM pagamentos p
+                                WHERE p.cliente_id = c.id AND p.status = 'approved'
+                                  AND datetime(p.data_pagamento, 'localtime') > datetime(c.ultima_sincronizacao)
+                            ) THEN 2
+                            WHEN datetime(c.ultima_sincronizacao) < datetime(:sync_desatualizado) THEN 3
+                        END AS prioridade
+                    FROM clientes c
+                    LEFT JOIN sincronizacao_controle s ON s.usuario_iptv = c.usuario_iptv
+                    WHERE c.usuario_iptv IS NOT NULL AND c.usuario_iptv != ''
+                      AND (s.nao_encontrado_em IS NULL OR datetime(s.nao_encontrado_em) < datetime(:pausa_nao_encontrado))
+                      AND (s.ultimo_erro IS NULL OR datetime(s.ultima_tentativa) < datetime(:pausa_falha))
+                )
+                WHERE prioridade IS NOT NULL
+                ORDER BY prioridade, datetime(ultima_sincronizacao), datetime(data_expiracao)
+                LIMIT :limite
+                """,
+                params,
+            ).fetchall()
+            return [
+                {"usuario_iptv": row["usuario_iptv"], "motivo": self.PRIORIDADES_SINCRONIZACAO[row["prioridade"]]}
+                for row in results
+            ]
+
+    def registrar_tentativa_sincronizacao(self, usuario_iptv: str, erro: str = None, nao_encontrado: bool = False):
+        """Guarda o resultado da última tentativa de sincronizar `usuario_iptv`."""
+        agora = datetime.now()
+        self._escrever(lambda conn: conn.execute(
+            """
+            INSERT OR REPLACE INTO sincronizacao_controle (usuario_iptv, ultima_tentativa, ultimo_erro, nao_encontrado_em)
+            VALUES (?, ?, ?, ?)
+            """,
+            (usuario_iptv, agora, erro, agora if nao_encontrado else None),
+        ))
+
+    # === DISPONIBILIDADE DE USUÁRIOS IPTV ===
+
+    def _criar_reservas_usuario(self, conn):
+        """Nomes já vistos no painel e reservas de quem está comprando, para recusar conflitos na conversa."""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usuarios_painel (
+                usuario_iptv TEXT PRIMARY KEY,
+                visto_em DATETIME NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reservas_usuario (
+                usuario_iptv TEXT PRIMARY KEY,
+                telefone TEXT NOT NULL,
+                expira_em DATETIME NOT NULL,
+                criado_em DATETIME NOT NULL
+            )
+            """
+        )
+
+    def carregar_indice_usuarios(self):
+        """Carrega nomes do painel e reservas ativas no índice em memória (chamado na inicialização)."""
+        indice = self.indice_usuarios
+        if indice is None:
+            return
+        with self as conn:
+            painel = [row[0] for row in conn.execute("SELECT usuario_iptv FROM usuarios_painel")]
+            reservas = [
+                (row["usuario_iptv"], row["telefone"], datetime.fromisoformat(row["expira_em"]))
+                for row in conn.execute(
+                    "SELECT usuario_iptv, telefone, expira_em FROM reservas_usuario WHERE expira_em > ?",
+                    (datetime.now(),),
+                )
+            ]
+        indice.carregar(painel, reservas)
+        print(f"[DB] Índice de usuários IPTV carregado: {len(painel)} do painel, {len(reservas)} reservas")
+
+    def registrar_usuarios_painel(self, usuarios) -> int:
+        """Marca `usuarios` como existentes no painel (ex.: nomes lidos da tabela de /list)."""
+        usuarios = [u for u in usuarios if u]
+        if not usuarios:
+            return 0
+        agora = datetime.now()
+        self._escrever(lambda conn: conn.executemany(
+            "INSERT OR REPLACE INTO usuarios_painel (usuario_iptv, visto_em) VALUES (?, ?)",
+            [(usuario, agora) for usuario in usuarios],
+        ))
+        if self.indice_usuarios is not None:
+            self.indice_usuarios.adicionar_painel(usuarios)
+        return len(usuarios)
+
+    def verificar_usuario_disponivel(self, usuario_iptv: str, telefone: str) -> Optional[str]:
+        """
+        None se `telefone` pode escolher `usuario_iptv`; senão o motivo:
+        "painel" (o nome já existe no BitPanel ou na base, inclusive arquivado)
+        ou "reservado" (outro cliente está comprando com esse nome).
+        """
+        if self.indice_usuarios is not None:
+            motivo = self.indice_usuarios.ocupado(usuario_iptv, telefone)
+            if motivo:
+                return motivo
+        if self.buscar_cliente_por_usuario_iptv(usuario_iptv, incluir_arquivados=True):
+            return "painel"
+        return None
+
+    def reservar_usuario_iptv(self, usuario_iptv: str, telefone: str, minutos: int) -> bool:
+        """
+        Reserva `usuario_iptv` para `telefone` por `minutos`. Renova a reserva
+        se ela já é desse telefone; falha se outro telefone tem uma reserva
+        ainda válida. A checagem e a escrita rodam na mesma transação
+        (BEGIN IMMEDIATE), então dois clientes nunca ficam com o mesmo nome.
+        """
+        agora = datetime.now()
+        expira_em = agora + timedelta(minutes=minutos)
+
+        def reservar(conn):
+            atual = conn.execute(
+                "SELECT telefone FROM reservas_usuario WHERE usuario_iptv = ? AND expira_em > ?",
+                (usuario_iptv, agora),
+            ).fetchone()
+            if atual is not None and atual["telefone"] != telefone:
+                return False
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO reservas_usuario (usuario_iptv, telefone, expira_em, criado_em)
+                VALUES (?, ?, ?, ?)
+                """,
+                (usuario_iptv, telefone, expira_em, agora),
+            )
+            return True
+
+        reservado = self._escrever(reservar)
+        if reservado and self.indice_usuarios is not None:
+            self.indice_usuarios.guardar_reserva(usuario_iptv, telefone, expira_em)
+        return reservado
+
+    def liberar_reserva_usuario(self, usuario_iptv: str, telefone: str = None):
+        """Desfaz a reserva de `usuario_iptv`; com `telefone`, só se a reserva for dele."""
+        if telefone is None:
+            self._escrever(lambda conn: conn.execute(
+                "DELETE FROM reservas_usuario WHERE usuario_iptv = ?", (usuario_iptv,)
+            ))
+        else:
+            self._escrever(lambda conn: conn.execute(
+                "DELETE FROM reservas_usuario WHERE usuario_iptv = ? AND telefone = ?", (usuario_iptv, telefone)
+            ))
+        if self.indice_usuarios is not None:
+            self.indice_usuarios.remover_reserva(usuario_iptv, telefone)
+
+    def podar_reservas_usuario(self) -> int:
+        """Remove as reservas vencidas."""
+        removidas = self._escrever(lambda conn: conn.execute(
+            "DELETE FROM reservas_usuario WHERE expira_em <= ?", (datetime.now(),)
+        ).rowcount)
+        if self.indice_usuarios is not None:
+            self.indice_usuarios.remover_expiradas()
+        return removidas
 
     def get_clientes_por_status(self, status: str) -> List[Dict]:
         with self as conn:
@@ -1578,5 +2720,64 @@ class DatabaseManager:
             return [dict(row) for row in results]
 
 
-db = DatabaseManager()
-db.init_database()
\ No newline at end of file
+class _ConexaoLeitura(sqlite3.Connection):
+    """Conexão que informa ao DatabaseLeitura quanto tempo ficou aberta."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._aberta_em = time.perf_counter()
+        self._medidor = None
+
+    def close(self):
+        if self._medidor is not None:
+            self._medidor._registrar_uso(time.perf_counter() - self._aberta_em)
+            self._medidor = None
+        super().close()
+
+
+class DatabaseLeitura(DatabaseManager):
+    """
+    Acesso somente leitura para o dashboard e os relatórios. Usa conexões
+    próprias (`mode=ro` + `query_only`), então as consultas pesadas das páginas
+    nunca pegam o lock de escrita usado pelo webhook do chat. Todos os métodos
+    de consulta do DatabaseManager funcionam aqui; os de escrita falham.
+    """
+
+    def __init__(self, db_path: str = None, armazenamento: Armazenamento = None):
+        super().__init__(db_path, armazenamento)
+        self._lock_metricas = threading.Lock()
+        self._conexoes = 0
+        self._tempo_total = 0.0
+        self._tempo_maximo = 0.0
+
+    def get_connection(self):
+        conn = self.armazenamento.conectar(somente_leitura=True, factory=_ConexaoLeitura)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn._medidor = self
+        return conn
+
+    def _registrar_uso(self, duracao: float):
+        with self._lock_metricas:
+            self._conexoes += 1
+            self._tempo_total += duracao
+            self._tempo_maximo = max(self._tempo_maximo, duracao)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Quantas conexões de leitura foram usadas e por quanto tempo."""
+        with self._lock_metricas:
+            return {
+                "conexoes": self._conexoes,
+                "tempo_total_ms": round(self._tempo_total * 1000, 2),
+                "tempo_medio_ms": round(self._tempo_total * 1000 / self._conexoes, 2) if self._conexoes else 0,
+                "tempo_maximo_ms": round(self._tempo_maximo * 1000, 2),
+            }
+
+
+db = DatabaseManager(indice_clientes=IndiceClientes(Config.INDICE_CLIENTES_MAX), indice_usuarios=IndiceUsuarios())
+db.init_database()
+db.aquecer_indice_clientes()
+db.carregar_indice_usuarios()
+
+# Conexões separadas, somente leitura, para as páginas de relatório do dashboard
+db_leitura = DatabaseLeitura(armazenamento=db.armazenamento)
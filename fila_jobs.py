@@ -0,0 +1,406 @@
+# fila_jobs.py - Fila durável (SQLite) das automações do BitPanel
+"""
+Criações, renovações, testes e a sincronização em massa no BitPanel não
+rodam mais na thread de quem pediu (webhook do Mercado Pago, POST do
+dashboard, worker do WhatsApp): quem pede grava um job na tabela `jobs` e
+os workers daqui, donos das sessões do pool, executam um de cada vez por
+sessão.
+
+Execução "pelo menos uma vez": o job fica reservado por um lease, renovado
+enquanto o handler roda; se o processo cair no meio, o lease vence e outro
+worker o retoma. Uma chave de idempotência (ex.: o payment_id) impede que a
+mesma notificação vire dois jobs, e os handlers de criação e renovação
+conferem, numa tentativa retomada, se a automação já tinha sido feita (a
+criação pergunta ao próprio painel se a lista já existe).
+
+O handler de cada tipo recebe (payload, job) e devolve o resultado. Exceção
+= falha temporária (timeout do Selenium, Chrome caído, erro de rede), o job é
+repetido com espera crescente. Resultado vazio
+ou com "erro" = falha definitiva: a automação pode ter ido até a metade, então
+não é repetida sozinha. Quando um job de cliente falha de vez, o cliente
+recebe a mensagem de suporte (AO_FALHAR).
+
+Com o circuito do BitPanel aberto (saude_bitpanel.py) os workers não
+reservam jobs: os pedidos continuam entrando e esperam o painel voltar.
+"""
+
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from database import db
+from saude_bitpanel import circuito_bitpanel
+from sessoes_bitpanel import SessaoIndisponivel
+
+ESTADOS_FINAIS = ("concluido", "falhou")
+
+
+def _criar_lista(payload: Dict, job: Dict) -> Optional[Dict]:
+    from gemini_bot import gemini_bot
+
+    dados = payload["dados"]
+    if job["tentativas"] > 1:
+        # Retomado depois de uma queda: a lista pode ter sido criada (e até salva) antes dela
+        cliente = db.buscar_cliente_por_usuario_iptv(dados["usuario"])
+        if cliente and cliente.get("senha_iptv"):
+            db.liberar_reserva_usuario(dados["usuario"])
+            return {"usuario": dados["usuario"], "ja_criada": True}
+        no_painel = _lista_no_painel(dados["usuario"])
+        if no_painel:
+            print(f"⏭️ [FILA JOBS] Job {job['id']}: '{dados['usuario']}' já existe no painel, só falta salvar")
+            gemini_bot.concluir_compra(payload["telefone"], dados, no_painel)
+            db.registrar_usuarios_painel([dados["usuario"]])
+            db.liberar_reserva_usuario(dados["usuario"])
+            return {"usuario": dados["usuario"], "ja_criada": True}
+    if gemini_bot.processar_pagamento_aprovado(payload["telefone"], dados, avisar_inicio=job["tentativas"] == 1):
+        # A lista existe no painel: o nome sai das reservas e entra no índice de usuários do painel
+        db.registrar_usuarios_painel([dados["usuario"]])
+        db.liberar_reserva_usuario(dados["usuario"])
+        return {"usuario": dados["usuario"]}
+    return None
+
+
+def _lista_no_painel(usuario: str) -> Optional[Dict]:
+    """
+    Dados da lista `usuario` se ela já existe no painel, None se não existe.
+    Sem resposta do painel levanta exceção: o job é repetido mais tarde em vez
+    de criar uma segunda lista às cegas.
+    """
+    from sessoes_bitpanel import pool_bitpanel
+
+    with pool_bitpanel.sessao() as manager:
+        dados_painel = manager.sincronizar_dados_usuario(usuario, headless=True)
+    if dados_painel.get("nao_encontrado"):
+        return None
+    if "erro" in dados_painel or not dados_painel.get("senha"):
+        raise RuntimeError(f"Não foi possível conferir '{usuario}' no painel: {dados_painel.get('erro')}")
+    return dados_painel
+
+
+def payload_renovacao(telefone: str, dados: Dict, **extras) -> Dict:
+    """
+    Payload do job de renovação, com a expiração da lista antes de renovar:
+    numa tentativa retomada, `_renovar_lista` a compara com a atual para não
+    renovar de novo uma lista que o painel já renovou.
+    """
+    cliente = db.buscar_cliente_por_usuario_iptv(dados["usuario_selecionado"])
+    expiracao_anterior = cliente.get("data_expiracao") if cliente else None
+    return {"telefone": telefone, "dados": dados, "expiracao_anterior": expiracao_anterior, **extras}
+
+
+def _renovar_lista(payload: Dict, job: Dict) -> Optional[Dict]:
+    from gemini_bot import gemini_bot
+
+    dados = payload["dados"]
+    if job["tentativas"] > 1 and _ja_renovada(dados["usuario_selecionado"], payload.get("expiracao_anterior")):
+        print(f"⏭️ [FILA JOBS] Job {job['id']}: '{dados['usuario_selecionado']}' já foi renovada antes da queda")
+        return {"usuario": dados["usuario_selecionado"], "meses": dados["meses"], "ja_renovada": True}
+    if gemini_bot.processar_pagamento_renovacao(payload["telefone"], dados, avisar_inicio=job["tentativas"] == 1):
+        return {"usuario": dados["usuario_selecionado"], "meses": dados["meses"]}
+    return None
+
+
+def _ja_renovada(usuario: str, expiracao_anterior: Optional[str]) -> bool:
+    """True se a expiração local de `usuario` já passou da que ele tinha quando o job foi criado."""
+    cliente = db.buscar_cliente_por_usuario_iptv(usuario)
+    atual = cliente.get("data_expiracao") if cliente else None
+    if not atual:
+        return False
+    if not expiracao_anterior:
+        return True
+    return datetime.fromisoformat(str(atual)) > datetime.fromisoformat(str(expiracao_anterior))
+
+
+def _criar_teste(payload: Dict, job: Dict) -> Dict:
+    """Cria o teste no BitPanel e salva no banco local. Devolve o que o dashboard precisa mostrar."""
+    from sessoes_bitpanel import pool_bitpanel
+
+    username = payload["username"]
+    telefone = payload.get("telefone")
+    dados_teste = None
+    if job["tentativas"] > 1:
+        # Retomado depois de uma queda (ex.: worker do gunicorn morto no meio): o teste pode já existir
+        if db.buscar_cliente_por_usuario_iptv(username, incluir_arquivados=True):
+            return {"usuario": username, "salvo": True, "ja_criado": True}
+        dados_teste = _lista_no_painel(username)
+        if dados_teste:
+            print(f"⏭️ [FILA JOBS] Job {job['id']}: teste '{username}' já existe no painel, só falta salvar")
+    if dados_teste is None:
+        with pool_bitpanel.sessao() as manager:
+            dados_teste = manager.criar_teste(username=username, headless=True)
+
+    if "erro" in dados_teste:
+        return {"erro": dados_teste["erro"]}
+
+    if dados_teste.get("status") == "parcial":
+        # Salva o mínimo possível no banco local
+        db.adicionar_cliente(telefone=telefone, nome=username, usuario_iptv=username, senha_iptv="N/A",
+                             conexoes=1, data_criacao=None, data_expiracao=None, status="teste_parcial")
+        return {"usuario": username, "parcial": True, "mensagem": dados_teste.get("mensagem")}
+
+    criado_em_dt = None
+    expira_em_dt = None
+    datas_invalidas = False
+    try:
+        if dados_teste.get("criado_em"):
+            criado_em_dt = datetime.strptime(dados_teste["criado_em"], "%d/%m/%Y %H:%M")
+        if dados_teste.get("expira_em"):
+            expira_em_dt = datetime.strptime(dados_teste["expira_em"], "%d/%m/%Y %H:%M")
+    except ValueError as e:
+        print(f"⚠️ [FILA JOBS] Erro ao converter data do BitPanel: {e}. As datas serão salvas como Nulas.")
+        datas_invalidas = True
+
+    salvo = db.adicionar_cliente(
+        telefone=telefone,
+        nome=username,  # Usa o próprio username como nome padrão
+        usuario_iptv=dados_teste.get("usuario", username),
+        senha_iptv=dados_teste.get("senha", "N/A"),
+        conexoes=int(dados_teste.get("conexoes", 1)),
+        data_criacao=criado_em_dt,
+        data_expiracao=expira_em_dt,
+        status="teste",
+    )
+    return {"usuario": username, "salvo": salvo, "datas_invalidas": datas_invalidas}
+
+
+def _sincronizar_todos(payload: Dict, job: Dict) -> Dict:
+    """
+    Sincronização em massa pedida pelo dashboard. No modo 'tabela' (padrão) lê
+    a tabela de /list uma vez e só abre a página de detalhes de quem ficou sem
+    algum campo essencial; 'individual' abre a de todos. Devolve o relatório
+    do ExecutorSincronizacao, que a página de acompanhamento mostra.
+    """
+    from bitpanel_automation import CAMPOS_ESSENCIAIS_SYNC
+    from sessoes_bitpanel import pool_bitpanel
+    from sincronizacao import executor_sincronizacao
+
+    usuarios_iptv = db.obter_todos_usuarios_iptv()
+    if not usuarios_iptv:
+        return {"total": 0, "sucessos": 0, "falhas": 0, "detalhes": [], "segundos": 0, "workers": 0, "individuais": 0}
+    print(f"👥 [SYNC MASSA] {len(usuarios_iptv)} usuários para sincronizar")
+
+    tabela = None
+    if payload.get("modo", "tabela") == "tabela":
+        with pool_bitpanel.sessao() as manager:
+            tabela = manager.extrair_tabela_listas()
+        if tabela is not None:
+            # A tabela traz todos os nomes do painel, inclusive listas que não estão na base local
+            db.registrar_usuarios_painel(tabela.keys())
+        else:
+            print(f"⚠️ [SYNC MASSA] Tabela não pôde ser lida, sincronizando um a um")
+
+    prontos = {}
+    pendentes = []
+    for usuario in usuarios_iptv:
+        linha = tabela.get(usuario) if tabela is not None else None
+        if tabela is not None and linha is None:
+            prontos[usuario] = {"erro": f"Usuário '{usuario}' não encontrado na tabela", "nao_encontrado": True}
+        elif linha and all(campo in linha for campo in CAMPOS_ESSENCIAIS_SYNC):
+            prontos[usuario] = linha
+        else:
+            pendentes.append(usuario)
+
+    # Quem precisa da página de detalhes é dividido entre as sessões do pool;
+    # todas as gravações passam por um único escritor
+    relatorio = executor_sincronizacao.executar(pendentes, prontos=prontos)
+    relatorio["individuais"] = len(pendentes)
+    print(f"📊 [SYNC MASSA] Sincronização em massa concluída - Sucessos: {relatorio['sucessos']}, "
+          f"Falhas: {relatorio['falhas']}, páginas de detalhes abertas: {len(pendentes)}")
+
+    log_detalhes = "\n".join(relatorio["detalhes"][:10])  # Primeiros 10 para não sobrecarregar
+    db.log_sistema("info", f"Sync massa: {relatorio['sucessos']} sucessos, {relatorio['falhas']} falhas em "
+                           f"{relatorio['segundos']}s ({relatorio['workers']} navegadores). Detalhes: {log_detalhes}")
+    # O resultado fica gravado no job: só as falhas, e no máximo 50, vão junto
+    relatorio["detalhes"] = [detalhe for detalhe in relatorio["detalhes"] if "FALHA" in detalhe][:50]
+    return relatorio
+
+
+HANDLERS: Dict[str, Callable[[Dict, Dict], Any]] = {
+    "criar_lista": _criar_lista,
+    "renovar_lista": _renovar_lista,
+    "criar_teste": _criar_teste,
+    "sincronizar_todos": _sincronizar_todos,
+}
+
+
+def _avisar_suporte(payload: Dict, job: Dict):
+    """Cliente pagou e a automação esgotou as tentativas: manda o contato do suporte."""
+    from gemini_bot import SUPORTE_MSG
+    from whatsapp_bot import whatsapp_bot
+
+    whatsapp_bot.enviar_mensagem(payload["telefone"], SUPORTE_MSG)
+    db.log_sistema("erro", f"Job {job['id']} ({job['tipo']}) falhou de vez: {job.get('erro')}")
+
+
+# Chamados quando um job falha de vez depois de uma exceção (as tentativas acabaram)
+AO_FALHAR: Dict[str, Callable[[Dict, Dict], Any]] = {
+    "criar_lista": _avisar_suporte,
+    "renovar_lista": _avisar_suporte,
+}
+
+
+class FilaJobs:
+    """
+    Workers da fila de jobs. Cada worker é uma thread que reserva um job,
+    executa o handler do tipo dele e grava o resultado. Por padrão há um
+    worker por sessão do pool, então nenhum fica parado esperando navegador.
+    """
+
+    def __init__(self, workers: int = None, lease_segundos: int = None, intervalo: float = None,
+                 handlers: Dict[str, Callable[[Dict, Dict], Any]] = None,
+                 ao_falhar: Dict[str, Callable[[Dict, Dict], Any]] = None):
+        self.workers = workers or Config.JOBS_WORKERS
+        self.lease_segundos = lease_segundos or Config.JOBS_LEASE_SEGUNDOS
+        self.intervalo = Config.JOBS_INTERVALO_SEGUNDOS if intervalo is None else intervalo
+        self.handlers = dict(HANDLERS if handlers is None else handlers)
+        self.ao_falhar = dict(AO_FALHAR if ao_falhar is None else ao_falhar)
+        self._novo_job = threading.Event()
+        self._terminou = threading.Condition()
+        self._parar = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._contadores = {"executados": 0, "concluidos": 0, "repetidos": 0, "falhos": 0, "pausas_circuito": 0}
+
+    def enfileirar(self, tipo: str, payload: Dict, chave: str = None, max_tentativas: int = None) -> int:
+        """Grava o job e acorda os workers. Com `chave` repetida devolve o job que já existe."""
+        if tipo not in self.handlers:
+            raise ValueError(f"Tipo de job desconhecido: {tipo}")
+        job_id = db.enfileirar_job(tipo, payload, chave, max_tentativas or Config.JOBS_MAX_TENTATIVAS)
+        print(f"📥 [FILA JOBS] Job {job_id} ({tipo}) na fila" + (f" [{chave}]" if chave else ""))
+        self._novo_job.set()
+        return job_id
+
+    def aguardar(self, job_id: int, timeout: float) -> Optional[Dict]:
+        """Espera o job terminar por até `timeout` segundos e devolve ele no estado em que estiver."""
+        limite = time.monotonic() + timeout
+        while True:
+            job = db.buscar_job(job_id)
+            restante = limite - time.monotonic()
+            if job is None or job["estado"] in ESTADOS_FINAIS or restante <= 0:
+                return job
+            with self._terminou:
+                # Os workers avisam ao terminar qualquer job; o timeout cobre jobs de outro processo
+                self._terminou.wait(min(restante, max(self.intervalo, 1)))
+
+    def _contar(self, nome: str):
+        with self._lock:
+            self._contadores[nome] += 1
+
+    @contextmanager
+    def _mantendo_lease(self, job: Dict, worker: str):
+        """Renova o lease a cada terço dele enquanto o handler roda, para um Selenium lento não perder o job."""
+        terminou = threading.Event()
+
+        def renovar():
+            while not terminou.wait(self.lease_segundos / 3):
+                try:
+                    if not db.renovar_lease_job(job["id"], job["tentativas"], self.lease_segundos):
+                        print(f"⚠️ [FILA JOBS] {worker} perdeu o lease do job {job['id']}")
+                        return
+                except Exception as e:
+                    print(f"⚠️ [FILA JOBS] Erro ao renovar o lease do job {job['id']}: {e}")
+
+        thread = threading.Thread(target=renovar, name=f"{worker}-lease", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            terminou.set()
+            thread.join()
+
+    def executar_proximo(self, worker: str = "manual") -> bool:
+        """Reserva e executa um job. Retorna False se a fila estava vazia ou o circuito está aberto."""
+        if not circuito_bitpanel.permite():
+            self._contar("pausas_circuito")
+            return False
+        job = db.reservar_job(worker, self.lease_segundos)
+        if job is None:
+            return False
+
+        self._contar("executados")
+        inicio = time.monotonic()
+        print(f"⚙️ [FILA JOBS] {worker} executando job {job['id']} ({job['tipo']}), "
+              f"tentativa {job['tentativas']}/{job['max_tentativas']}")
+        try:
+            handler = self.handlers.get(job["tipo"])
+            if handler is None:
+                db.falhar_job(job["id"], f"Tipo de job desconhecido: {job['tipo']}")
+                self._contar("falhos")
+                return True
+            with self._mantendo_lease(job, worker):
+                resultado = handler(job["payload"], job)
+        except Exception as e:
+            traceback.print_exc()
+            if not isinstance(e, SessaoIndisponivel):
+                # Falha de login já é contada pelo pool; sessão ocupada não é culpa do painel
+                circuito_bitpanel.registrar_falha("fila_jobs", str(e))
+            espera = Config.JOBS_REPETIR_APOS_SEGUNDOS * 2 ** (job["tentativas"] - 1)
+            estado = db.falhar_job(job["id"], str(e), reagendar_em=espera)
+            if estado == "pendente":
+                self._contar("repetidos")
+                print(f"🔁 [FILA JOBS] Job {job['id']} falhou ({e}); nova tentativa em {espera}s")
+            else:
+                self._contar("falhos")
+                print(f"❌ [FILA JOBS] Job {job['id']} falhou de vez: {e}")
+                ao_falhar = self.ao_falhar.get(job["tipo"])
+                if ao_falhar:
+                    try:
+                        ao_falhar(job["payload"], dict(job, erro=str(e)))
+                    except Exception as erro_aviso:
+                        print(f"❌ [FILA JOBS] Erro ao avisar a falha do job {job['id']}: {erro_aviso}")
+        else:
+            if not resultado or (isinstance(resultado, dict) and "erro" in resultado):
+                erro = resultado.get("erro") if isinstance(resultado, dict) else "Automação não concluída"
+                db.falhar_job(job["id"], erro, resultado=resultado)
+                self._contar("falhos")
+                print(f"❌ [FILA JOBS] Job {job['id']} terminou com erro: {erro}")
+            else:
+                circuito_bitpanel.registrar_sucesso("fila_jobs")
+                db.concluir_job(job["id"], resultado)
+                self._contar("concluidos")
+                print(f"✅ [FILA JOBS] Job {job['id']} concluído em {time.monotonic() - inicio:.1f}s")
+        finally:
+            with self._terminou:
+                self._terminou.notify_all()
+        return True
+
+    def _loop(self, worker: str):
+        while not self._parar.is_set():
+            try:
+                if self.executar_proximo(worker):
+                    continue
+            except Exception as e:
+                print(f"❌ [FILA JOBS] Erro no {worker}: {e}")
+                traceback.print_exc()
+            self._novo_job.wait(self.intervalo)
+            self._novo_job.clear()
+
+    def iniciar(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            return
+        self._parar.clear()
+        for numero in range(1, self.workers + 1):
+            thread = threading.Thread(target=self._loop, args=(f"jobs-worker-{numero}",),
+                                      name=f"jobs-worker-{numero}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🚀 [FILA JOBS] {self.workers} worker(s) iniciados")
+
+    def parar(self):
+        self._parar.set()
+        self._novo_job.set()
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            dados = dict(self._contadores)
+        dados["workers"] = self.workers
+        dados["por_estado"] = db.contar_jobs_por_estado()
+        return dados
+
+
+fila_jobs = FilaJobs()
@@ -5,12 +5,19 @@ import re
 import traceback
 from typing import Dict, Optional
 from datetime import datetime
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from bitpanel_automation import BitPanelManager
+from sessoes_bitpanel import SessaoIndisponivel, pool_bitpanel
 from config import Config
-from database import db
+from database import db, normalizar_telefone
 
 SUPORTE_MSG = "⚠️ Tivemos um problema técnico. Por favor, entre em contato com o suporte no número 11 96751-2034."
 
+# Falhas que passam sozinhas (pool ocupado, timeout, Chrome que caiu, rede): a automação de
+# pagamento as deixa subir para a fila de jobs repetir com espera e o circuito do BitPanel contar
+ERROS_TEMPORARIOS = (SessaoIndisponivel, TimeoutException, WebDriverException, requests.RequestException)
+
 class GeminiBot:
     def __init__(self):
         pass
@@ -25,6 +32,7 @@ class GeminiBot:
 
             # --- 1. COMANDO UNIVERSAL DE CANCELAMENTO ---
             if self.is_comando_cancelar(mensagem):
+                self.liberar_reserva_compra(telefone)
                 self.resetar_conversa(telefone)
                 return "❌ Atendimento cancelado. Se precisar de algo, é só chamar! 👋"
 
@@ -78,6 +86,15 @@ class GeminiBot:
         """Reseta conversa para o menu principal"""
         db.set_conversa(telefone, "inicial", "menu", json.dumps({}))
     
+    def liberar_reserva_compra(self, telefone: str):
+        """Libera o usuário IPTV reservado por uma compra que ainda não chegou ao PIX"""
+        conversa = db.get_conversa(telefone)
+        if not conversa or conversa.get("contexto") != "comprar" or conversa.get("estado") == "aguardando_pagamento":
+            return
+        usuario = json.loads(conversa.get("dados_temporarios") or "{}").get("usuario")
+        if usuario:
+            db.liberar_reserva_usuario(usuario, telefone)
+
     def is_comando_cancelar(self, mensagem: str) -> bool:
         """Verifica se é comando de cancelamento"""
         comandos = ["cancelar", "sair", "parar", "finalizar", "voltar"]
@@ -89,27 +106,8 @@ class GeminiBot:
         """
         try:
             # Não salvar cliente no banco se não finalizou processo
-            conn = db.get_connection()
-            try:
-                # Verifica se existe um cliente que foi criado mas não tem lista criada
-                cliente_temp = conn.execute(
-                    """
-                    SELECT id FROM clientes 
-                    WHERE telefone = ? AND usuario_iptv IS NOT NULL 
-                    AND created_at > datetime('now', '-1 hour')
-                """,
-                    (telefone,),
-                ).fetchone()
-
-                if cliente_temp:
-                    # Remove cliente temporário que não finalizou processo
-                    conn.execute(
-                        "DELETE FROM clientes WHERE id = ?", (cliente_temp["id"],)
-                    )
-                    conn.commit()
-                    print(f"[INFO] Cliente temporário removido: {telefone}")
-            finally:
-                conn.close()
+            if db.remover_cliente_temporario(telefone):
+                print(f"[INFO] Cliente temporário removido: {telefone}")
         except Exception as e:
             print(f"[ERROR] Erro ao limpar dados temporários: {e}")
 
@@ -127,8 +125,8 @@ class GeminiBot:
             conn = db.get_connection()
             try:
                 tem_lista = conn.execute(
-                    "SELECT id FROM clientes WHERE telefone = ? AND usuario_iptv IS NOT NULL", 
-                    (telefone,)
+                    "SELECT id FROM clientes WHERE telefone_e164 = ? AND usuario_iptv IS NOT NULL", 
+                    (normalizar_telefone(telefone),)
                 ).fetchone()
             finally:
                 conn.close()
@@ -431,9 +429,9 @@ Exemplo: `joao123` ou `maria2024`
             listas = conn.execute("""
                 SELECT usuario_iptv, data_expiracao 
                 FROM clientes 
-                WHERE telefone = ? AND usuario_iptv IS NOT NULL
+                WHERE telefone_e164 = ? AND usuario_iptv IS NOT NULL
                 ORDER BY created_at DESC
-            """, (telefone,)).fetchall()
+            """, (normalizar_telefone(telefone),)).fetchall()
         finally:
             conn.close()
 
@@ -494,9 +492,9 @@ Você possui {len(listas)} listas:
             listas = conn.execute("""
                 SELECT usuario_iptv, senha_iptv, data_criacao, data_expiracao, conexoes, plano, status
                 FROM clientes 
-                WHERE telefone = ? AND usuario_iptv IS NOT NULL
+                WHERE telefone_e164 = ? AND usuario_iptv IS NOT NULL
                 ORDER BY created_at DESC
-            """, (telefone,)).fetchall()
+            """, (normalizar_telefone(telefone),)).fetchall()
         finally:
             conn.close()
 
@@ -568,16 +566,25 @@ Exemplo: `joao123` ou `maria2024`
 
 Tente novamente:"""
 
-            conn = db.get_connection()
-            try:
-                existe = conn.execute("SELECT id FROM clientes WHERE usuario_iptv = ?", (usuario,)).fetchone()
-            finally:
-                conn.close()
+            # Voltou para trocar de nome: o reservado antes fica livre para os outros clientes
+            anterior = dados.get("usuario")
+            if anterior and anterior != usuario:
+                db.liberar_reserva_usuario(anterior, telefone)
 
-            if existe:
+            # Nome já no painel (inclusive listas arquivadas) ou reservado por outra compra em andamento
+            motivo = db.verificar_usuario_disponivel(usuario, telefone)
+            if motivo is None and not db.reservar_usuario_iptv(usuario, telefone, Config.RESERVA_USUARIO_MINUTOS):
+                motivo = "reservado"
+
+            if motivo == "painel":
                 return f"""❌ **Usuário já existe**
 
 O usuário `{usuario}` já está em uso.
+Escolha outro nome:"""
+            if motivo == "reservado":
+                return f"""❌ **Usuário indisponível**
+
+O usuário `{usuario}` está sendo usado em outro pedido.
 Escolha outro nome:"""
 
             dados["usuario"] = usuario
@@ -656,8 +663,16 @@ Por quantos meses? (1 a 12)"""
 
         elif estado == "confirmando_dados":
             if mensagem.strip() == "1" or mensagem.lower().strip() in ["sim", "confirmar", "ok"]:
+                # Renova a reserva para cobrir o PIX; se ela venceu e outro pedido pegou o nome, volta ao passo 1
+                if not db.reservar_usuario_iptv(dados["usuario"], telefone, Config.RESERVA_USUARIO_MINUTOS):
+                    db.set_conversa(telefone, "comprar", "aguardando_usuario", json.dumps(dados))
+                    return f"""❌ **Usuário indisponível**
+
+O usuário `{dados['usuario']}` foi reservado por outro pedido enquanto você decidia.
+Escolha outro nome:"""
                 return self.gerar_pix_compra(telefone, dados)
             elif mensagem.strip() == "2" or mensagem.lower().strip() in ["não", "nao", "cancelar"]:
+                db.liberar_reserva_usuario(dados["usuario"], telefone)
                 self.resetar_conversa(telefone)
                 return "❌ **Pedido cancelado**\n\nSe mudar de ideia, é só chamar! \n\n" + self.menu_principal()
             else:
@@ -683,7 +698,9 @@ Por quantos meses? (1 a 12)"""
             # MODO DE TESTE
             if Config.TEST_MODE:
                 print("\n--- MODO DE TESTE: Simulando pagamento de COMPRA aprovado ---\n")
-                self.processar_pagamento_aprovado(telefone, dados_compra)
+                from fila_jobs import fila_jobs
+                db.reservar_usuario_iptv(dados_compra["usuario"], telefone, Config.RESERVA_USUARIO_PAGO_HORAS * 60)
+                fila_jobs.enfileirar("criar_lista", {"telefone": telefone, "dados": dados_compra})
                 return None
 
             # MODO REAL
@@ -790,8 +807,8 @@ Digite um número de 1 a 12 meses:"""
                 try:
                     lista = conn.execute("""
                         SELECT conexoes FROM clientes 
-                        WHERE telefone = ? AND usuario_iptv = ?
-                    """, (telefone, dados["usuario_selecionado"])).fetchone()
+                        WHERE telefone_e164 = ? AND usuario_iptv = ?
+                    """, (normalizar_telefone(telefone), dados["usuario_selecionado"])).fetchone()
                 finally:
                     conn.close()
 
@@ -846,7 +863,8 @@ Por quantos meses? (1 a 12)"""
 
             if Config.TEST_MODE:
                 print("\n--- MODO DE TESTE: Simulando pagamento de RENOVAÇÃO aprovado ---\n")
-                self.processar_pagamento_renovacao(telefone, dados_renovacao)
+                from fila_jobs import fila_jobs, payload_renovacao
+                fila_jobs.enfileirar("renovar_lista", payload_renovacao(telefone, dados_renovacao))
                 return None
 
             pix_info = mercado_pago.criar_cobranca_pix(
@@ -905,43 +923,104 @@ Assim que o PIX for aprovado, sua lista será renovada automaticamente! ✅
             self.resetar_conversa(telefone)
             return self.menu_erro("Erro ao gerar PIX. Tente novamente.", telefone)
 
-    def processar_pagamento_aprovado(self, telefone: str, dados_compra: Dict):
-        """Executa automação de CRIAÇÃO no BitPanel"""
+    def processar_pagamento_aprovado(self, telefone: str, dados_compra: Dict, avisar_inicio: bool = True) -> bool:
+        """
+        Executa automação de CRIAÇÃO no BitPanel (chamada pela fila de jobs). Retorna se deu certo.
+        ERROS_TEMPORARIOS sobem para a fila repetir; o suporte só é avisado quando a falha é definitiva.
+        """
         from whatsapp_bot import whatsapp_bot
-        manager = None
         try:
-            whatsapp_bot.enviar_mensagem(
-                telefone,
-                "✅ **Pagamento confirmado!** Estou criando sua lista agora, isso pode levar um ou dois minutos..."
-            )
+            if avisar_inicio:
+                whatsapp_bot.enviar_mensagem(
+                    telefone,
+                    "✅ **Pagamento confirmado!** Estou criando sua lista agora, isso pode levar um ou dois minutos..."
+                )
 
-            manager = BitPanelManager()
-            dados_lista = manager.criar_lista(
-                username=dados_compra["usuario"],
-                conexoes=dados_compra["conexoes"],
-                duracao_meses=dados_compra["meses"],
-                headless=True
-            )
+            with pool_bitpanel.sessao() as manager:
+                dados_lista = manager.criar_lista(
+                    username=dados_compra["usuario"],
+                    conexoes=dados_compra["conexoes"],
+                    duracao_meses=dados_compra["meses"],
+                    headless=True
+                )
 
             if dados_lista and "senha" in dados_lista:
-                from datetime import datetime, timedelta
-                data_criacao_final = datetime.now()
-                data_expiracao_final = data_criacao_final + timedelta(days=30 * dados_compra["meses"])
-
-                db.atualizar_cliente_pos_compra(
-                    telefone=telefone,
-                    usuario_iptv=dados_compra["usuario"],
-                    senha_iptv=dados_lista["senha"],
-                    conexoes=dados_compra["conexoes"],
-                    data_criacao=data_criacao_final,
-                    data_expiracao=data_expiracao_final,
-                    plano=dados_lista.get("plano", Config.PLANO_DEFAULT)
+                self.concluir_compra(telefone, dados_compra, dados_lista)
+                return True
+
+            whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
+            db.log_sistema("erro", f"Falha ao criar lista para '{dados_compra['usuario']}' no BitPanel.")
+            return False
+
+        except ERROS_TEMPORARIOS:
+            raise
+        except Exception as e:
+            print(f"[CRITICAL] Erro na automação de criação: {e}")
+            traceback.print_exc()
+            whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
+            return False
+
+    def processar_pagamento_renovacao(self, telefone: str, dados_renovacao: Dict, avisar_inicio: bool = True) -> bool:
+        """
+        Executa automação de RENOVAÇÃO no BitPanel (chamada pela fila de jobs). Retorna se deu certo.
+        ERROS_TEMPORARIOS sobem para a fila repetir; o suporte só é avisado quando a falha é definitiva.
+        """
+        from whatsapp_bot import whatsapp_bot
+        try:
+            usuario = dados_renovacao['usuario_selecionado']
+            meses = dados_renovacao['meses']
+
+            if avisar_inicio:
+                whatsapp_bot.enviar_mensagem(
+                    telefone,
+                    f"✅ **Pagamento confirmado!** Estou renovando sua lista `{usuario}` no painel. Isso pode levar um minuto..."
                 )
 
-                link = db.get_config("link_acesso", Config.LINK_ACESSO_DEFAULT)
-                data_expiracao_br = data_expiracao_final.strftime("%d/%m/%Y")
+            with pool_bitpanel.sessao() as manager:
+                dados_lista_renovada = manager.renovar_lista(
+                    username=usuario,
+                    duracao_meses=meses,
+                    headless=True
+                )
+
+            if dados_lista_renovada and not dados_lista_renovada.get("erro"):
+                self.concluir_renovacao(telefone, usuario, dados_lista_renovada)
+                return True
+
+            whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
+            db.log_sistema("erro", f"Falha ao renovar lista para '{usuario}' no BitPanel.")
+            return False
+
+        except ERROS_TEMPORARIOS:
+            raise
+        except Exception as e:
+            print(f"[CRITICAL] Erro na automação de renovação: {e}")
+            traceback.print_exc()
+            whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
+            return False
+
+    def concluir_compra(self, telefone: str, dados_compra: Dict, dados_lista: Dict):
+        """Salva a lista criada no painel e manda os dados de acesso ao cliente."""
+        from whatsapp_bot import whatsapp_bot
+
+        from datetime import datetime, timedelta
+        data_criacao_final = datetime.now()
+        data_expiracao_final = data_criacao_final + timedelta(days=30 * dados_compra["meses"])
+
+        db.atualizar_cliente_pos_compra(
+            telefone=telefone,
+            usuario_iptv=dados_compra["usuario"],
+            senha_iptv=dados_lista["senha"],
+            conexoes=dados_compra["conexoes"],
+            data_criacao=data_criacao_final,
+            data_expiracao=data_expiracao_final,
+            plano=dados_lista.get("plano", Config.PLANO_DEFAULT)
+        )
 
-                resposta = f"""🎉 **LISTA CRIADA COM SUCESSO!**
+        link = db.get_config("link_acesso", Config.LINK_ACESSO_DEFAULT)
+        data_expiracao_br = data_expiracao_final.strftime("%d/%m/%Y")
+
+        resposta = f"""🎉 **LISTA CRIADA COM SUCESSO!**
 
 **📺 SEUS DADOS DE ACESSO:**
 
@@ -952,100 +1031,57 @@ Assim que o PIX for aprovado, sua lista será renovada automaticamente! ✅
 ⏰ **Expira em:** {data_expiracao_br}
 
 💾 **Guarde esses dados com segurança!**"""
-                whatsapp_bot.enviar_mensagem(telefone, resposta)
-            else:
-                whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
-                db.log_sistema("erro", f"Falha ao criar lista para '{dados_compra['usuario']}' no BitPanel.")
+        whatsapp_bot.enviar_mensagem(telefone, resposta)
 
-        except Exception as e:
-            print(f"[CRITICAL] Erro na automação de criação: {e}")
-            traceback.print_exc()
-            whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
-        finally:
-            if manager:
-                manager.close()
-
-    def processar_pagamento_renovacao(self, telefone: str, dados_renovacao: Dict):
-        """Executa automação de RENOVAÇÃO no BitPanel"""
+    def concluir_renovacao(self, telefone: str, usuario: str, dados_lista_renovada: Dict):
+        """Grava os dados da lista renovada no painel e manda o resumo ao cliente."""
         from whatsapp_bot import whatsapp_bot
-        manager = None
-        try:
-            usuario = dados_renovacao['usuario_selecionado']
-            meses = dados_renovacao['meses']
 
-            whatsapp_bot.enviar_mensagem(
-                telefone,
-                f"✅ **Pagamento confirmado!** Estou renovando sua lista `{usuario}` no painel. Isso pode levar um minuto..."
-            )
+        print(f"[INFO] Renovação de '{usuario}' no BitPanel bem-sucedida. Dados: {dados_lista_renovada}")
 
-            manager = BitPanelManager()
-            dados_lista_renovada = manager.renovar_lista(
-                username=usuario, 
-                duracao_meses=meses, 
-                headless=True
-            )
+        # Atualizar banco com dados capturados
+        from datetime import datetime
+        
+        nova_data_expiracao = None
+        if dados_lista_renovada.get("expira_em"):
+            try:
+                nova_data_expiracao = datetime.strptime(dados_lista_renovada["expira_em"], "%d/%m/%Y %H:%M")
+            except Exception as e:
+                print(f"[WARNING] Erro ao converter data: {e}")
+
+        dados_atualizacao = {}
+        if nova_data_expiracao:
+            dados_atualizacao["data_expiracao"] = nova_data_expiracao
+        if dados_lista_renovada.get("plano"):
+            dados_atualizacao["plano"] = dados_lista_renovada["plano"]
+        if dados_lista_renovada.get("conexoes"):
+            dados_atualizacao["conexoes"] = dados_lista_renovada["conexoes"]
+        if dados_lista_renovada.get("senha"):
+            dados_atualizacao["senha_iptv"] = dados_lista_renovada["senha"]
+        
+        dados_atualizacao["ultima_sincronizacao"] = datetime.now()
 
-            if dados_lista_renovada and not dados_lista_renovada.get("erro"):
-                print(f"[INFO] Renovação de '{usuario}' no BitPanel bem-sucedida. Dados: {dados_lista_renovada}")
+        if dados_atualizacao:
+            # Atualizar pelo usuario_iptv
+            db.atualizar_campos_cliente(usuario, dados_atualizacao)
+            print(f"[INFO] Banco atualizado para '{usuario}'")
 
-                # Atualizar banco com dados capturados
-                from datetime import datetime
-                
-                nova_data_expiracao = None
-                if dados_lista_renovada.get("expira_em"):
-                    try:
-                        nova_data_expiracao = datetime.strptime(dados_lista_renovada["expira_em"], "%d/%m/%Y %H:%M")
-                    except Exception as e:
-                        print(f"[WARNING] Erro ao converter data: {e}")
-
-                dados_atualizacao = {}
-                if nova_data_expiracao:
-                    dados_atualizacao["data_expiracao"] = nova_data_expiracao
-                if dados_lista_renovada.get("plano"):
-                    dados_atualizacao["plano"] = dados_lista_renovada["plano"]
-                if dados_lista_renovada.get("conexoes"):
-                    dados_atualizacao["conexoes"] = dados_lista_renovada["conexoes"]
-                if dados_lista_renovada.get("senha"):
-                    dados_atualizacao["senha_iptv"] = dados_lista_renovada["senha"]
-                
-                dados_atualizacao["ultima_sincronizacao"] = datetime.now()
-
-                if dados_atualizacao:
-                    conn = db.get_connection()
-                    try:
-                        # Atualizar pelo usuario_iptv
-                        updates = []
-                        params = []
-                        for campo, valor in dados_atualizacao.items():
-                            updates.append(f"{campo} = ?")
-                            params.append(valor)
-                        params.append(usuario)
-                        
-                        conn.execute(
-                            f"UPDATE clientes SET {', '.join(updates)} WHERE usuario_iptv = ?",
-                            params
-                        )
-                        conn.commit()
-                        print(f"[INFO] Banco atualizado para '{usuario}'")
-                    finally:
-                        conn.close()
-
-                link = db.get_config("link_acesso", Config.LINK_ACESSO_DEFAULT)
-                data_expiracao_br = nova_data_expiracao.strftime("%d/%m/%Y") if nova_data_expiracao else "N/A"
-                
-                cliente_db = db.buscar_cliente_por_usuario_iptv(usuario)
-                data_criacao_br = "N/A"
-                if cliente_db and cliente_db.get("data_criacao"):
-                    try:
-                        data_criacao_br = datetime.fromisoformat(cliente_db["data_criacao"]).strftime("%d/%m/%Y")
-                    except:
-                        pass
+        link = db.get_config("link_acesso", Config.LINK_ACESSO_DEFAULT)
+        data_expiracao_br = nova_data_expiracao.strftime("%d/%m/%Y") if nova_data_expiracao else "N/A"
+        
+        cliente_db = db.buscar_cliente_por_usuario_iptv(usuario)
+        data_criacao_br = "N/A"
+        if cliente_db and cliente_db.get("data_criacao"):
+            try:
+                data_criacao_br = datetime.fromisoformat(cliente_db["data_criacao"]).strftime("%d/%m/%Y")
+            except:
+                pass
 
-                senha_br = dados_lista_renovada.get("senha", "Não informada")
-                plano_br = dados_lista_renovada.get("plano", "Básico")
-                conexoes_br = dados_lista_renovada.get("conexoes", 1)
+        senha_br = dados_lista_renovada.get("senha", "Não informada")
+        plano_br = dados_lista_renovada.get("plano", "Básico")
+        conexoes_br = dados_lista_renovada.get("conexoes", 1)
 
-                resposta = f"""🎉 **LISTA RENOVADA COM SUCESSO!**
+        resposta = f"""🎉 **LISTA RENOVADA COM SUCESSO!**
 
 **📺 SEUS DADOS DE ACESSO:**
 
@@ -1058,18 +1094,7 @@ Assim que o PIX for aprovado, sua lista será renovada automaticamente! ✅
 📋 **Plano:** {plano_br}
 
 💾 **Guarde esses dados com segurança!**"""
-                whatsapp_bot.enviar_mensagem(telefone, resposta)
-            else:
-                whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
-                db.log_sistema("erro", f"Falha ao renovar lista para '{usuario}' no BitPanel.")
-
-        except Exception as e:
-            print(f"[CRITICAL] Erro na automação de renovação: {e}")
-            traceback.print_exc()
-            whatsapp_bot.enviar_mensagem(telefone, SUPORTE_MSG)
-        finally:
-            if manager:
-                manager.close()
+        whatsapp_bot.enviar_mensagem(telefone, resposta)
 
     def _converter_data_bitpanel(self, data_str: str) -> datetime:
         """
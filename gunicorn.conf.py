@@ -0,0 +1,8 @@
+# gunicorn.conf.py - Lido automaticamente pelo gunicorn (Procfile e Dockerfile)
+
+
+def post_worker_init(worker):
+    """Sobe as tarefas em segundo plano; com vários workers, só o que pegar o lock as executa."""
+    from dashboard import iniciar_tarefas
+
+    iniciar_tarefas()
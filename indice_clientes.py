@@ -0,0 +1,101 @@
+# indice_clientes.py - Índice em memória dos clientes (por telefone e por usuário IPTV)
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class IndiceClientes:
+    """
+    Cache LRU de linhas da tabela `clientes`, com tamanho máximo fixo.
+    As chaves são ("telefone", telefone_e164) ou ("usuario", usuario_iptv);
+    o valor é a linha do cliente, ou None para lembrar que não existe.
+
+    Quem mantém o índice em dia é o DatabaseManager: toda escrita passa o
+    cliente alterado por `atualizar_cliente`, e `geracao` impede que uma
+    leitura antiga do banco sobrescreva um valor mais novo.
+    """
+
+    def __init__(self, max_itens: int = 5000):
+        self.max_itens = max_itens
+        self.ultimo_seq = 0
+        self.geracao = 0
+        self._itens: "OrderedDict[Tuple[str, str], Optional[Dict]]" = OrderedDict()
+        self._chaves_por_id: Dict[int, set] = {}
+        self._lock = threading.RLock()
+        self._acertos = 0
+        self._falhas = 0
+        self._expulsoes = 0
+
+    def obter(self, chave: Tuple[str, str]) -> Tuple[bool, Optional[Dict]]:
+        """Retorna (achou, cliente). O cliente devolvido é uma cópia."""
+        with self._lock:
+            if chave not in self._itens:
+                self._falhas += 1
+                return False, None
+            self._itens.move_to_end(chave)
+            self._acertos += 1
+            valor = self._itens[chave]
+            return True, dict(valor) if valor is not None else None
+
+    def guardar(self, chave: Tuple[str, str], cliente: Optional[Dict], geracao: int = None):
+        """Guarda o resultado de uma consulta. Ignora se o índice mudou desde `geracao`."""
+        with self._lock:
+            if geracao is not None and geracao != self.geracao:
+                return
+            self._remover(chave)
+            self._itens[chave] = dict(cliente) if cliente is not None else None
+            if cliente is not None:
+                self._chaves_por_id.setdefault(cliente["id"], set()).add(chave)
+            while len(self._itens) > self.max_itens:
+                antiga, _ = next(iter(self._itens.items()))
+                self._remover(antiga)
+                self._expulsoes += 1
+
+    def atualizar_cliente(self, cliente_id: int, cliente: Optional[Dict], ultimo_do_telefone: Optional[Dict] = None):
+        """
+        Write-through de uma escrita: tira as chaves antigas do cliente e grava
+        a linha nova. `ultimo_do_telefone` é o cliente mais recente do mesmo
+        telefone, que é o que a busca por telefone devolve.
+        """
+        with self._lock:
+            self.geracao += 1
+            for chave in list(self._chaves_por_id.get(cliente_id, ())):
+                self._remover(chave)
+            if cliente is None:
+                return
+            if cliente.get("usuario_iptv"):
+                self.guardar(("usuario", cliente["usuario_iptv"]), cliente)
+            if cliente.get("telefone_e164"):
+                self.guardar(("telefone", cliente["telefone_e164"]), ultimo_do_telefone or cliente)
+
+    def avancar_seq(self, seq: int):
+        """Marca o log de alterações como lido até `seq`; nunca volta para trás."""
+        with self._lock:
+            self.ultimo_seq = max(self.ultimo_seq, seq)
+
+    def limpar(self):
+        with self._lock:
+            self.geracao += 1
+            self._itens.clear()
+            self._chaves_por_id.clear()
+
+    def _remover(self, chave: Tuple[str, str]):
+        valor = self._itens.pop(chave, None)
+        if valor is not None:
+            chaves = self._chaves_por_id.get(valor["id"])
+            if chaves:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._chaves_por_id[valor["id"]]
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "acertos": self._acertos,
+                "falhas": self._falhas,
+                "expulsoes": self._expulsoes,
+                "taxa_acerto": round(self._acertos / consultas, 3) if consultas else 0,
+            }
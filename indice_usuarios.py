@@ -0,0 +1,98 @@
+# indice_usuarios.py - Índice em memória dos usuários IPTV já ocupados (painel + reservas)
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class IndiceUsuarios:
+    """
+    Responde em O(1), durante a conversa de compra, se um usuário IPTV já
+    está tomado. Guarda dois conjuntos:
+
+    - os nomes vistos no painel (tabela `usuarios_painel`, alimentada pela
+      sincronização em massa e pelas listas criadas pela fila de jobs);
+    - as reservas ativas de quem está no meio de uma compra (tabela
+      `reservas_usuario`), cada uma com o telefone dono e a validade.
+
+    O banco continua sendo a fonte da verdade — a reserva em si é um INSERT
+    atômico no DatabaseManager —; o índice só evita ir ao banco a cada
+    mensagem e é atualizado por ele a cada escrita.
+    """
+
+    def __init__(self):
+        self._painel: set = set()
+        self._reservas: Dict[str, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+        self._consultas = 0
+        self._conflitos = 0
+
+    def carregar(self, painel: Iterable[str], reservas: Iterable[Tuple[str, str, datetime]]):
+        """Substitui o conteúdo do índice pelo que está no banco (chamado na inicialização)."""
+        with self._lock:
+            self._painel = set(painel)
+            self._reservas = {usuario: (telefone, expira_em) for usuario, telefone, expira_em in reservas}
+
+    def adicionar_painel(self, usuarios: Iterable[str]):
+        with self._lock:
+            self._painel.update(usuarios)
+
+    def no_painel(self, usuario: str) -> bool:
+        with self._lock:
+            return usuario in self._painel
+
+    def dono_reserva(self, usuario: str) -> Optional[str]:
+        """Telefone que reservou `usuario`, ou None se não há reserva ativa."""
+        with self._lock:
+            reserva = self._reservas.get(usuario)
+            if reserva is None:
+                return None
+            telefone, expira_em = reserva
+            if expira_em <= datetime.now():
+                del self._reservas[usuario]
+                return None
+            return telefone
+
+    def ocupado(self, usuario: str, telefone: str) -> Optional[str]:
+        """
+        Motivo pelo qual `telefone` não pode usar `usuario` ("painel" ou
+        "reservado"), ou None se o índice não conhece nenhum conflito.
+        """
+        dono = self.dono_reserva(usuario)
+        with self._lock:
+            self._consultas += 1
+            if usuario in self._painel:
+                motivo = "painel"
+            elif dono is not None and dono != telefone:
+                motivo = "reservado"
+            else:
+                return None
+            self._conflitos += 1
+            return motivo
+
+    def guardar_reserva(self, usuario: str, telefone: str, expira_em: datetime):
+        with self._lock:
+            self._reservas[usuario] = (telefone, expira_em)
+
+    def remover_reserva(self, usuario: str, telefone: str = None):
+        """Remove a reserva; com `telefone`, só se for dele."""
+        with self._lock:
+            reserva = self._reservas.get(usuario)
+            if reserva is not None and (telefone is None or reserva[0] == telefone):
+                del self._reservas[usuario]
+
+    def remover_expiradas(self) -> int:
+        agora = datetime.now()
+        with self._lock:
+            expiradas = [usuario for usuario, (_, expira_em) in self._reservas.items() if expira_em <= agora]
+            for usuario in expiradas:
+                del self._reservas[usuario]
+        return len(expiradas)
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "usuarios_painel": len(self._painel),
+                "reservas": len(self._reservas),
+                "consultas": self._consultas,
+                "conflitos": self._conflitos,
+            }
@@ -13,7 +13,7 @@ def main():
     print("=" * 60)
     
     try:
-        from dashboard import app
+        from dashboard import app, iniciar_tarefas
         from config import Config
         
         print(f"🖥️  Dashboard e Webhooks rodando em: http://{Config.FLASK_HOST}:{Config.FLASK_PORT}")
@@ -22,11 +22,18 @@ def main():
         print("   - Webhook Mercado Pago: /webhook/mercadopago")
         print("\n⚠️  Pressione Ctrl+C para parar o servidor.")
         
+        debug = True  # Pode ser False em produção
+
+        # Com debug, o reloader importa o app no processo que vigia os arquivos e de novo
+        # no que atende; as tarefas em segundo plano só sobem neste último
+        if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            iniciar_tarefas()
+
         # Inicia o servidor Flask que agora contém TUDO
         app.run(
             host=Config.FLASK_HOST,
             port=Config.FLASK_PORT,
-            debug=True # Pode ser False em produção
+            debug=debug
         )
         
     except ImportError as e:
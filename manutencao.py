@@ -0,0 +1,146 @@
+# manutencao.py - Tarefas de manutenção que rodam em segundo plano
+import threading
+import traceback
+from datetime import datetime
+
+from config import Config
+from database import db
+
+
+class TarefaPeriodica:
+    """Roda `executar()` numa thread daemon a cada `intervalo` segundos."""
+
+    nome = "tarefa"
+    etiqueta = "TAREFA"
+
+    def __init__(self, intervalo: int):
+        self.intervalo = intervalo
+        self.ultima_execucao = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    def executar(self):
+        raise NotImplementedError
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                self.executar()
+            except Exception as e:
+                print(f"❌ [{self.etiqueta}] Erro na execução: {e}")
+                traceback.print_exc()
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.nome, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+
+class VarredorConversas(TarefaPeriodica):
+    """
+    Apaga periodicamente as conversas antigas em lotes pequenos, para que a
+    limpeza nunca trave o webhook do WhatsApp com um DELETE gigante.
+    """
+
+    nome = "varredor-conversas"
+    etiqueta = "VARREDOR"
+
+    def __init__(self, intervalo: int = None, dias: int = None):
+        super().__init__(intervalo or Config.VARREDOR_INTERVALO_SEGUNDOS)
+        self.dias = dias or Config.CONVERSAS_RETENCAO_DIAS
+        self.ultimo_total = 0
+
+    def executar(self) -> int:
+        """Executa uma varredura e retorna quantas conversas foram removidas."""
+        removidas = db.varrer_conversas_antigas(
+            dias=self.dias,
+            lote=Config.VARREDOR_LOTE,
+            tempo_max=Config.VARREDOR_TEMPO_MAX_SEGUNDOS,
+        )
+        self.ultima_execucao = datetime.now()
+        self.ultimo_total = removidas
+        print(f"🧹 [VARREDOR] {removidas} conversas antigas removidas")
+        if removidas:
+            db.log_sistema("info", f"Varredor: {removidas} conversas antigas removidas")
+
+        podadas = db.podar_alteracoes(Config.ALTERACOES_RETENCAO_DIAS)
+        if podadas:
+            print(f"🧹 [VARREDOR] {podadas} registros antigos do log de alterações removidos")
+
+        podados = db.podar_tempos_passos(Config.TEMPOS_PASSOS_RETENCAO_DIAS)
+        if podados:
+            print(f"🧹 [VARREDOR] {podados} tempos de passos antigos do BitPanel removidos")
+
+        reservas = db.podar_reservas_usuario()
+        if reservas:
+            print(f"🧹 [VARREDOR] {reservas} reservas de usuário IPTV vencidas removidas")
+        return removidas
+
+
+class ArquivadorListas(TarefaPeriodica):
+    """
+    Tira da tabela `clientes` as listas expiradas há muito tempo e os testes
+    antigos, junto com os pagamentos deles, para que listagens, contagens e
+    avisos só percorram clientes que ainda importam.
+    """
+
+    nome = "arquivador-listas"
+    etiqueta = "ARQUIVADOR"
+
+    def __init__(self, intervalo: int = None):
+        super().__init__(intervalo or Config.ARQUIVADOR_INTERVALO_SEGUNDOS)
+        self.ultimo_total = {"clientes": 0, "pagamentos": 0}
+
+    def executar(self) -> dict:
+        """Executa um arquivamento e retorna quantos clientes e pagamentos foram movidos."""
+        total = db.arquivar_listas_antigas(
+            dias_expiradas=Config.ARQUIVO_EXPIRADAS_DIAS,
+            dias_testes=Config.ARQUIVO_TESTES_DIAS,
+        )
+        self.ultima_execucao = datetime.now()
+        self.ultimo_total = total
+        print(f"📦 [ARQUIVADOR] {total['clientes']} listas e {total['pagamentos']} pagamentos arquivados")
+        if total["clientes"]:
+            db.log_sistema(
+                "info",
+                f"Arquivador: {total['clientes']} listas e {total['pagamentos']} pagamentos movidos para o arquivo",
+            )
+        return total
+
+
+class AtualizadorSegmentos(TarefaPeriodica):
+    """
+    Mantém os públicos de avisos (segmentos_membros) em dia fora das
+    requisições: a contagem da página de avisos só lê o resultado. Clientes
+    alterados já entram no segmento certo logo após a escrita
+    (DatabaseManager.atualizar_segmentos_pendentes); aqui ficam as datas de
+    expiração que cruzam os limites com o passar do tempo e o que a escrita
+    não conseguiu atualizar.
+    """
+
+    nome = "atualizador-segmentos"
+    etiqueta = "SEGMENTOS"
+
+    def __init__(self, intervalo: int = None):
+        super().__init__(intervalo or Config.SEGMENTOS_INTERVALO_SEGUNDOS)
+        self.ultimo_total = 0
+
+    def executar(self) -> int:
+        """Atualiza os segmentos e retorna quantos clientes foram reavaliados."""
+        reavaliados = db.atualizar_segmentos_avisos()
+        self.ultima_execucao = datetime.now()
+        self.ultimo_total = reavaliados
+        if reavaliados:
+            print(f"🎯 [SEGMENTOS] {reavaliados} clientes reavaliados nos públicos de avisos")
+        return reavaliados
+
+
+varredor_conversas = VarredorConversas()
+arquivador_listas = ArquivadorListas()
+atualizador_segmentos = AtualizadorSegmentos()
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
 
 from config import Config
-from database import db
+from database import db, normalizar_telefone
 
 class MercadoPagoManager:
     def __init__(self):
@@ -32,7 +32,7 @@ class MercadoPagoManager:
                 "description": descricao,
                 "payment_method_id": "pix",
                 "payer": {
-                    "email": f"cliente{cliente_telefone.replace('+', '').replace('-', '')}@gmail.com",
+                    "email": f"cliente{normalizar_telefone(cliente_telefone).lstrip('+')}@gmail.com",
                     "first_name": "Cliente",
                     "last_name": "IPTV"
                 },
@@ -99,22 +99,29 @@ class MercadoPagoManager:
                 pagamento_db = db.buscar_pagamento(str(payment_id))
                 if pagamento_db and pagamento_db.get('status') != 'approved':
                     print(f"[WEBHOOK MP] Pagamento {payment_id} APROVADO.")
-                    db.atualizar_status_pagamento(str(payment_id), "approved")
-                    
+
                     telefone = pagamento_db['telefone']
                     contexto = pagamento_db['contexto']
                     dados = json.loads(pagamento_db.get('dados_temporarios', '{}'))
 
-                    from gemini_bot import gemini_bot
+                    from fila_jobs import fila_jobs, payload_renovacao
 
-                    # --- LÓGICA CORRIGIDA ---
+                    # A automação roda na fila de jobs, não nesta requisição. O job é gravado
+                    # antes de marcar o pagamento: se cair entre um e outro, a próxima
+                    # notificação do MP cai na mesma chave e não duplica nada.
+                    payload = {"telefone": telefone, "dados": dados, "payment_id": str(payment_id)}
                     if contexto == 'comprar':
-                        print(f"[WEBHOOK MP] Iniciando fluxo de CRIAÇÃO para {telefone}")
-                        gemini_bot.processar_pagamento_aprovado(telefone, dados)
+                        print(f"[WEBHOOK MP] Enfileirando CRIAÇÃO para {telefone}")
+                        fila_jobs.enfileirar("criar_lista", payload, chave=f"pagamento:{payment_id}:comprar")
+                        # Pago: o nome fica reservado até a fila criar a lista, mesmo com o painel fora do ar
+                        if not db.reservar_usuario_iptv(dados["usuario"], telefone, Config.RESERVA_USUARIO_PAGO_HORAS * 60):
+                            print(f"⚠️ [WEBHOOK MP] Usuário '{dados['usuario']}' foi reservado por outro pedido")
                     elif contexto == 'renovar':
-                        print(f"[WEBHOOK MP] Iniciando fluxo de RENOVAÇÃO para {telefone}")
-                        gemini_bot.processar_pagamento_renovacao(telefone, dados)
-                    
+                        print(f"[WEBHOOK MP] Enfileirando RENOVAÇÃO para {telefone}")
+                        fila_jobs.enfileirar("renovar_lista", payload_renovacao(telefone, dados, payment_id=str(payment_id)),
+                                             chave=f"pagamento:{payment_id}:renovar")
+
+                    db.atualizar_status_pagamento(str(payment_id), "approved")
                     db.set_conversa(telefone, 'inicial', 'menu', '{}') # Reseta a conversa
                     return True
             return False
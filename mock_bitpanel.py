@@ -0,0 +1,752 @@
+# mock_bitpanel.py - BitPanel falso local, para testar a automação sem gastar créditos
+"""
+Imita o painel nas duas formas que o sistema usa, guardando as listas em
+memória:
+
+- as rotas JSON que o BitPanelApiClient chama (/api/...);
+- as páginas que o BitPanelManager percorre com o Chrome: /login, /dashboard,
+  /list (busca, tabela paginada, menu de cada linha, formulários de criar,
+  renovar e teste com selects e slider) e a página de detalhes com o bloco
+  'user-infor'. Os seletores são os mesmos que a automação procura no painel
+  real.
+
+Latência e falhas são configuráveis (no construtor, na linha de comando ou
+em POST /_mock/config), para medir a automação e o ExecutorSincronizacao
+offline e ver como eles reagem a um painel lento ou instável.
+
+Rode `python mock_bitpanel.py --latencia 0.3 --listas 200` e aponte
+BITPANEL_URL para http://127.0.0.1:5055/ (Selenium) ou BITPANEL_API_URL para
+http://127.0.0.1:5055 (API), ou use `iniciar_servidor()` dentro de um teste.
+"""
+
+import argparse
+import itertools
+import random
+import re
+import secrets
+import string
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify, make_response, redirect, render_template_string, request
+from werkzeug.serving import make_server
+
+COOKIE_SESSAO = "bitpanel_sessao"
+
+PLANOS_TV = [
+    "Full HD + H265 + HD + SD + VOD + Adulto + LGBT",
+    "Full HD + H265 + HD + SD + VOD",
+    "HD + SD",
+]
+PLANOS_PRECO = ["Basico, R$ 30,00", "Premium, R$ 45,00"]
+VALIDADES = ["1 Mês"] + [f"{meses} Meses" for meses in range(2, 13)]
+ITENS_POR_PAGINA = [("10", 10), ("25", 25), ("50", 50), ("Todos", -1)]
+
+
+class PainelFalso:
+    """
+    Estado do painel falso: usuário aceito, tokens emitidos, listas criadas
+    e a simulação de rede (atraso por requisição e taxa de falhas).
+    """
+
+    def __init__(self, usuario: str = "admin", senha: str = "admin", latencia: float = 0.0,
+                 variacao: float = 0.0, taxa_falha: float = 0.0, semente: int = None):
+        self.usuario = usuario
+        self.senha = senha
+        self.tokens = set()
+        self.listas = {}
+        self.latencia = latencia
+        self.variacao = variacao
+        self.taxa_falha = taxa_falha
+        self._aleatorio = random.Random(semente)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._contadores = {"requisicoes": 0, "falhas_injetadas": 0, "segundos_atraso": 0.0}
+
+    def configurar(self, latencia: float = None, variacao: float = None, taxa_falha: float = None):
+        if latencia is not None:
+            self.latencia = max(0.0, float(latencia))
+        if variacao is not None:
+            self.variacao = max(0.0, float(variacao))
+        if taxa_falha is not None:
+            self.taxa_falha = min(1.0, max(0.0, float(taxa_falha)))
+
+    def simular_rede(self) -> bool:
+        """Dorme o atraso configurado. Retorna True se esta requisição deve falhar."""
+        with self._lock:
+            atraso = max(0.0, self.latencia + self._aleatorio.uniform(-self.variacao, self.variacao))
+            falhar = self.taxa_falha > 0 and self._aleatorio.random() < self.taxa_falha
+            self._contadores["requisicoes"] += 1
+            self._contadores["segundos_atraso"] += atraso
+            if falhar:
+                self._contadores["falhas_injetadas"] += 1
+        if atraso:
+            time.sleep(atraso)
+        return falhar
+
+    def metricas(self) -> dict:
+        with self._lock:
+            dados = dict(self._contadores)
+            dados["listas"] = len(self.listas)
+        dados.update(latencia=self.latencia, variacao=self.variacao, taxa_falha=self.taxa_falha)
+        return dados
+
+    def nova_lista(self, username: str, conexoes: int, validade: timedelta, plano: str, status: str = "Ativo") -> dict:
+        with self._lock:
+            agora = datetime.now().replace(second=0, microsecond=0)
+            lista = {
+                "id": next(self._ids),
+                "username": username,
+                "password": "".join(secrets.choice(string.digits) for _ in range(8)),
+                "connections": conexoes,
+                "created_at": agora.isoformat(),
+                "expires_at": (agora + validade).isoformat(),
+                "plan": plano,
+                "status": status,
+            }
+            self.listas[lista["id"]] = lista
+            return dict(lista)
+
+    def popular(self, quantidade: int, prefixo: str = "cliente") -> list:
+        """Cria `quantidade` listas de 1 mês, para ter uma tabela de tamanho realista."""
+        return [
+            self.nova_lista(f"{prefixo}{numero:04d}", 1 + numero % 3, timedelta(days=30), PLANOS_TV[0])
+            for numero in range(1, quantidade + 1)
+        ]
+
+    def buscar(self, termo: str) -> list:
+        with self._lock:
+            return [dict(lista) for lista in self.listas.values() if termo.lower() in lista["username"].lower()]
+
+    def existe(self, username: str) -> bool:
+        with self._lock:
+            return any(lista["username"] == username for lista in self.listas.values())
+
+    def renovar(self, lista_id: int, meses: int):
+        """Soma `meses` à validade (a partir de agora, se já venceu). None se a lista não existe."""
+        with self._lock:
+            lista = self.listas.get(lista_id)
+            if not lista:
+                return None
+            base = max(datetime.fromisoformat(lista["expires_at"]), datetime.now().replace(second=0, microsecond=0))
+            lista["expires_at"] = (base + timedelta(days=30 * meses)).isoformat()
+            return dict(lista)
+
+
+def _data_tela(valor: str) -> str:
+    """ISO -> 'dd/mm/aaaa HH:MM', como o painel mostra."""
+    return datetime.fromisoformat(valor).strftime("%d/%m/%Y %H:%M")
+
+
+def _meses(texto, padrao: int = 1) -> int:
+    """'3 Meses' -> 3."""
+    encontrado = re.match(r"\s*(\d+)", str(texto or ""))
+    return int(encontrado.group(1)) if encontrado else padrao
+
+
+_CABECALHO = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>BitPanel - {{ titulo }}</title>
+<style>
+body { font-family: sans-serif; margin: 0; background: #1e1e1e; color: #eee; }
+.container { padding: 16px 24px; }
+label { display: block; font-size: 13px; color: #aaa; }
+input { display: block; width: 240px; height: 28px; margin-bottom: 12px; }
+button { min-width: 36px; min-height: 32px; cursor: pointer; }
+table { border-collapse: collapse; width: 100%; }
+td, th { text-align: left; padding: 6px 12px; border-bottom: 1px solid #333; }
+.v-progress-linear { height: 4px; background: #2196f3; }
+.v-data-footer { display: flex; gap: 16px; align-items: center; padding: 8px 0; }
+.v-select__slot { min-width: 200px; min-height: 28px; padding: 4px; border: 1px solid #555; cursor: pointer; margin-bottom: 12px; }
+.v-menu__content { position: absolute; z-index: 20; background: #333; min-width: 200px; }
+.v-list-item { display: block; padding: 8px 12px; color: #eee; text-decoration: none; cursor: pointer; }
+.v-list-item__title { min-height: 16px; }
+.v-dialog--active { position: fixed; top: 40px; left: 50%; transform: translateX(-50%); width: 520px; background: #2b2b2b; padding: 16px; z-index: 10; }
+.v-slider { position: relative; width: 300px; height: 24px; margin-bottom: 12px; }
+.v-slider__track-container { position: absolute; top: 10px; width: 100%; height: 4px; background: #555; }
+.v-slider__thumb-container { position: absolute; top: 4px; width: 16px; height: 16px; border-radius: 8px; background: #2196f3; }
+.v-snack { position: fixed; bottom: 16px; left: 16px; background: #b71c1c; padding: 12px; z-index: 30; }
+.v-btn--disabled { opacity: .4; }
+</style>
+</head>
+<body>
+"""
+
+_RODAPE = """
+</body>
+</html>
+"""
+
+_PAGINA_LOGIN = _CABECALHO + """
+<div id="app" class="v-application theme--dark">
+  <div class="container">
+    <div class="v-card v-sheet theme--dark login-card">
+      <div class="v-card__title">Entrar no painel</div>
+      <form class="v-form" method="post" action="/login">
+        <label for="username">Usuário</label>
+        <input type="text" id="username" name="username" value="{{ usuario }}">
+        <label for="password">Senha</label>
+        <input type="password" id="password" name="password">
+        <button type="submit" class="v-btn primary"><span class="v-btn__content">Entrar</span></button>
+      </form>
+      {% if erro %}
+      <div class="v-alert error"><div class="v-alert__content">{{ erro }}</div></div>
+      {% endif %}
+    </div>
+  </div>
+</div>
+""" + _RODAPE
+
+_PAGINA_DASHBOARD = _CABECALHO + """
+<div id="app" class="v-application theme--dark">
+  <div class="container">
+    <h1>Dashboard</h1>
+    <p>Listas ativas: {{ total }}</p>
+    <a href="/list">Listas</a>
+  </div>
+</div>
+""" + _RODAPE
+
+_PAGINA_INDISPONIVEL = _CABECALHO + """
+<div id="app" class="v-application theme--dark">
+  <div class="container">
+    <div class="v-alert error"><div class="v-alert__content">Erro {{ status }}: {{ mensagem }}</div></div>
+  </div>
+</div>
+""" + _RODAPE
+
+_PAGINA_DETALHES = _CABECALHO + """
+<div id="app" class="v-application theme--dark">
+  <main class="v-main">
+    <div class="container">
+      <div class="v-card v-sheet theme--dark">
+        <div class="v-card__title">Informações da lista</div>
+        <div class="v-card__text">
+          <div class="user-infor">
+            <ul>
+              <li><strong>Usuário:</strong> {{ lista.username }}</li>
+              <li><strong>Senha:</strong> {{ lista.password }}</li>
+              <li><strong>Conexões:</strong> {{ lista.connections }}</li>
+              <li><strong>Data de criação:</strong> {{ criado_em }}</li>
+              <li><strong>Data de validade:</strong> {{ expira_em }}</li>
+              <li><strong>Plano de TV:</strong> {{ lista.plan }}</li>
+              <li><strong>Status:</strong> <span class="v-chip"><span class="v-chip__content">{{ lista.status }}</span></span></li>
+              <li><a href="#" class="link-lista">Clique aqui para ver o link da lista</a></li>
+            </ul>
+          </div>
+          <a href="/list">Voltar</a>
+        </div>
+      </div>
+    </div>
+  </main>
+</div>
+""" + _RODAPE
+
+# Os selects são montados pelo script a partir de data-opcoes; o menu de opções
+# só existe enquanto está aberto, como no Vuetify (evita opções repetidas no DOM).
+_SELECT = """
+<div class="v-select" data-campo="{campo}">
+  <div role="button" class="v-select__slot" data-acao="selecao" data-opcoes='{{{{ {opcoes}|tojson }}}}'>
+    <label>{rotulo}</label>
+    <div class="v-select__selections"></div>
+  </div>
+</div>
+"""
+
+_CAMPO_USUARIO = """
+<div class="v-text-field">
+  <label>Nome do usuário</label>
+  <input type="text" name="username" autocomplete="off">
+</div>
+"""
+
+_PAGINA_LISTAS = _CABECALHO + """
+<div id="dialogo"></div>
+<template id="tpl-criar">
+  <div class="v-card__title">Nova lista</div>
+  """ + _CAMPO_USUARIO + """
+  """ + _SELECT.format(campo="plano_tv", opcoes="planos_tv", rotulo="Selecione o plano de tv") + """
+  """ + _SELECT.format(campo="plano", opcoes="planos_preco", rotulo="Selecione o plano") + """
+  <div class="v-input__control">
+    <div class="v-subheader">Selecione a quantidade de conexões</div>
+    <div class="v-slider">
+      <div class="v-slider__track-container"><div class="v-slider__track-fill"></div></div>
+      <div role="slider" tabindex="0" class="v-slider__thumb-container" aria-valuemin="1" aria-valuemax="10" aria-valuenow="1"></div>
+    </div>
+  </div>
+  """ + _SELECT.format(campo="validade", opcoes="validades", rotulo="Selecione a validade") + """
+  <button type="button" class="v-btn" data-acao="fechar"><span>Cancelar</span></button>
+  <button type="button" class="v-btn primary" data-acao="criar"><span>Criar</span></button>
+</template>
+<template id="tpl-renovar">
+  <div class="v-card__title">Renovar lista</div>
+  """ + _SELECT.format(campo="plano", opcoes="planos_preco", rotulo="Selecione o plano") + """
+  """ + _SELECT.format(campo="validade", opcoes="validades", rotulo="Selecione a validade") + """
+  <button type="button" class="v-btn" data-acao="fechar"><span>Cancelar</span></button>
+  <button type="button" class="v-btn primary" data-acao="renovar"><span>Renovar</span></button>
+</template>
+<template id="tpl-teste">
+  <div class="v-card__title">Novo teste</div>
+  """ + _CAMPO_USUARIO + """
+  """ + _SELECT.format(campo="plano_tv", opcoes="planos_tv", rotulo="Selecione o plano de tv") + """
+  <button type="button" class="v-btn" data-acao="fechar"><span>Cancelar</span></button>
+  <button type="button" class="v-btn primary" data-acao="criar-teste"><span>Criar</span></button>
+</template>
+
+<div id="app" class="v-application theme--dark">
+  <main class="v-main">
+    <div class="container container--fluid">
+      <div class="v-card v-sheet theme--dark">
+        <div class="v-card__title">Listas
+          <button type="button" class="v-btn btn-test" data-acao="teste"><span class="v-btn__content">Criar teste</span></button>
+        </div>
+        <div class="v-text-field">
+          <label for="busca">Buscar por nome</label>
+          <input type="text" id="busca" autocomplete="off">
+        </div>
+        <div class="v-data-table theme--dark">
+          <div class="v-progress-linear" style="display: none"></div>
+          <div class="v-data-table__wrapper">
+            <table>
+              <thead class="v-data-table-header">
+                <tr>
+                  <th>Usuário</th><th>Senha</th><th>Conexões</th><th>Criado em</th><th>Validade</th><th>Status</th><th>Ações</th>
+                </tr>
+              </thead>
+              <tbody></tbody>
+            </table>
+          </div>
+          <div class="v-data-footer">
+            <div class="v-data-footer__select">Itens por página:
+              <div role="button" class="v-select__slot" data-acao="por-pagina"><div class="v-select__selections">10</div></div>
+            </div>
+            <div class="v-data-footer__pagination"></div>
+            <div class="v-data-footer__icons-before"><button type="button" class="v-btn v-btn--icon" data-acao="anterior"><i class="mdi mdi-chevron-left">&lt;</i></button></div>
+            <div class="v-data-footer__icons-after"><button type="button" class="v-btn v-btn--icon" data-acao="proxima"><i class="mdi mdi-chevron-right">&gt;</i></button></div>
+          </div>
+        </div>
+      </div>
+      <button type="button" class="v-btn v-btn--fab primary" data-acao="novo"><i class="v-icon mdi mdi-plus">+</i></button>
+    </div>
+  </main>
+</div>
+<div id="snackbar" class="v-snack" style="display: none"><div class="v-snack__wrapper"><div class="v-snack__content"></div></div></div>
+<script>
+const ITENS_POR_PAGINA = {{ itens_por_pagina|tojson }};
+const estado = {pagina: 1, porPagina: 10, total: 0, requisicao: 0};
+
+function escapar(texto) {
+  const div = document.createElement('div');
+  div.textContent = texto == null ? '' : String(texto);
+  return div.innerHTML;
+}
+
+function avisar(mensagem) {
+  const snack = document.getElementById('snackbar');
+  snack.querySelector('.v-snack__content').textContent = mensagem;
+  snack.style.display = 'block';
+  clearTimeout(avisar.timer);
+  avisar.timer = setTimeout(() => { snack.style.display = 'none'; }, 8000);
+}
+
+async function enviar(url, dados) {
+  const resposta = await fetch(url, {
+    method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(dados || {}),
+  });
+  let corpo = {};
+  try { corpo = await resposta.json(); } catch (erro) { /* corpo vazio */ }
+  if (!resposta.ok) { throw new Error(corpo.message || ('Erro ' + resposta.status)); }
+  return corpo;
+}
+
+function fecharMenu() {
+  document.querySelectorAll('.v-menu__content').forEach((menu) => menu.remove());
+}
+
+function abrirMenu(ancora, itens, aoEscolher) {
+  fecharMenu();
+  const menu = document.createElement('div');
+  menu.className = 'v-menu__content menuable__content__active';
+  const posicao = ancora.getBoundingClientRect();
+  menu.style.top = (posicao.bottom + window.scrollY) + 'px';
+  menu.style.left = (posicao.left + window.scrollX) + 'px';
+  menu.innerHTML = '<div class="v-list" role="menu">' + itens.map((item, indice) => {
+    const titulo = '<div class="v-list-item__title">' + escapar(item.titulo) + '</div>';
+    if (item.href) {
+      return '<a class="v-list-item v-list-item--link" role="menuitem" href="' + escapar(item.href) + '">' + titulo + '</a>';
+    }
+    return '<div class="v-list-item v-list-item--link" role="menuitem" data-indice="' + indice + '">' + titulo + '</div>';
+  }).join('') + '</div>';
+  menu.addEventListener('click', (evento) => {
+    const item = evento.target.closest('[data-indice]');
+    if (!item) { return; }
+    fecharMenu();
+    aoEscolher(itens[Number(item.dataset.indice)]);
+  });
+  document.body.appendChild(menu);
+}
+
+function abrirDialogo(modelo, listaId) {
+  fecharMenu();
+  const host = document.getElementById('dialogo');
+  host.dataset.lista = listaId || '';
+  host.innerHTML = '<div class="v-dialog v-dialog--active">' + document.getElementById(modelo).innerHTML + '</div>';
+}
+
+function fecharDialogo() {
+  document.getElementById('dialogo').innerHTML = '';
+}
+
+function valorCampo(nome) {
+  const slot = document.querySelector('#dialogo [data-campo="' + nome + '"] [data-acao="selecao"]');
+  return slot ? (slot.dataset.valor || '') : '';
+}
+
+function dadosDialogo() {
+  const usuario = document.querySelector('#dialogo input[name="username"]');
+  const slider = document.querySelector('#dialogo [role="slider"]');
+  return {
+    username: usuario ? usuario.value.trim() : '',
+    plano_tv: valorCampo('plano_tv'),
+    plano: valorCampo('plano'),
+    validade: valorCampo('validade'),
+    conexoes: slider ? Number(slider.getAttribute('aria-valuenow')) : 1,
+  };
+}
+
+async function carregar(pagina) {
+  const progresso = document.querySelector('.v-progress-linear');
+  const requisicao = ++estado.requisicao;
+  progresso.style.display = 'block';
+  try {
+    const busca = encodeURIComponent(document.getElementById('busca').value.trim());
+    const resposta = await fetch('/list/dados?search=' + busca + '&pagina=' + pagina + '&por_pagina=' + estado.porPagina);
+    if (!resposta.ok) { throw new Error('Erro ' + resposta.status + ' ao carregar as listas'); }
+    const dados = await resposta.json();
+    if (requisicao !== estado.requisicao) { return; }
+    estado.pagina = dados.pagina;
+    estado.total = dados.total;
+    desenharTabela(dados);
+  } catch (erro) {
+    avisar(erro.message);
+  } finally {
+    if (requisicao === estado.requisicao) { progresso.style.display = 'none'; }
+  }
+}
+
+function desenharTabela(dados) {
+  const corpo = document.querySelector('.v-data-table tbody');
+  if (!dados.linhas.length) {
+    corpo.innerHTML = '<tr class="v-data-table__empty-wrapper"><td colspan="7">Nenhum dado disponível</td></tr>';
+  } else {
+    corpo.innerHTML = dados.linhas.map((linha) => '<tr>'
+      + '<td class="text-start">' + escapar(linha.username) + '</td>'
+      + '<td class="text-start">' + escapar(linha.password) + '</td>'
+      + '<td class="text-start">' + escapar(linha.connections) + '</td>'
+      + '<td class="text-start">' + escapar(linha.criado_em) + '</td>'
+      + '<td class="text-start">' + escapar(linha.expira_em) + '</td>'
+      + '<td class="text-start"><span class="v-chip"><span class="v-chip__content">' + escapar(linha.status) + '</span></span></td>'
+      + '<td class="text-start"><button type="button" class="v-btn v-btn--icon" data-acao="menu-lista" data-id="' + linha.id + '">'
+      + '<span class="v-btn__content"><i class="v-icon mdi mdi-dots-vertical">&#8942;</i></span></button></td>'
+      + '</tr>').join('');
+  }
+  const porPagina = estado.porPagina > 0 ? estado.porPagina : Math.max(dados.total, 1);
+  const inicio = dados.total ? (estado.pagina - 1) * porPagina + 1 : 0;
+  const fim = Math.min(estado.pagina * porPagina, dados.total);
+  document.querySelector('.v-data-footer__pagination').textContent = inicio + '-' + fim + ' de ' + dados.total;
+  const proxima = document.querySelector('[data-acao="proxima"]');
+  const ultima = fim >= dados.total;
+  proxima.disabled = ultima;
+  proxima.classList.toggle('v-btn--disabled', ultima);
+}
+
+async function acao(nome, alvo) {
+  if (nome === 'selecao') {
+    const opcoes = JSON.parse(alvo.dataset.opcoes).map((titulo) => ({titulo: titulo}));
+    abrirMenu(alvo, opcoes, (item) => {
+      alvo.dataset.valor = item.titulo;
+      alvo.querySelector('.v-select__selections').textContent = item.titulo;
+    });
+  } else if (nome === 'por-pagina') {
+    abrirMenu(alvo, ITENS_POR_PAGINA.map((par) => ({titulo: par[0], valor: par[1]})), (item) => {
+      estado.porPagina = item.valor;
+      alvo.querySelector('.v-select__selections').textContent = item.titulo;
+      carregar(1);
+    });
+  } else if (nome === 'menu-lista') {
+    const id = alvo.dataset.id;
+    abrirMenu(alvo, [{titulo: 'Ver informações', href: '/list/' + id}, {titulo: 'Renovar'}],
+      () => abrirDialogo('tpl-renovar', id));
+  } else if (nome === 'proxima' || nome === 'anterior') {
+    if (!alvo.disabled) { carregar(estado.pagina + (nome === 'proxima' ? 1 : -1)); }
+  } else if (nome === 'novo') {
+    abrirDialogo('tpl-criar');
+  } else if (nome === 'teste') {
+    abrirDialogo('tpl-teste');
+  } else if (nome === 'fechar') {
+    fecharDialogo();
+  } else if (nome === 'criar' || nome === 'criar-teste' || nome === 'renovar') {
+    const rotas = {'criar': '/list/criar', 'criar-teste': '/list/teste'};
+    const url = rotas[nome] || ('/list/' + document.getElementById('dialogo').dataset.lista + '/renovar');
+    try {
+      const lista = await enviar(url, dadosDialogo());
+      window.location.href = '/list/' + lista.id;
+    } catch (erro) {
+      avisar(erro.message);
+    }
+  }
+}
+
+document.addEventListener('click', (evento) => {
+  const alvo = evento.target.closest('[data-acao]');
+  if (alvo) {
+    acao(alvo.dataset.acao, alvo);
+  } else if (!evento.target.closest('.v-menu__content')) {
+    fecharMenu();
+  }
+});
+
+document.addEventListener('keydown', (evento) => {
+  const slider = evento.target.closest ? evento.target.closest('[role="slider"]') : null;
+  if (slider) {
+    const passos = {ArrowRight: 1, ArrowUp: 1, ArrowLeft: -1, ArrowDown: -1};
+    if (!(evento.key in passos)) { return; }
+    evento.preventDefault();
+    const minimo = Number(slider.getAttribute('aria-valuemin'));
+    const maximo = Number(slider.getAttribute('aria-valuemax'));
+    const valor = Math.min(maximo, Math.max(minimo, Number(slider.getAttribute('aria-valuenow')) + passos[evento.key]));
+    slider.setAttribute('aria-valuenow', String(valor));
+    slider.style.left = ((valor - minimo) / (maximo - minimo) * 100) + '%';
+  } else if (evento.key === 'Enter' && evento.target.id === 'busca') {
+    carregar(1);
+  } else if (evento.key === 'Escape') {
+    fecharMenu();
+  }
+});
+
+carregar(1);
+</script>
+""" + _RODAPE
+
+
+def criar_app(painel: PainelFalso = None) -> Flask:
+    painel = painel or PainelFalso()
+    app = Flask(__name__)
+    app.config["painel"] = painel
+
+    def autenticado() -> bool:
+        cabecalho = request.headers.get("Authorization", "")
+        if cabecalho.startswith("Bearer "):
+            return cabecalho[7:] in painel.tokens
+        return request.cookies.get(COOKIE_SESSAO) in painel.tokens
+
+    def _pagina(template: str, codigo: int = 200, **contexto):
+        return make_response(render_template_string(template, **contexto), codigo)
+
+    def _pede_json() -> bool:
+        """Chamadas da API e fetch das páginas recebem JSON; navegação do Chrome recebe HTML."""
+        return request.path.startswith("/api/") or request.path == "/list/dados" or request.is_json
+
+    @app.before_request
+    def simular_e_exigir_login():
+        if request.path.startswith("/_mock/"):
+            return None
+        if painel.simular_rede():
+            if _pede_json():
+                return jsonify({"message": "Serviço indisponível (falha simulada)"}), 503
+            return _pagina(_PAGINA_INDISPONIVEL, 503, titulo="Erro", status=503,
+                           mensagem="painel indisponível (falha simulada)")
+        if request.path in ("/login", "/api/auth/login") or autenticado():
+            return None
+        if _pede_json():
+            return jsonify({"message": "Unauthenticated."}), 401
+        return redirect("/login")
+
+    @app.post("/api/auth/login")
+    def login():
+        dados = request.get_json(silent=True) or {}
+        if dados.get("username") != painel.usuario or dados.get("password") != painel.senha:
+            return jsonify({"message": "Credenciais inválidas"}), 422
+        token = secrets.token_hex(16)
+        painel.tokens.add(token)
+        return jsonify({"token": token})
+
+    @app.get("/api/auth/me")
+    def perfil():
+        return jsonify({"data": {"username": painel.usuario}})
+
+    @app.get("/api/lists")
+    def listar():
+        return jsonify({"data": painel.buscar(request.args.get("search", ""))})
+
+    @app.post("/api/lists")
+    def criar():
+        dados = request.get_json(silent=True) or {}
+        username = str(dados.get("username", "")).strip()
+        if not username:
+            return jsonify({"message": "username obrigatório"}), 422
+        if painel.existe(username):
+            return jsonify({"message": "Usuário já existe"}), 422
+        lista = painel.nova_lista(
+            username,
+            int(dados.get("connections", 1)),
+            timedelta(days=30 * int(dados.get("months", 1))),
+            dados.get("plan_tv", ""),
+        )
+        return jsonify({"data": lista}), 201
+
+    @app.post("/api/lists/test")
+    def criar_teste():
+        dados = request.get_json(silent=True) or {}
+        username = str(dados.get("username", "")).strip()
+        if not username or painel.buscar(username):
+            return jsonify({"message": "Usuário inválido ou já existe"}), 422
+        lista = painel.nova_lista(username, 1, timedelta(hours=4), dados.get("plan_tv", ""), status="Teste")
+        return jsonify({"data": lista}), 201
+
+    @app.get("/api/lists/<int:lista_id>")
+    def detalhes(lista_id):
+        lista = painel.listas.get(lista_id)
+        if not lista:
+            return jsonify({"message": "Não encontrado"}), 404
+        return jsonify({"data": lista})
+
+    @app.post("/api/lists/<int:lista_id>/renew")
+    def renovar(lista_id):
+        dados = request.get_json(silent=True) or {}
+        lista = painel.renovar(lista_id, int(dados.get("months", 1)))
+        if not lista:
+            return jsonify({"message": "Não encontrado"}), 404
+        return jsonify({"data": lista})
+
+    # --- Páginas (o que o BitPanelManager vê pelo Chrome) ---
+
+    @app.get("/")
+    def inicio():
+        return redirect("/dashboard")
+
+    @app.route("/login", methods=["GET", "POST"])
+    def pagina_login():
+        if request.method == "GET":
+            return _pagina(_PAGINA_LOGIN, titulo="Login", usuario="", erro=None)
+        usuario = request.form.get("username", "")
+        if usuario != painel.usuario or request.form.get("password") != painel.senha:
+            return _pagina(_PAGINA_LOGIN, 422, titulo="Login", usuario=usuario, erro="Usuário ou senha inválidos")
+        token = secrets.token_hex(16)
+        painel.tokens.add(token)
+        resposta = redirect("/dashboard")
+        resposta.set_cookie(COOKIE_SESSAO, token, httponly=True, samesite="Lax")
+        return resposta
+
+    @app.get("/dashboard")
+    def pagina_dashboard():
+        return _pagina(_PAGINA_DASHBOARD, titulo="Dashboard", total=len(painel.listas))
+
+    @app.get("/list")
+    def pagina_listas():
+        return _pagina(_PAGINA_LISTAS, titulo="Listas", planos_tv=PLANOS_TV, planos_preco=PLANOS_PRECO,
+                       validades=VALIDADES, itens_por_pagina=ITENS_POR_PAGINA)
+
+    @app.get("/list/dados")
+    def dados_tabela():
+        listas = sorted(painel.buscar(request.args.get("search", "").strip()), key=lambda lista: lista["id"])
+        por_pagina = request.args.get("por_pagina", 10, type=int)
+        pagina = max(1, request.args.get("pagina", 1, type=int))
+        if por_pagina > 0:
+            pagina = min(pagina, max(1, -(-len(listas) // por_pagina)))
+            visiveis = listas[(pagina - 1) * por_pagina:pagina * por_pagina]
+        else:
+            pagina, visiveis = 1, listas
+        linhas = [
+            dict(lista, criado_em=_data_tela(lista["created_at"]), expira_em=_data_tela(lista["expires_at"]))
+            for lista in visiveis
+        ]
+        return jsonify({"linhas": linhas, "total": len(listas), "pagina": pagina})
+
+    @app.get("/list/<int:lista_id>")
+    def pagina_detalhes(lista_id):
+        lista = painel.listas.get(lista_id)
+        if not lista:
+            return _pagina(_PAGINA_INDISPONIVEL, 404, titulo="Erro", status=404, mensagem="lista não encontrada")
+        return _pagina(_PAGINA_DETALHES, titulo="Informações da lista", lista=lista,
+                       criado_em=_data_tela(lista["created_at"]), expira_em=_data_tela(lista["expires_at"]))
+
+    def _validar_formulario(dados: dict):
+        username = str(dados.get("username", "")).strip()
+        if not username:
+            return None, "Informe o nome do usuário"
+        if dados.get("plano_tv") not in PLANOS_TV:
+            return None, "Selecione o plano de tv"
+        if painel.existe(username):
+            return None, "Já existe um usuário com este nome"
+        return username, None
+
+    @app.post("/list/criar")
+    def formulario_criar():
+        dados = request.get_json(silent=True) or {}
+        username, erro = _validar_formulario(dados)
+        if erro:
+            return jsonify({"message": erro}), 422
+        if dados.get("plano") not in PLANOS_PRECO:
+            return jsonify({"message": "Selecione o plano"}), 422
+        conexoes = min(10, max(1, int(dados.get("conexoes") or 1)))
+        lista = painel.nova_lista(username, conexoes, timedelta(days=30 * _meses(dados.get("validade"))),
+                                  dados["plano_tv"])
+        return jsonify(lista), 201
+
+    @app.post("/list/teste")
+    def formulario_teste():
+        dados = request.get_json(silent=True) or {}
+        username, erro = _validar_formulario(dados)
+        if erro:
+            return jsonify({"message": erro}), 422
+        lista = painel.nova_lista(username, 1, timedelta(hours=4), dados["plano_tv"], status="Teste")
+        return jsonify(lista), 201
+
+    @app.post("/list/<int:lista_id>/renovar")
+    def formulario_renovar(lista_id):
+        dados = request.get_json(silent=True) or {}
+        if dados.get("validade") not in VALIDADES:
+            return jsonify({"message": "Selecione a validade"}), 422
+        lista = painel.renovar(lista_id, _meses(dados["validade"]))
+        if not lista:
+            return jsonify({"message": "Lista não encontrada"}), 404
+        return jsonify(lista)
+
+    # --- Controle do próprio mock (sem atraso nem falhas) ---
+
+    @app.route("/_mock/config", methods=["GET", "POST"])
+    def configuracao_mock():
+        if request.method == "POST":
+            dados = request.get_json(silent=True) or {}
+            painel.configurar(dados.get("latencia"), dados.get("variacao"), dados.get("taxa_falha"))
+        return jsonify(painel.metricas())
+
+    return app
+
+
+def iniciar_servidor(app: Flask, host: str = "127.0.0.1", porta: int = 0):
+    """Sobe o app numa thread e devolve (servidor, url_base). Pare com servidor.shutdown()."""
+    servidor = make_server(host, porta, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, name="mock-bitpanel", daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BitPanel falso local")
+    parser.add_argument("--porta", type=int, default=5055)
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--senha", default="admin")
+    parser.add_argument("--latencia", type=float, default=0.0, help="atraso por requisição, em segundos")
+    parser.add_argument("--variacao", type=float, default=0.0, help="variação aleatória do atraso (+/-), em segundos")
+    parser.add_argument("--taxa-falha", type=float, default=0.0, help="fração das requisições que falham (0 a 1)")
+    parser.add_argument("--listas", type=int, default=0, help="quantidade de listas criadas na partida")
+    argumentos = parser.parse_args()
+
+    painel = PainelFalso(argumentos.usuario, argumentos.senha, argumentos.latencia,
+                         argumentos.variacao, argumentos.taxa_falha)
+    painel.popular(argumentos.listas)
+    print(f"🧪 [MOCK BITPANEL] http://127.0.0.1:{argumentos.porta} ({len(painel.listas)} listas, "
+          f"latência {argumentos.latencia}s, falhas {argumentos.taxa_falha:.0%})")
+    criar_app(painel).run(host="127.0.0.1", port=argumentos.porta, debug=False, threaded=True)
@@ -0,0 +1,299 @@
+# parser_bitpanel.py - Leitura das páginas do BitPanel a partir do HTML, sem navegador
+"""
+Funções puras sobre um snapshot da página (`driver.page_source` ou um
+arquivo salvo): tabela de /list, bloco 'user-infor' da página de detalhes e
+mensagens de erro (snackbars, alerts, SweetAlert). Não dependem do Selenium,
+então podem ser testadas e medidas offline com os snapshots de
+fixtures_bitpanel/ (veja a opção do test_system.py).
+
+Também ficam aqui os mapeamentos rótulo -> chave do sistema usados pela
+automação, para que a leitura ao vivo (execute_script) e a offline deem o
+mesmo resultado.
+"""
+
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+# Cabeçalhos da tabela de /list -> chaves usadas no resto do sistema.
+# Colunas fora daqui (ações, checkbox...) são ignoradas.
+COLUNAS_TABELA = {
+    "usuário": "usuario",
+    "usuario": "usuario",
+    "nome": "usuario",
+    "nome do usuário": "usuario",
+    "username": "usuario",
+    "senha": "senha",
+    "password": "senha",
+    "conexões": "conexoes",
+    "conexoes": "conexoes",
+    "telas": "conexoes",
+    "connections": "conexoes",
+    "validade": "expira_em",
+    "vencimento": "expira_em",
+    "expira": "expira_em",
+    "expira em": "expira_em",
+    "data de validade": "expira_em",
+    "expires": "expira_em",
+    "criado": "criado_em",
+    "criado em": "criado_em",
+    "data de criação": "criado_em",
+    "created": "criado_em",
+    "status": "status_bitpanel",
+    "plano": "plano",
+}
+
+# Rótulos do bloco 'user-infor' (página de detalhes da lista) -> chaves usadas no resto do sistema
+CAMPOS_INFO_LISTA = {
+    # Usuário
+    "usuário": "usuario",
+    "usuario": "usuario",
+    "usuário iptv": "usuario",
+    "nome do usuário": "usuario",
+    "nome do usuario": "usuario",
+    "username": "usuario",
+    "user": "usuario",
+    # Senha
+    "senha": "senha",
+    "password": "senha",
+    "pass": "senha",
+    # Conexões
+    "conexões": "conexoes",
+    "conexoes": "conexoes",
+    "connections": "conexoes",
+    "max connections": "conexoes",
+    "numero de conexões": "conexoes",
+    "número de conexões": "conexoes",
+    "máximo de conexões": "conexoes",
+    # Data de Criação (CRÍTICO)
+    "data de criação": "criado_em",
+    "criado": "criado_em",
+    "data criação": "criado_em",
+    "data criacao": "criado_em",
+    "created at": "criado_em",
+    "created": "criado_em",
+    "creation date": "criado_em",
+    # Data de Expiração (CRÍTICO)
+    "data de validade": "expira_em",
+    "expira": "expira_em",
+    "data de expiração": "expira_em",
+    "data expiracao": "expira_em",
+    "data expiração": "expira_em",
+    "validade": "expira_em",
+    "expires at": "expira_em",
+    "expires": "expira_em",
+    "expiration date": "expira_em",
+    "valid until": "expira_em",
+    # Plano
+    "plano": "plano",
+    "plan": "plano",
+    "pacote": "plano",
+    "package": "plano",
+    "plano de tv": "plano",
+    "tv plan": "plano",
+    # Status
+    "status": "status_bitpanel",
+    "estado": "status_bitpanel",
+    "ativo": "status_bitpanel",
+    "active": "status_bitpanel",
+    "state": "status_bitpanel",
+}
+
+# Classes dos elementos que o painel usa para avisar de erro
+CLASSES_ERRO = (
+    "v-snack__content",
+    "v-alert__content",
+    "swal2-title",
+    "swal2-html-container",
+    "toast-message",
+    "v-messages__message",
+)
+
+# Tags que não têm conteúdo de texto (nem fechamento)
+_TAGS_VAZIAS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_TAGS_SEM_TEXTO = {"script", "style", "template", "noscript"}
+_ESPACOS = re.compile(r"\s+")
+
+
+def _chave_info_lista(rotulo: str) -> str:
+    """Chave do sistema para um rótulo do 'user-infor'; rótulos desconhecidos viram snake_case."""
+    chave = rotulo.lower().strip()
+    return CAMPOS_INFO_LISTA.get(chave) or (
+        chave.replace(" ", "_").replace("ã", "a").replace("ç", "c").replace("é", "e")
+    )
+
+
+def mapear_info_lista(pares) -> dict:
+    """Traduz os pares (rótulo, valor) do 'user-infor' para o dicionário da lista."""
+    dados = {}
+    for rotulo, valor in pares:
+        if not rotulo or "clique aqui" in rotulo.lower():
+            continue
+        dados[_chave_info_lista(rotulo)] = valor
+    return dados
+
+
+def mapear_linha_tabela(cabecalhos: list, celulas: list) -> dict:
+    """Traduz uma linha da tabela de /list, usando os cabeçalhos, para o dicionário da lista."""
+    dados = {}
+    for cabecalho, valor in zip(cabecalhos, celulas):
+        chave = COLUNAS_TABELA.get(cabecalho.lower().strip())
+        if not chave or not valor or chave in dados:
+            continue
+        if chave in ("expira_em", "criado_em"):
+            # Só serve a data completa; sem a hora o campo fica para a página de detalhes
+            try:
+                datetime.strptime(valor, "%d/%m/%Y %H:%M")
+            except ValueError:
+                continue
+        dados[chave] = valor
+    return dados
+
+
+class _No:
+    __slots__ = ("tag", "classes", "oculto", "filhos", "pai")
+
+    def __init__(self, tag: str, attrs: Dict[str, Optional[str]], pai: "_No" = None):
+        self.tag = tag
+        self.classes = set((attrs.get("class") or "").split())
+        estilo = (attrs.get("style") or "").replace(" ", "").lower()
+        self.oculto = "display:none" in estilo or (pai is not None and pai.oculto)
+        self.filhos: list = []  # _No ou str
+        self.pai = pai
+
+    def texto(self) -> str:
+        """Texto do nó com espaços colapsados, como o innerText de uma linha."""
+        partes: List[str] = []
+        pilha = [self]
+        while pilha:
+            atual = pilha.pop()
+            if isinstance(atual, str):
+                partes.append(atual)
+            elif atual.tag not in _TAGS_SEM_TEXTO:
+                if atual.tag == "br":
+                    partes.append(" ")
+                pilha.extend(reversed(atual.filhos))
+        return _ESPACOS.sub(" ", "".join(partes)).strip()
+
+    def buscar(self, condicao) -> List["_No"]:
+        """Descendentes que satisfazem `condicao`, na ordem do documento."""
+        encontrados = []
+        pilha = list(reversed(self.filhos))
+        while pilha:
+            atual = pilha.pop()
+            if isinstance(atual, str):
+                continue
+            if condicao(atual):
+                encontrados.append(atual)
+            pilha.extend(reversed(atual.filhos))
+        return encontrados
+
+    def primeiro(self, condicao) -> Optional["_No"]:
+        encontrados = self.buscar(condicao)
+        return encontrados[0] if encontrados else None
+
+
+class _MontadorArvore(HTMLParser):
+    """Monta uma árvore mínima de _No tolerando HTML mal fechado."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.raiz = _No("#documento", {})
+        self._atual = self.raiz
+
+    def handle_starttag(self, tag, attrs):
+        no = _No(tag, dict(attrs), self._atual)
+        self._atual.filhos.append(no)
+        if tag not in _TAGS_VAZIAS:
+            self._atual = no
+
+    def handle_startendtag(self, tag, attrs):
+        self._atual.filhos.append(_No(tag, dict(attrs), self._atual))
+
+    def handle_endtag(self, tag):
+        no = self._atual
+        while no is not self.raiz and no.tag != tag:
+            no = no.pai
+        if no is not self.raiz:
+            self._atual = no.pai
+
+    def handle_data(self, data):
+        self._atual.filhos.append(data)
+
+
+def _arvore(html: str) -> _No:
+    montador = _MontadorArvore()
+    montador.feed(html or "")
+    montador.close()
+    return montador.raiz
+
+
+def ler_tabela(html: str) -> Optional[Dict[str, list]]:
+    """
+    Cabeçalhos e células da tabela de /list, no mesmo formato que o
+    JS_LER_TABELA devolve. None se a página não tem tabela.
+    """
+    raiz = _arvore(html)
+    tabela = None
+    dados_tabela = raiz.primeiro(lambda no: "v-data-table" in no.classes)
+    if dados_tabela is not None:
+        tabela = dados_tabela.primeiro(lambda no: no.tag == "table")
+    if tabela is None:
+        tabela = raiz.primeiro(lambda no: no.tag == "table")
+    if tabela is None:
+        return None
+
+    cabecalhos, linhas = [], []
+    for secao in tabela.buscar(lambda no: no.tag in ("thead", "tbody")):
+        if secao.tag == "thead":
+            cabecalhos.extend(th.texto() for th in secao.buscar(lambda no: no.tag == "th"))
+            continue
+        for tr in secao.buscar(lambda no: no.tag == "tr"):
+            if "v-data-table__empty-wrapper" in tr.classes:
+                continue
+            linhas.append([td.texto() for td in tr.buscar(lambda no: no.tag == "td")])
+    return {"cabecalhos": cabecalhos, "linhas": linhas}
+
+
+def extrair_tabela_listas(html: str) -> Optional[Dict[str, dict]]:
+    """Linhas da tabela de /list como {usuario: dados}. None se a página não tem tabela."""
+    tabela = ler_tabela(html)
+    if tabela is None:
+        return None
+    listas = {}
+    for celulas in tabela["linhas"]:
+        dados = mapear_linha_tabela(tabela["cabecalhos"], celulas)
+        if dados.get("usuario"):
+            listas[dados["usuario"]] = dados
+    return listas
+
+
+def ler_info_lista(html: str) -> Optional[List[List[str]]]:
+    """Pares [rótulo, valor] do bloco 'user-infor', como o JS_LER_INFO_LISTA. None se não há bloco."""
+    bloco = _arvore(html).primeiro(lambda no: "user-infor" in no.classes)
+    if bloco is None:
+        return None
+    pares = []
+    for li in bloco.buscar(lambda no: no.tag == "li"):
+        texto = li.texto()
+        if ":" in texto:
+            rotulo, valor = texto.split(":", 1)
+            pares.append([rotulo.strip(), valor.strip()])
+    return pares
+
+
+def extrair_info_lista(html: str) -> Optional[dict]:
+    """Dados da página de detalhes da lista, com as chaves do sistema. None se não há bloco."""
+    pares = ler_info_lista(html)
+    return None if pares is None else mapear_info_lista(pares)
+
+
+def extrair_erros(html: str) -> List[str]:
+    """Textos das mensagens de erro visíveis na página (snackbar, alert, SweetAlert, validação)."""
+    erros = []
+    for no in _arvore(html).buscar(lambda no: not no.oculto and not no.classes.isdisjoint(CLASSES_ERRO)):
+        texto = no.texto()
+        if texto and texto not in erros:
+            erros.append(texto)
+    return erros
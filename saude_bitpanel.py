@@ -0,0 +1,178 @@
+# saude_bitpanel.py - Sonda de disponibilidade do BitPanel e disjuntor das automações
+"""
+Saber se o painel está no ar não pode custar um login com o Chrome a cada
+carregamento do dashboard. A SondaBitPanel faz, a cada intervalo, um GET
+simples na página do painel (sem navegador, sem baixar o corpo) e guarda o
+resultado; o dashboard só lê esse cache.
+
+O CircuitoBitPanel é o disjuntor: falhas seguidas (da sonda ou dos jobs da
+fila) abrem o circuito e, enquanto ele está aberto, a fila de jobs e o
+agendador de sincronização não disparam automações contra o painel — os
+jobs ficam pendentes na fila. Passada a espera, o circuito fica meio aberto:
+o próximo sucesso o fecha e a próxima falha o abre de novo.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import requests
+
+from config import Config
+from manutencao import TarefaPeriodica
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoBitPanel:
+    """Disjuntor das automações do BitPanel, compartilhado por todas as threads."""
+
+    def __init__(self, limite_falhas: int = None, espera_segundos: float = None):
+        self.limite_falhas = limite_falhas or Config.BITPANEL_CIRCUITO_FALHAS
+        self.espera_segundos = Config.BITPANEL_CIRCUITO_ESPERA_SEGUNDOS if espera_segundos is None else espera_segundos
+        self._estado = FECHADO
+        self._falhas_seguidas = 0
+        self._aberto_ate = 0.0
+        self._aberto_em: Optional[datetime] = None
+        self._ultimo_erro: Optional[str] = None
+        self._lock = threading.Lock()
+        self._contadores = {"aberturas": 0, "bloqueios": 0}
+
+    def _atualizar(self):
+        # Chamado com o lock: a espera do circuito aberto terminou?
+        if self._estado == ABERTO and time.monotonic() >= self._aberto_ate:
+            self._estado = MEIO_ABERTO
+            print("🟡 [CIRCUITO BITPANEL] Espera terminou, liberando uma nova tentativa")
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            self._atualizar()
+            return self._estado
+
+    @property
+    def aberto(self) -> bool:
+        return self.estado == ABERTO
+
+    def permite(self) -> bool:
+        """True se uma automação pode ir ao painel agora. Conta os bloqueios para as métricas."""
+        with self._lock:
+            self._atualizar()
+            if self._estado != ABERTO:
+                return True
+            self._contadores["bloqueios"] += 1
+            return False
+
+    def registrar_sucesso(self, origem: str):
+        with self._lock:
+            anterior = self._estado
+            self._estado = FECHADO
+            self._falhas_seguidas = 0
+            self._aberto_em = None
+        if anterior != FECHADO:
+            print(f"🟢 [CIRCUITO BITPANEL] Fechado após sucesso ({origem})")
+
+    def registrar_falha(self, origem: str, erro: str):
+        with self._lock:
+            self._atualizar()
+            self._falhas_seguidas += 1
+            self._ultimo_erro = f"{origem}: {erro}"
+            # Meio aberto: uma falha basta para voltar a abrir
+            if self._estado == MEIO_ABERTO or (
+                self._estado == FECHADO and self._falhas_seguidas >= self.limite_falhas
+            ):
+                self._estado = ABERTO
+                self._aberto_ate = time.monotonic() + self.espera_segundos
+                self._aberto_em = self._aberto_em or datetime.now()
+                self._contadores["aberturas"] += 1
+                abriu = True
+            else:
+                abriu = False
+        if abriu:
+            print(f"🔴 [CIRCUITO BITPANEL] Aberto por {self.espera_segundos:.0f}s após "
+                  f"{self._falhas_seguidas} falha(s) seguida(s) ({origem}: {erro})")
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            self._atualizar()
+            dados = dict(self._contadores)
+            dados.update(
+                estado=self._estado,
+                falhas_seguidas=self._falhas_seguidas,
+                ultimo_erro=self._ultimo_erro,
+                aberto_desde=self._aberto_em.isoformat() if self._aberto_em else None,
+                reabre_em_segundos=max(0, round(self._aberto_ate - time.monotonic()))
+                if self._estado == ABERTO else None,
+            )
+        return dados
+
+
+class SondaBitPanel(TarefaPeriodica):
+    """
+    Verifica periodicamente se o painel responde e guarda o resultado em
+    cache. Erro de rede, timeout ou HTTP 5xx contam como fora do ar; um 4xx
+    (ex.: a página pede login) significa que o painel está respondendo.
+    """
+
+    nome = "sonda-bitpanel"
+    etiqueta = "SONDA BITPANEL"
+
+    def __init__(self, intervalo: int = None, url: str = None, timeout: float = None,
+                 circuito: CircuitoBitPanel = None):
+        super().__init__(intervalo or Config.BITPANEL_SONDA_INTERVALO_SEGUNDOS)
+        self.url = url or Config.BITPANEL_SONDA_URL or Config.BITPANEL_URL
+        self.timeout = timeout or Config.BITPANEL_SONDA_TIMEOUT
+        self.circuito = circuito or circuito_bitpanel
+        self.online: Optional[bool] = None  # None = ainda não verificado
+        self.latencia_ms: Optional[int] = None
+        self.ultimo_erro: Optional[str] = None
+
+    def executar(self) -> bool:
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            # stream=True: só o status interessa, o corpo da página nem é baixado
+            with requests.get(self.url, timeout=self.timeout, stream=True) as resposta:
+                if resposta.status_code >= 500:
+                    erro = f"HTTP {resposta.status_code}"
+        except requests.RequestException as e:
+            erro = e.__class__.__name__
+
+        online = erro is None
+        self.latencia_ms = round((time.perf_counter() - inicio) * 1000)
+        self.ultima_execucao = datetime.now()
+        self.ultimo_erro = erro
+        if online != self.online:
+            if online:
+                print(f"✅ [SONDA BITPANEL] Painel online ({self.latencia_ms} ms)")
+            else:
+                print(f"❌ [SONDA BITPANEL] Painel fora do ar: {erro}")
+        self.online = online
+
+        if online:
+            self.circuito.registrar_sucesso("sonda")
+        else:
+            self.circuito.registrar_falha("sonda", erro)
+        return online
+
+    def status(self) -> Dict[str, Any]:
+        """Estado em cache para o dashboard e o /api/stats."""
+        return {
+            "online": bool(self.online),
+            "verificado_em": self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            "latencia_ms": self.latencia_ms,
+            "erro": self.ultimo_erro,
+            "circuito": self.circuito.estado,
+        }
+
+    def metricas(self) -> Dict[str, Any]:
+        dados = self.status()
+        dados["circuito"] = self.circuito.metricas()
+        return dados
+
+
+circuito_bitpanel = CircuitoBitPanel()
+sonda_bitpanel = SondaBitPanel()
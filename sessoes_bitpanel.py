@@ -0,0 +1,217 @@
+# sessoes_bitpanel.py - Pool de sessões do BitPanel já logadas e reaproveitadas
+import queue
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from bitpanel_api import BitPanelApiClient
+from bitpanel_automation import BitPanelManager
+from config import Config
+from saude_bitpanel import circuito_bitpanel
+
+
+def criar_cliente_bitpanel():
+    """Cria o cliente do BitPanel escolhido em Config.BITPANEL_BACKEND."""
+    backend = (Config.BITPANEL_BACKEND or "selenium").lower()
+    if backend == "api":
+        return BitPanelApiClient()
+    if backend == "selenium":
+        return BitPanelManager()
+    raise ValueError(f"Backend do BitPanel desconhecido: {backend}")
+
+
+class SessaoIndisponivel(Exception):
+    """Nenhuma sessão do BitPanel ficou livre (ou conseguiu logar) a tempo."""
+
+
+class PoolSessoesBitPanel:
+    """
+    Mantém até `tamanho` navegadores logados no BitPanel entre uma automação e
+    outra, para que criar ou renovar uma lista custe só os passos da operação,
+    sem abrir o Chrome e refazer o login a cada pagamento.
+
+    Uso:
+        with pool_bitpanel.sessao() as manager:
+            manager.criar_lista(...)
+
+    Cada sessão é entregue a um único chamador por vez. Antes da entrega ela
+    passa por uma checagem de saúde (recarregando o dashboard se ficou parada
+    mais que `verificar_apos` segundos) e é relogada se o painel a expirou.
+    Se a operação levantar uma exceção, a sessão é descartada em vez de voltar.
+    """
+
+    def __init__(self, tamanho: int = None, verificar_apos: int = None, fabrica=criar_cliente_bitpanel, headless: bool = True):
+        self.tamanho = tamanho or Config.BITPANEL_POOL_TAMANHO
+        self.verificar_apos = Config.BITPANEL_POOL_VERIFICAR_APOS if verificar_apos is None else verificar_apos
+        self.fabrica = fabrica
+        self.headless = headless
+        # LIFO: a sessão devolvida por último é a que tem mais chance de ainda estar válida
+        self._livres: "queue.LifoQueue" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._abertas = 0
+        self._fechado = False
+        self._contadores = {
+            "checkouts": 0,
+            "criadas": 0,
+            "relogins": 0,
+            "descartadas": 0,
+            "esgotado": 0,
+            "espera_total": 0.0,
+        }
+
+    def _contar(self, nome: str, valor=1):
+        with self._lock:
+            self._contadores[nome] += valor
+
+    def _criar(self) -> BitPanelManager:
+        print("🌐 [POOL BITPANEL] Abrindo nova sessão...")
+        manager = self.fabrica()
+        if not manager.login(headless=self.headless):
+            self._fechar_manager(manager)
+            circuito_bitpanel.registrar_falha("pool", "falha no login")
+            raise SessaoIndisponivel("Falha no login do BitPanel ao abrir nova sessão")
+        circuito_bitpanel.registrar_sucesso("pool")
+        self._contar("criadas")
+        return manager
+
+    def _preparar(self, manager: BitPanelManager, devolvida_em: float) -> bool:
+        """Checa a sessão antes de entregá-la; reloga se o painel a derrubou."""
+        parada = time.monotonic() - devolvida_em
+        if manager.sessao_ativa(recarregar=parada >= self.verificar_apos):
+            return True
+
+        print("🔐 [POOL BITPANEL] Sessão expirada, refazendo login...")
+        self._contar("relogins")
+        manager.is_logged_in = False
+        try:
+            return manager.login(headless=self.headless)
+        except Exception as e:
+            print(f"❌ [POOL BITPANEL] Erro ao relogar: {e}")
+            return False
+
+    def _fechar_manager(self, manager: BitPanelManager):
+        try:
+            manager.close()
+        except Exception as e:
+            print(f"⚠️ [POOL BITPANEL] Erro ao fechar navegador: {e}")
+            manager.driver = None
+            manager.is_logged_in = False
+
+    def _descartar(self, manager: BitPanelManager):
+        with self._lock:
+            self._abertas -= 1
+            self._contadores["descartadas"] += 1
+        self._fechar_manager(manager)
+
+    def _reservar_vaga(self) -> bool:
+        with self._lock:
+            if self._fechado:
+                raise SessaoIndisponivel("Pool de sessões do BitPanel foi fechado")
+            if self._abertas < self.tamanho:
+                self._abertas += 1
+                return True
+            return False
+
+    def _abrir_na_vaga(self) -> BitPanelManager:
+        try:
+            return self._criar()
+        except Exception:
+            with self._lock:
+                self._abertas -= 1
+            raise
+
+    def obter(self, timeout: float = None) -> BitPanelManager:
+        """
+        Retira uma sessão saudável do pool. Abre uma nova se ainda houver vaga;
+        senão espera uma ser devolvida por até `timeout` segundos.
+        """
+        timeout = Config.BITPANEL_POOL_ESPERA_SEGUNDOS if timeout is None else timeout
+        inicio = time.monotonic()
+        while True:
+            try:
+                devolvida_em, manager = self._livres.get_nowait()
+            except queue.Empty:
+                if self._reservar_vaga():
+                    manager = self._abrir_na_vaga()
+                    break
+                restante = timeout - (time.monotonic() - inicio)
+                try:
+                    devolvida_em, manager = self._livres.get(timeout=max(restante, 0.001))
+                except queue.Empty:
+                    self._contar("esgotado")
+                    raise SessaoIndisponivel(f"Nenhuma sessão do BitPanel livre em {timeout}s")
+
+            if self._preparar(manager, devolvida_em):
+                break
+            self._descartar(manager)
+
+        espera = time.monotonic() - inicio
+        self._contar("checkouts")
+        self._contar("espera_total", espera)
+        print(f"✅ [POOL BITPANEL] Sessão entregue em {espera:.2f}s")
+        return manager
+
+    def devolver(self, manager: BitPanelManager, descartar: bool = False):
+        """Devolve a sessão ao pool, ou a fecha se ela não deve ser reaproveitada."""
+        if descartar or self._fechado or not manager.is_logged_in:
+            self._descartar(manager)
+            return
+        self._livres.put((time.monotonic(), manager))
+
+    @contextmanager
+    def sessao(self, timeout: float = None):
+        """Empresta uma sessão logada durante o bloco `with`."""
+        manager = self.obter(timeout)
+        sucesso = False
+        try:
+            yield manager
+            sucesso = True
+        finally:
+            self.devolver(manager, descartar=not sucesso)
+
+    def aquecer(self, quantidade: int = None) -> int:
+        """Abre e loga sessões até `quantidade` (limitado ao tamanho do pool)."""
+        quantidade = min(Config.BITPANEL_POOL_AQUECER if quantidade is None else quantidade, self.tamanho)
+        abertas = 0
+        while abertas < quantidade and self._reservar_vaga():
+            try:
+                manager = self._abrir_na_vaga()
+            except Exception as e:
+                print(f"❌ [POOL BITPANEL] Erro ao aquecer sessão: {e}")
+                traceback.print_exc()
+                break
+            self._livres.put((time.monotonic(), manager))
+            abertas += 1
+        if abertas:
+            print(f"🔥 [POOL BITPANEL] {abertas} sessão(ões) aquecida(s)")
+        return abertas
+
+    def aquecer_em_segundo_plano(self, quantidade: int = None):
+        """Aquece o pool sem segurar quem está subindo o sistema."""
+        threading.Thread(target=self.aquecer, args=(quantidade,), name="pool-bitpanel", daemon=True).start()
+
+    def fechar(self):
+        """Fecha todas as sessões livres; as emprestadas são fechadas ao voltar."""
+        with self._lock:
+            self._fechado = True
+        while True:
+            try:
+                _, manager = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(manager)
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            dados = dict(self._contadores)
+            dados["abertas"] = self._abertas
+        dados["livres"] = self._livres.qsize()
+        dados["tamanho"] = self.tamanho
+        espera_total = dados.pop("espera_total")
+        dados["espera_media_ms"] = round(espera_total / dados["checkouts"] * 1000, 2) if dados["checkouts"] else 0
+        return dados
+
+
+pool_bitpanel = PoolSessoesBitPanel()
@@ -0,0 +1,311 @@
+# sincronizacao.py - Sincronização com o BitPanel: em massa (vários navegadores) e incremental (agendador)
+import queue
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import Config
+from database import db
+from manutencao import TarefaPeriodica
+from saude_bitpanel import circuito_bitpanel
+from sessoes_bitpanel import SessaoIndisponivel, criar_cliente_bitpanel, pool_bitpanel
+
+_FIM = object()
+
+
+class LimitadorTaxa:
+    """
+    Limite global de operações por segundo contra o BitPanel, dividido entre
+    todas as threads: cada chamada a `aguardar()` reserva o próximo horário
+    livre e dorme até ele.
+    """
+
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> float:
+        """Bloqueia até a vez desta chamada; retorna quanto tempo esperou."""
+        if not self.intervalo:
+            return 0.0
+        with self._lock:
+            agora = time.monotonic()
+            horario = max(agora, self._proximo)
+            self._proximo = horario + self.intervalo
+        espera = horario - agora
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+
+class ExecutorSincronizacao:
+    """
+    Distribui os usuários entre `workers` threads, todas puxando da mesma fila
+    (quem termina antes pega mais). Os resultados vão para uma fila única
+    consumida por um só escritor, que é quem grava no banco: as escritas não
+    disputam o lock do SQLite entre si.
+
+    Com `pool`, cada thread pega uma sessão do pool a cada usuário e a devolve
+    logo depois (como o AgendadorSincronizacao), então pagamentos na fila de
+    jobs não ficam atrás da sincronização; sem ele, cada thread abre o próprio
+    navegador com `fabrica` (benchmark contra o painel falso). Com o circuito
+    do BitPanel aberto as threads param e o que sobrou conta como falha.
+    """
+
+    def __init__(self, workers: int = None, por_segundo: float = None,
+                 fabrica: Callable[[], Any] = criar_cliente_bitpanel, salvar: Callable[[str, dict], bool] = None,
+                 pool=None):
+        self.workers = workers or Config.SYNC_WORKERS
+        self.por_segundo = Config.SYNC_TAXA_POR_SEGUNDO if por_segundo is None else por_segundo
+        self.fabrica = fabrica
+        self.salvar = salvar or db.atualizar_dados_sincronizados
+        self.pool = pool
+
+    def _trabalhar(self, numero: int, pendentes: "queue.Queue", resultados: "queue.Queue",
+                   limitador: LimitadorTaxa, estatisticas: Dict[str, Any]):
+        inicio = time.monotonic()
+        manager = None
+        try:
+            if self.pool is None:
+                manager = self.fabrica()
+                if not manager.login(headless=True):
+                    print(f"❌ [SYNC PARALELO] Worker {numero}: falha no login, saindo")
+                    estatisticas["erro"] = "Falha no login"
+                    return
+            while True:
+                if not circuito_bitpanel.permite():
+                    print(f"⏸️ [SYNC PARALELO] Worker {numero}: circuito do BitPanel aberto, parando")
+                    estatisticas["erro"] = "Circuito do BitPanel aberto"
+                    break
+                try:
+                    usuario = pendentes.get_nowait()
+                except queue.Empty:
+                    break
+                estatisticas["espera_taxa"] += limitador.aguardar()
+                try:
+                    if self.pool is None:
+                        dados = manager.sincronizar_dados_usuario(usuario, headless=True)
+                    else:
+                        with self.pool.sessao() as sessao:
+                            dados = sessao.sincronizar_dados_usuario(usuario, headless=True)
+                except SessaoIndisponivel as e:
+                    # Pool ocupado com pagamentos: devolve o usuário para outra thread (ou para o fim)
+                    print(f"⚠️ [SYNC PARALELO] Worker {numero}: {e}; saindo")
+                    estatisticas["erro"] = str(e)
+                    pendentes.put(usuario)
+                    break
+                except Exception as e:
+                    dados = {"erro": f"Erro inesperado: {e}"}
+                estatisticas["usuarios"] += 1
+                resultados.put((numero, usuario, dados))
+        except Exception as e:
+            print(f"❌ [SYNC PARALELO] Worker {numero} caiu: {e}")
+            traceback.print_exc()
+            estatisticas["erro"] = str(e)
+        finally:
+            if manager:
+                try:
+                    manager.close()
+                except Exception:
+                    pass
+            estatisticas["segundos"] = time.monotonic() - inicio
+
+    def _escrever(self, resultados: "queue.Queue", relatorio: Dict[str, Any]):
+        while True:
+            item = resultados.get()
+            if item is _FIM:
+                return
+            origem, usuario, dados = item
+            if dados and dados.get("nao_encontrado"):
+                # O agendador incremental deixa esse usuário de lado por um tempo
+                db.registrar_tentativa_sincronizacao(usuario, dados["erro"], nao_encontrado=True)
+            if dados is None or "erro" in dados:
+                print(f"❌ [SYNC PARALELO] {usuario}: {(dados or {}).get('erro', 'sem dados')}")
+                sucesso, detalhe = False, f"{usuario}: FALHA"
+            elif self.salvar(usuario, dados):
+                sucesso, detalhe = True, f"{usuario}: OK"
+            else:
+                sucesso, detalhe = False, f"{usuario}: FALHA (banco)"
+
+            chave = "sucessos" if sucesso else "falhas"
+            relatorio[chave] += 1
+            relatorio["detalhes"].append(detalhe)
+            if origem in relatorio["por_worker"]:
+                relatorio["por_worker"][origem][chave] += 1
+
+    def executar(self, usuarios: Iterable[str], prontos: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+        """
+        Sincroniza `usuarios` em paralelo. `prontos` são resultados já obtidos
+        por outro caminho (a leitura da tabela) que só precisam ser gravados;
+        eles passam pelo mesmo escritor. Retorna o relatório da execução.
+        """
+        inicio = time.monotonic()
+        usuarios: List[str] = list(usuarios)
+        pendentes: "queue.Queue" = queue.Queue()
+        for usuario in usuarios:
+            pendentes.put(usuario)
+        resultados: "queue.Queue" = queue.Queue()
+        limitador = LimitadorTaxa(self.por_segundo)
+
+        workers = min(self.workers, len(usuarios), self.pool.tamanho if self.pool is not None else self.workers)
+        relatorio: Dict[str, Any] = {
+            "total": len(usuarios) + len(prontos or {}),
+            "sucessos": 0,
+            "falhas": 0,
+            "detalhes": [],
+            "workers": workers,
+            "por_worker": {
+                numero: {"usuarios": 0, "sucessos": 0, "falhas": 0, "segundos": 0.0, "espera_taxa": 0.0, "erro": None}
+                for numero in range(1, workers + 1)
+            },
+        }
+
+        escritor = threading.Thread(target=self._escrever, args=(resultados, relatorio), name="sync-escritor", daemon=True)
+        escritor.start()
+        for usuario, dados in (prontos or {}).items():
+            resultados.put(("tabela", usuario, dados))
+
+        print(f"🚀 [SYNC PARALELO] {len(usuarios)} usuários em {workers} navegador(es), "
+              f"até {self.por_segundo or 'ilimitadas'} operações/s")
+        threads = [
+            threading.Thread(
+                target=self._trabalhar,
+                args=(numero, pendentes, resultados, limitador, relatorio["por_worker"][numero]),
+                name=f"sync-worker-{numero}",
+                daemon=True,
+            )
+            for numero in range(1, workers + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Sobrou alguém na fila (workers caíram, pool ocupado ou circuito aberto): conta como falha
+        while True:
+            try:
+                usuario = pendentes.get_nowait()
+            except queue.Empty:
+                break
+            resultados.put((None, usuario, {"erro": "Nenhum navegador disponível"}))
+
+        resultados.put(_FIM)
+        escritor.join()
+
+        relatorio["segundos"] = round(time.monotonic() - inicio, 2)
+        relatorio["por_minuto"] = round(relatorio["total"] / relatorio["segundos"] * 60, 1) if relatorio["segundos"] else 0
+        for numero, dados in relatorio["por_worker"].items():
+            dados["segundos"] = round(dados["segundos"], 2)
+            dados["espera_taxa"] = round(dados["espera_taxa"], 2)
+            dados["por_minuto"] = round(dados["usuarios"] / dados["segundos"] * 60, 1) if dados["segundos"] else 0
+            print(f"📊 [SYNC PARALELO] Worker {numero}: {dados['usuarios']} usuários em {dados['segundos']}s "
+                  f"({dados['por_minuto']}/min, {dados['espera_taxa']}s no limite de taxa)")
+        print(f"📊 [SYNC PARALELO] {relatorio['sucessos']} sucessos, {relatorio['falhas']} falhas "
+              f"em {relatorio['segundos']}s ({relatorio['por_minuto']}/min)")
+        return relatorio
+
+
+class AgendadorSincronizacao(TarefaPeriodica):
+    """
+    Sincroniza continuamente, em lotes pequenos, os clientes que mais precisam
+    (veja DatabaseManager.selecionar_clientes_para_sincronizar), sem passar de
+    `por_hora` operações no BitPanel em qualquer janela de uma hora. Usa as
+    sessões do pool uma de cada vez, devolvendo a cada usuário, para não
+    segurar navegador na frente de um pagamento.
+    """
+
+    nome = "agendador-sync"
+    etiqueta = "AGENDADOR SYNC"
+
+    def __init__(self, intervalo: int = None, por_hora: int = None, lote: int = None, pool=None):
+        super().__init__(intervalo or Config.SYNC_AGENDADOR_INTERVALO_SEGUNDOS)
+        self.por_hora = Config.SYNC_AGENDADOR_POR_HORA if por_hora is None else por_hora
+        self.lote = lote or Config.SYNC_AGENDADOR_LOTE
+        self.pool = pool or pool_bitpanel
+        self._gastos: deque = deque()
+        self.ultimo_resultado: Dict[str, Any] = {}
+
+    def orcamento_restante(self) -> int:
+        """Quantas sincronizações ainda cabem na última hora."""
+        limite = time.monotonic() - 3600
+        while self._gastos and self._gastos[0] <= limite:
+            self._gastos.popleft()
+        return max(self.por_hora - len(self._gastos), 0)
+
+    def executar(self) -> Dict[str, Any]:
+        """Sincroniza um lote e retorna o resumo da rodada."""
+        self.ultima_execucao = datetime.now()
+        resultado = {"selecionados": 0, "sucessos": 0, "falhas": 0, "nao_encontrados": 0, "motivos": {}}
+        self.ultimo_resultado = resultado
+
+        restante = self.orcamento_restante()
+        if not restante:
+            print(f"⏸️ [AGENDADOR SYNC] Orçamento de {self.por_hora}/hora esgotado, aguardando")
+            return resultado
+        if not circuito_bitpanel.permite():
+            print("⏸️ [AGENDADOR SYNC] Circuito do BitPanel aberto, pulando a rodada")
+            return resultado
+
+        clientes = db.selecionar_clientes_para_sincronizar(
+            min(self.lote, restante),
+            desatualizado_horas=Config.SYNC_AGENDADOR_DESATUALIZADO_HORAS,
+            expirando_dias=Config.SYNC_AGENDADOR_EXPIRANDO_DIAS,
+            expirando_horas=Config.SYNC_AGENDADOR_EXPIRANDO_HORAS,
+            pausa_nao_encontrado_horas=Config.SYNC_AGENDADOR_PAUSA_NAO_ENCONTRADO_HORAS,
+            pausa_falha_minutos=Config.SYNC_AGENDADOR_PAUSA_FALHA_MINUTOS,
+        )
+        resultado["selecionados"] = len(clientes)
+        resultado["motivos"] = dict(Counter(cliente["motivo"] for cliente in clientes))
+        if not clientes:
+            return resultado
+
+        print(f"🔄 [AGENDADOR SYNC] {len(clientes)} cliente(s) para sincronizar {resultado['motivos']}, "
+              f"orçamento restante {restante}/{self.por_hora}")
+        for cliente in clientes:
+            if self._parar.is_set():
+                break
+            usuario = cliente["usuario_iptv"]
+            self._gastos.append(time.monotonic())
+            try:
+                with self.pool.sessao() as manager:
+                    dados = manager.sincronizar_dados_usuario(usuario, headless=True)
+            except SessaoIndisponivel as e:
+                # Navegadores ocupados com pagamentos: o resto fica para a próxima rodada
+                print(f"⚠️ [AGENDADOR SYNC] {e}; retomando na próxima rodada")
+                self._gastos.pop()
+                break
+            except Exception as e:
+                dados = {"erro": f"Erro inesperado: {e}"}
+
+            if not dados or "erro" in dados:
+                erro = (dados or {}).get("erro", "sem dados")
+                nao_encontrado = bool(dados and dados.get("nao_encontrado"))
+                db.registrar_tentativa_sincronizacao(usuario, erro, nao_encontrado=nao_encontrado)
+                resultado["nao_encontrados" if nao_encontrado else "falhas"] += 1
+                print(f"❌ [AGENDADOR SYNC] {usuario}: {erro}")
+            elif db.atualizar_dados_sincronizados(usuario, dados):
+                db.registrar_tentativa_sincronizacao(usuario)
+                resultado["sucessos"] += 1
+            else:
+                db.registrar_tentativa_sincronizacao(usuario, "Falha ao gravar no banco")
+                resultado["falhas"] += 1
+
+        print(f"📊 [AGENDADOR SYNC] {resultado['sucessos']} sucessos, {resultado['falhas']} falhas, "
+              f"{resultado['nao_encontrados']} não encontrados")
+        return resultado
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "por_hora": self.por_hora,
+            "orcamento_restante": self.orcamento_restante(),
+            "ultima_execucao": self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            "ultimo_resultado": self.ultimo_resultado,
+        }
+
+
+executor_sincronizacao = ExecutorSincronizacao(pool=pool_bitpanel)
+agendador_sincronizacao = AgendadorSincronizacao()
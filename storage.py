@@ -0,0 +1,140 @@
+# storage.py - Onde o banco do sistema mora (arquivo ou memória)
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+from config import Config
+
+# Bancos anexados (ATTACH) a cada conexão: tabelas de muita escrita ficam em
+# arquivos próprios, com lock e journal separados do banco principal, onde
+# estão clientes e pagamentos. nome do schema -> PRAGMA synchronous do anexo.
+ANEXOS = {
+    "logs": "OFF",     # logs_sistema: perder as últimas linhas numa queda de energia é aceitável
+    "chat": "NORMAL",  # conversas
+}
+
+
+class Armazenamento:
+    """
+    Interface mínima usada pelo DatabaseManager: só sabe abrir conexões.
+    Toda a parte de SQL continua no DatabaseManager.
+    """
+
+    nome = "base"
+
+    def conectar(self, somente_leitura: bool = False, factory=sqlite3.Connection) -> sqlite3.Connection:
+        raise NotImplementedError
+
+    def conectar_arquivo(self, schema: str = "main", factory=sqlite3.Connection) -> sqlite3.Connection:
+        """
+        Conexão de escrita só com um arquivo (main, logs ou chat), sem anexos.
+        Um BEGIN IMMEDIATE aqui trava apenas esse arquivo; numa conexão com
+        anexos ele travaria todos de uma vez.
+        """
+        raise NotImplementedError
+
+    def _configurar_escrita(self, conn: sqlite3.Connection, schema: str):
+        if schema in ANEXOS:
+            conn.execute(f"PRAGMA synchronous = {ANEXOS[schema]}")
+
+    def _anexar(self, conn: sqlite3.Connection, alvos: dict, somente_leitura: bool):
+        for schema, alvo in alvos.items():
+            conn.execute("ATTACH DATABASE ? AS " + schema, (alvo,))
+            if not somente_leitura:
+                conn.execute(f"PRAGMA {schema}.synchronous = {ANEXOS[schema]}")
+
+    def fechar(self):
+        """Libera recursos do backend (no arquivo não há nada a fazer)."""
+
+    def descricao(self) -> str:
+        return self.nome
+
+
+class ArmazenamentoArquivo(Armazenamento):
+    """Banco SQLite em arquivo, o modo normal de produção."""
+
+    nome = "arquivo"
+
+    def __init__(self, caminho: str = None, caminhos_anexos: dict = None):
+        self.caminho = caminho or Config.DATABASE_PATH
+        self.caminhos_anexos = caminhos_anexos or {
+            "logs": Config.DATABASE_LOGS_PATH,
+            "chat": Config.DATABASE_CONVERSAS_PATH,
+        }
+
+    def _uri(self, caminho: str, somente_leitura: bool) -> str:
+        return Path(caminho).resolve().as_uri() + ("?mode=ro" if somente_leitura else "")
+
+    def conectar(self, somente_leitura: bool = False, factory=sqlite3.Connection) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._uri(self.caminho, somente_leitura), uri=True, timeout=10, factory=factory)
+        alvos = {schema: self._uri(caminho, somente_leitura) for schema, caminho in self.caminhos_anexos.items()}
+        self._anexar(conn, alvos, somente_leitura)
+        return conn
+
+    def conectar_arquivo(self, schema: str = "main", factory=sqlite3.Connection) -> sqlite3.Connection:
+        caminho = self.caminho if schema == "main" else self.caminhos_anexos[schema]
+        conn = sqlite3.connect(caminho, timeout=Config.SQLITE_ESCRITA_TIMEOUT, factory=factory)
+        self._configurar_escrita(conn, schema)
+        return conn
+
+    def descricao(self) -> str:
+        return f"arquivo:{self.caminho}"
+
+
+class ArmazenamentoMemoria(Armazenamento):
+    """
+    Banco `:memory:` com cache compartilhado: todas as conexões do mesmo
+    processo enxergam o mesmo banco, sem tocar no disco. Serve para testes e
+    benchmarks; cada instância recebe um nome próprio, então várias podem
+    rodar em paralelo sem se atrapalhar.
+    """
+
+    nome = "memoria"
+
+    def __init__(self, nome_banco: str = None):
+        self.nome_banco = nome_banco or f"iptv_{uuid.uuid4().hex}"
+        self._uri = f"file:{self.nome_banco}?mode=memory&cache=shared"
+        self._uris_anexos = {
+            schema: f"file:{self.nome_banco}_{schema}?mode=memory&cache=shared" for schema in ANEXOS
+        }
+        self._lock = threading.Lock()
+        # O banco em memória só existe enquanto houver ao menos uma conexão aberta
+        self._ancora = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        self._anexar(self._ancora, self._uris_anexos, somente_leitura=False)
+
+    def conectar(self, somente_leitura: bool = False, factory=sqlite3.Connection) -> sqlite3.Connection:
+        with self._lock:
+            if self._ancora is None:
+                raise sqlite3.ProgrammingError(f"Banco em memória '{self.nome_banco}' já foi fechado")
+        conn = sqlite3.connect(self._uri, uri=True, timeout=10, factory=factory)
+        self._anexar(conn, self._uris_anexos, somente_leitura)
+        if somente_leitura:
+            # mode=ro não combina com mode=memory; query_only garante o mesmo efeito
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def conectar_arquivo(self, schema: str = "main", factory=sqlite3.Connection) -> sqlite3.Connection:
+        uri = self._uri if schema == "main" else self._uris_anexos[schema]
+        conn = sqlite3.connect(uri, uri=True, timeout=Config.SQLITE_ESCRITA_TIMEOUT, factory=factory)
+        self._configurar_escrita(conn, schema)
+        return conn
+
+    def fechar(self):
+        with self._lock:
+            if self._ancora is not None:
+                self._ancora.close()
+                self._ancora = None
+
+    def descricao(self) -> str:
+        return f"memoria:{self.nome_banco}"
+
+
+def criar_armazenamento(backend: str = None, caminho: str = None) -> Armazenamento:
+    """Cria o backend escolhido em `Config.DATABASE_BACKEND` ('arquivo' ou 'memoria')."""
+    backend = (backend or Config.DATABASE_BACKEND).lower()
+    if backend == "arquivo":
+        return ArmazenamentoArquivo(caminho)
+    if backend == "memoria":
+        return ArmazenamentoMemoria(caminho)
+    raise ValueError(f"Backend de banco desconhecido: {backend}")
@@ -315,6 +315,236 @@ def testar_integracao_completa():
         print(f"❌ Erro na integração: {str(e)}")
         return False
 
+def testar_bitpanel_api():
+    """Testar o cliente HTTP do BitPanel contra o painel falso local (sem internet)"""
+    print("\n🔌 TESTANDO CLIENTE HTTP DO BITPANEL (PAINEL FALSO LOCAL)...")
+    
+    try:
+        from config import Config
+        from bitpanel_api import BitPanelApiClient
+        from mock_bitpanel import PainelFalso, criar_app, iniciar_servidor
+        
+        painel = PainelFalso(usuario=Config.BITPANEL_USER or "admin", senha=Config.BITPANEL_PASS or "admin")
+        Config.BITPANEL_USER, Config.BITPANEL_PASS = painel.usuario, painel.senha
+        servidor, url = iniciar_servidor(criar_app(painel))
+        
+        try:
+            cliente = BitPanelApiClient(base_url=url)
+            inicio = time.perf_counter()
+            
+            criada = cliente.criar_lista("api_teste", conexoes=2, duracao_meses=1)
+            assert criada and criada["usuario"] == "api_teste" and criada.get("senha"), criada
+            print(f"✅ Lista criada: {criada}")
+            
+            renovada = cliente.renovar_lista("api_teste", duracao_meses=2)
+            assert "erro" not in renovada and renovada["expira_em"] != criada["expira_em"], renovada
+            print(f"✅ Lista renovada, expira em {renovada['expira_em']}")
+            
+            sincronizada = cliente.sincronizar_dados_usuario("api_teste")
+            assert sincronizada["expira_em"] == renovada["expira_em"], sincronizada
+            datetime.strptime(sincronizada["expira_em"], "%d/%m/%Y %H:%M")
+            print(f"✅ Sincronização no mesmo formato do Selenium: {sincronizada}")
+            
+            teste = cliente.criar_teste("api_trial")
+            assert teste.get("usuario") == "api_trial", teste
+            print(f"✅ Teste criado: {teste}")
+            
+            assert "erro" in cliente.sincronizar_dados_usuario("nao_existe")
+            assert cliente.criar_lista("api_teste", 1, 1) is None
+            print("✅ Usuário inexistente e nome repetido retornam erro")
+            
+            # Token recusado: o cliente reloga e repete a chamada na mesma operação
+            painel.tokens.clear()
+            assert "erro" not in cliente.sincronizar_dados_usuario("api_teste") and cliente.is_logged_in
+            print("✅ Sessão expirada detectada, login refeito e chamada repetida")
+            
+            print(f"⏱️ Operações concluídas em {(time.perf_counter() - inicio) * 1000:.0f}ms")
+            cliente.close()
+            return True
+        finally:
+            servidor.shutdown()
+        
+    except Exception as e:
+        print(f"❌ Erro no cliente HTTP do BitPanel: {repr(e)}")
+        return False
+
+def testar_perfil_navegador():
+    """Comparar memória e tempo de carga do Chrome completo x enxuto (sem login)"""
+    print("\n📏 COMPARANDO PERFIS DO CHROME DA AUTOMAÇÃO...")
+    
+    try:
+        from config import Config
+        from bitpanel_automation import BitPanelManager
+        
+        url = f"{Config.BITPANEL_URL}/login"
+        resultados = {}
+        
+        for enxuto in (False, True):
+            nome = "enxuto" if enxuto else "completo"
+            manager = BitPanelManager()
+            try:
+                manager.setup_driver(headless=True, enxuto=enxuto)
+                inicio = time.perf_counter()
+                manager.driver.get(url)
+                tempo_get = (time.perf_counter() - inicio) * 1000
+                medidas = manager.medir_navegador()
+                medidas["driver_get_ms"] = round(tempo_get)
+                resultados[nome] = medidas
+                print(f"✅ {nome}: {medidas}")
+            finally:
+                manager.close()
+        
+        for campo in ("rss_mb", "driver_get_ms", "dom_pronto_ms", "carregada_ms", "recursos", "bytes_recursos"):
+            antes = resultados["completo"].get(campo)
+            depois = resultados["enxuto"].get(campo)
+            print(f"   {campo:>16}: {antes} → {depois}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Erro ao comparar perfis: {str(e)}")
+        return False
+
+def testar_extracao_detalhes():
+    """Medir a leitura da página de detalhes: um .text por <li> x um único execute_script"""
+    print("\n⏱️ MEDINDO EXTRAÇÃO DA PÁGINA DE DETALHES...")
+    
+    try:
+        from bitpanel_automation import BitPanelManager, JS_LER_INFO_LISTA
+        from parser_bitpanel import mapear_info_lista
+        from selenium.webdriver.common.by import By
+        
+        username = input("👤 Usuário que existe no painel: ").strip()
+        manager = BitPanelManager()
+        try:
+            # A sincronização termina com o navegador na página de detalhes da lista
+            dados = manager.sincronizar_dados_usuario(username, headless=True)
+            if not dados or "erro" in dados:
+                print(f"❌ Não foi possível abrir os detalhes: {dados}")
+                return False
+            
+            repeticoes = 10
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                bloco = manager.driver.find_element(By.CLASS_NAME, "user-infor")
+                textos = [item.text for item in bloco.find_elements(By.TAG_NAME, "li")]
+            por_item = (time.perf_counter() - inicio) * 1000 / repeticoes
+            
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                mapear_info_lista(manager.driver.execute_script(JS_LER_INFO_LISTA) or [])
+            script_unico = (time.perf_counter() - inicio) * 1000 / repeticoes
+            
+            print(f"   um .text por <li> ({len(textos)} campos): {por_item:.1f} ms")
+            print(f"   execute_script único:          {script_unico:.1f} ms")
+            print(f"✅ Economia por extração: {por_item - script_unico:.1f} ms")
+            return True
+        finally:
+            manager.close()
+        
+    except Exception as e:
+        print(f"❌ Erro ao medir extração: {str(e)}")
+        return False
+
+def testar_parser_offline():
+    """Conferir e medir o parser_bitpanel nos snapshots de fixtures_bitpanel/ (sem navegador)"""
+    print("\n🧩 TESTANDO PARSER OFFLINE DO BITPANEL...")
+    
+    try:
+        import json
+        from parser_bitpanel import extrair_tabela_listas, extrair_info_lista, extrair_erros
+        
+        pasta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures_bitpanel")
+        with open(os.path.join(pasta, "esperado.json"), encoding="utf-8") as arquivo:
+            esperado = json.load(arquivo)
+        
+        funcoes = {"tabela": extrair_tabela_listas, "info": extrair_info_lista, "erros": extrair_erros}
+        repeticoes = 200
+        tudo_certo = True
+        for nome, resultados in esperado.items():
+            with open(os.path.join(pasta, nome), encoding="utf-8") as arquivo:
+                html = arquivo.read()
+            for campo, funcao in funcoes.items():
+                obtido = funcao(html)
+                if obtido != resultados[campo]:
+                    tudo_certo = False
+                    print(f"❌ {nome} [{campo}]: esperado {resultados[campo]}, obtido {obtido}")
+                inicio = time.perf_counter()
+                for _ in range(repeticoes):
+                    funcao(html)
+                micros = (time.perf_counter() - inicio) * 1_000_000 / repeticoes
+                print(f"   {nome:<36} {campo:<7} {micros:8.1f} µs ({len(html)} bytes)")
+        
+        if tudo_certo:
+            print(f"✅ {len(esperado)} snapshots conferem com esperado.json")
+        return tudo_certo
+        
+    except Exception as e:
+        print(f"❌ Erro no parser offline: {str(e)}")
+        return False
+
+def testar_automacao_mock():
+    """Medir a automação Selenium e o ExecutorSincronizacao contra o painel falso local (Chrome local)"""
+    print("\n🏁 BENCHMARK DA AUTOMAÇÃO CONTRA O PAINEL FALSO...")
+    
+    try:
+        from config import Config
+        from bitpanel_automation import BitPanelManager
+        from mock_bitpanel import PainelFalso, criar_app, iniciar_servidor
+        from sincronizacao import ExecutorSincronizacao
+        
+        latencia = float(input("⏳ Latência por requisição em segundos [0.2]: ").strip() or 0.2)
+        taxa_falha = float(input("💥 Taxa de falhas no benchmark da sincronização (0 a 1) [0]: ").strip() or 0)
+        quantidade = int(input("📋 Listas no painel falso [50]: ").strip() or 50)
+        
+        painel = PainelFalso(latencia=latencia, variacao=latencia / 4, semente=42)
+        painel.popular(quantidade)
+        servidor, url = iniciar_servidor(criar_app(painel))
+        # Aponta a automação para o painel falso sem tocar na sessão salva nem nos tempos reais
+        Config.BITPANEL_URL = url + "/"
+        Config.BITPANEL_USER, Config.BITPANEL_PASS = painel.usuario, painel.senha
+        Config.BITPANEL_SESSAO_PATH = None
+        Config.BITPANEL_REGISTRAR_TEMPOS = False
+        
+        try:
+            manager = BitPanelManager()
+            tempos = {}
+            try:
+                operacoes = [
+                    ("login", lambda: manager.login(headless=True)),
+                    ("criar_lista", lambda: manager.criar_lista("bench_lista", conexoes=2, duracao_meses=1, headless=True)),
+                    ("renovar_lista", lambda: manager.renovar_lista("bench_lista", duracao_meses=2, headless=True)),
+                    ("sincronizar", lambda: manager.sincronizar_dados_usuario("bench_lista")),
+                    ("criar_teste", lambda: manager.criar_teste("bench_teste", headless=True)),
+                    ("extrair_tabela", lambda: manager.extrair_tabela_listas()),
+                ]
+                for nome, operacao in operacoes:
+                    inicio = time.perf_counter()
+                    resultado = operacao()
+                    tempos[nome] = time.perf_counter() - inicio
+                    ok = bool(resultado) and not (isinstance(resultado, dict) and "erro" in resultado)
+                    print(f"{'✅' if ok else '❌'} {nome}: {tempos[nome]:.2f}s")
+            finally:
+                manager.close()
+        
+            painel.configurar(taxa_falha=taxa_falha)
+            usuarios = [f"cliente{numero:04d}" for numero in range(1, min(quantidade, 20) + 1)]
+            executor = ExecutorSincronizacao(workers=2, por_segundo=0, fabrica=BitPanelManager,
+                                             salvar=lambda usuario, dados: True)
+            inicio = time.perf_counter()
+            relatorio = executor.executar(usuarios)
+            segundos = time.perf_counter() - inicio
+            print(f"✅ Sincronização de {len(usuarios)} usuários com 2 navegadores: {segundos:.1f}s "
+                  f"({relatorio['sucessos']} ok, {relatorio['falhas']} falhas)")
+            print(f"📊 Painel falso: {painel.metricas()}")
+            return True
+        finally:
+            servidor.shutdown()
+        
+    except Exception as e:
+        print(f"❌ Erro no benchmark contra o painel falso: {str(e)}")
+        return False
+
 def menu_testes():
     """Menu principal de testes"""
     while True:
@@ -330,6 +560,11 @@ def menu_testes():
 ║  5. 💳 Testar Mercado Pago               ║
 ║  6. 🔄 Testar Integração Completa        ║
 ║  7. 🚀 Executar Todos os Testes          ║
+║  8. 🔌 Testar Cliente HTTP BitPanel      ║
+║  9. 📏 Comparar Perfis do Chrome         ║
+║ 10. ⏱️ Medir Extração de Detalhes        ║
+║ 11. 🧩 Testar Parser Offline             ║
+║ 12. 🏁 Benchmark no Painel Falso         ║
 ║  0. 🚪 Sair                              ║
 ║                                          ║
 ╚══════════════════════════════════════════╝
@@ -359,6 +594,21 @@ def menu_testes():
         elif escolha == '6':
             testar_integracao_completa()
         
+        elif escolha == '8':
+            testar_bitpanel_api()
+        
+        elif escolha == '9':
+            testar_perfil_navegador()
+        
+        elif escolha == '10':
+            testar_extracao_detalhes()
+        
+        elif escolha == '11':
+            testar_parser_offline()
+        
+        elif escolha == '12':
+            testar_automacao_mock()
+        
         elif escolha == '7':
             print("🚀 EXECUTANDO TODOS OS TESTES...\n")
             